@@ -1,10 +1,17 @@
-from sqlalchemy import Column, String, create_engine, ForeignKey, DateTime, Boolean,Float
+from sqlalchemy import Column, String, create_engine, ForeignKey, DateTime, Boolean,Float, Integer, Date, Text, Uuid, Index, inspect
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, relationship 
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
 import os
+import secrets
+import time
 import uuid
 from datetime import datetime
+from core.emotions import STANDARD_EMOTIONS
+from core.log import get_logger
+
+logger = get_logger(__name__)
 
 # Load environment variables
 load_dotenv()
@@ -14,11 +21,29 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # Database setup
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine)
+# Preforked workers must not share the parent's pooled connections
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 Base = declarative_base()
 
+# Native UUID column (uuid on PostgreSQL, CHAR(32) elsewhere); values stay plain strings in Python
+UUIDKey = Uuid(as_uuid=False)
+
+
+def uuid7() -> str:
+    """
+    Time-ordered UUID (RFC 9562 version 7): 48-bit millisecond timestamp followed
+    by random bits, so new keys land at the right-hand edge of B-tree indexes.
+    """
+    if hasattr(uuid, "uuid7"):  # Python 3.14+
+        return str(uuid.uuid7())
+    value = (time.time_ns() // 1_000_000) << 80 | secrets.randbits(80)
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # variant
+    return str(uuid.UUID(int=value))
+
 class Company(Base):
     __tablename__ = "companies"
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=uuid7)
     name = Column(String,unique=True, nullable=False)
     created_at = Column(DateTime,default=datetime.utcnow)
     users = relationship("Users", back_populates="company")
@@ -29,12 +54,12 @@ Company.departments = relationship("Department", back_populates="company")
 # User Model
 class Users(Base):
     __tablename__ = "users"
-    user_id = Column(String, primary_key=True, default= lambda: str(uuid.uuid4()))
+    user_id = Column(UUIDKey, primary_key=True, default=uuid7)
     #username = Column(String,nullable=False)
     email = Column(String, nullable=True)  # Add email field
     hashed_password = Column(String, nullable=False)
     role = Column(String, default="employee")  # Store role in DB (employee/hr/etc.)
-    company_id = Column(String, ForeignKey("companies.id"), nullable=False)
+    company_id = Column(UUIDKey, ForeignKey("companies.id"), nullable=False)
 
     company = relationship("Company", back_populates="users")
     videos = relationship("Video", back_populates="user")
@@ -42,46 +67,197 @@ class Users(Base):
 
 class Video(Base):
     __tablename__ = 'videos'
-    video_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey('users.user_id'), nullable=False)
+    # Range-partitioned by month on PostgreSQL (see core/partitions.py). The partition
+    # key has to be part of the primary key, so video_id alone is not DB-unique here
+    # (VideoKey keeps it unique); tables pointing at a video keep the relationship in
+    # the ORM only.
+    __table_args__ = {"postgresql_partition_by": "RANGE (upload_timestamp)"}
+
+    video_id = Column(UUIDKey, primary_key=True, default=uuid7)
+    user_id = Column(UUIDKey, ForeignKey('users.user_id'), nullable=False)
     gcs_url = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
-    upload_timestamp = Column(DateTime, default=datetime.utcnow)
+    upload_timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
     is_processed = Column(Boolean, default=False)
+    trace_context = Column(String, nullable=True)  # W3C traceparent of the upload, continued by processing
     
     user = relationship("Users", back_populates="videos")
-    predictions = relationship("Prediction", back_populates="video")
+    emotions = relationship(
+        "VideoEmotion",
+        primaryjoin="Video.video_id == foreign(VideoEmotion.video_id)",
+        back_populates="video",
+        uselist=False,
+    )
     
     
+class VideoKey(Base):
+    __tablename__ = "video_keys"
+    # One row per video, written with it. Not partitioned, so video_id is unique
+    # here, and upload_timestamp lets a lookup by id prune to one videos partition.
+    video_id = Column(UUIDKey, primary_key=True)
+    upload_timestamp = Column(DateTime, nullable=False)
+
+
+def video_id_filter(db, video_id: str) -> list:
+    """
+    Criteria selecting one video by id. With the upload_timestamp from
+    video_keys PostgreSQL only reads that month's partition; without a key row
+    (not back-filled yet) every partition is searched.
+    """
+    uploaded = db.query(VideoKey.upload_timestamp).filter(VideoKey.video_id == video_id).scalar()
+    criteria = [Video.video_id == video_id]
+    if uploaded is not None:
+        criteria.append(Video.upload_timestamp == uploaded)
+    return criteria
+
+
 class Prediction(Base):
+    # Legacy one-row-per-(video, emotion) storage, superseded by VideoEmotion.
+    # Kept for reading videos that have not been migrated yet.
     __tablename__ = 'predictions'
     
-    prediction_id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    video_id = Column(String, ForeignKey('videos.video_id'), nullable=False)
+    prediction_id = Column(UUIDKey, primary_key=True, default=uuid7)
+    video_id = Column(UUIDKey, nullable=False)
     emotion_label = Column(String, nullable=False)  # e.g., "stress", "happy", "neutral"
     score = Column(Float, nullable=False)  # Confidence score for the emotion
     created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship: Many Predictions belong to One Video
-    video = relationship("Video", back_populates="predictions")
+
+
+class VideoEmotion(Base):
+    __tablename__ = "video_emotions"
+    # Range-partitioned by month on PostgreSQL, so created_at-bounded dashboard
+    # queries only touch the months they ask for
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    # One row per processed video; score columns follow core.emotions.STANDARD_EMOTIONS
+    # (NULL = emotion not predicted for this video)
+    video_id = Column(UUIDKey, primary_key=True)
+    stress = Column(Float, nullable=True)
+    anxiety = Column(Float, nullable=True)
+    fatigue = Column(Float, nullable=True)
+    happiness = Column(Float, nullable=True)
+    neutral = Column(Float, nullable=True)
+    anger = Column(Float, nullable=True)
+    surprise = Column(Float, nullable=True)
+    top_emotion = Column(String, nullable=True)
+    top_score = Column(Float, nullable=True)
+    model_version = Column(String, nullable=True)  # model that produced the scores
+    frames_used = Column(Integer, nullable=True)  # frames the model scored (adaptive sampling)
+    model_predictions = Column(Text, nullable=True)  # JSON {label: score} as the model returned it, unmapped labels included
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    video = relationship(
+        "Video",
+        primaryjoin="foreign(VideoEmotion.video_id) == Video.video_id",
+        back_populates="emotions",
+        uselist=False,
+    )
+
+    @classmethod
+    def score_columns(cls):
+        return [getattr(cls, e) for e in STANDARD_EMOTIONS]
+
+    def scores(self) -> dict:
+        """Predicted emotions as {standard_emotion: score}."""
+        return {e: getattr(self, e) for e in STANDARD_EMOTIONS if getattr(self, e) is not None}
     
 
 class Department(Base):
     __tablename__ = "departments"
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDKey, primary_key=True, default=uuid7)
     name = Column(String, unique=True, nullable=False)
     description = Column(String, nullable=True)
-    company_id = Column(String, ForeignKey("companies.id"), nullable=True)
+    company_id = Column(UUIDKey, ForeignKey("companies.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relationship with Company
     company = relationship("Company", back_populates="departments")
 
 
+class CompanyDataVersion(Base):
+    __tablename__ = "company_data_versions"
+
+    # Bumped whenever a company's videos or predictions change; backs dashboard ETags
+    company_id = Column(UUIDKey, ForeignKey("companies.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class EmotionSketch(Base):
+    __tablename__ = "emotion_sketches"
+
+    # Mergeable score sketch per (company, standard emotion, prediction day)
+    company_id = Column(UUIDKey, ForeignKey("companies.id"), primary_key=True)
+    emotion = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    sketch = Column(Text, nullable=False)  # JSON-encoded ScoreSketch
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CompanyRetention(Base):
+    __tablename__ = "company_retention"
+
+    # Raw video_emotions rows older than raw_retention_days are folded into the daily
+    # emotion_sketches and purged; readers use the sketches for days <= compacted_through
+    company_id = Column(UUIDKey, ForeignKey("companies.id"), primary_key=True)
+    raw_retention_days = Column(Integer, nullable=True)  # NULL = settings.RAW_RETENTION_DAYS
+    compacted_through = Column(Date, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class InferenceJob(Base):
+    __tablename__ = "inference_jobs"
+    # Videos handed to inference worker nodes (INFERENCE_MODE=remote, see
+    # core/inference_worker.py); the row is deleted once the video is processed
+    __table_args__ = (Index("ix_inference_jobs_lane_enqueued", "lane", "enqueued_at"),)
+
+    video_id = Column(UUIDKey, primary_key=True)
+    company_id = Column(UUIDKey, nullable=False)
+    lane = Column(String, nullable=False)
+    enqueued_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    request_id = Column(String, nullable=True)  # correlation id of the submitter
+    trace_context = Column(String, nullable=True)  # traceparent the processing continues
+    claimed_by = Column(String, nullable=True)  # worker id holding the lease
+    claimed_at = Column(DateTime, nullable=True)  # lease start / last renewal
+
+
+class VideoProcessing(Base):
+    __tablename__ = "video_processing"
+    # One row per video that processing was attempted for (core/processing_state.py).
+    # Not partitioned, so video_id is unique here and serializes attempts on a video.
+    video_id = Column(UUIDKey, primary_key=True)
+    status = Column(String, nullable=False)  # running | failed | dead | done
+    attempts = Column(Integer, nullable=False, default=0)
+    attempt_id = Column(String, nullable=True)  # token of the running attempt
+    started_at = Column(DateTime, nullable=True)  # of the latest attempt
+    next_attempt_at = Column(DateTime, nullable=True)  # failed: earliest retry
+    last_error = Column(Text, nullable=True)
+    model_version = Column(String, nullable=True)  # done: model that produced the stored scores
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+def create_tables() -> bool:
+    """
+    Create missing tables. A table whose DDL fails (typically a new table that
+    references keys a pending migration still has to convert) is skipped with a
+    warning; Database/migrations.py creates it after migrating. Returns whether
+    the database was empty, i.e. built from the current models with nothing
+    to migrate.
+    """
+    empty = not inspect(engine).has_table("companies")
+    for table in Base.metadata.sorted_tables:
+        try:
+            table.create(bind=engine, checkfirst=True)
+        except SQLAlchemyError as e:
+            logger.warning("Skipped creating table %s; run `python -m Database.migrations` (%s)",
+                           table.name, e.__class__.__name__)
+    return empty
+
 
-# Create tables
-Base.metadata.create_all(engine)
+# Create tables; Database/migrations.py stamps a database created here as migrated
+created_empty = create_tables()
 
 def get_db():
     """Dependency to get database session"""
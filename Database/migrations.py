@@ -0,0 +1,393 @@
+"""
+Ordered data/schema migrations on top of Base.metadata.create_all.
+
+create_all only creates missing tables; anything that reshapes existing data
+lives here. Applied migrations are recorded in `schema_migrations`.
+
+    python -m Database.migrations
+    python -m Database.migrations --purge-predictions   # once migration 8 checks out
+"""
+import argparse
+import json
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, String, bindparam, func, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.company_stats import ensure_company_stats_view
+from core.emotions import STANDARD_EMOTIONS, map_emotion, top_of_vector
+from core.log import get_logger
+from core.partitions import PARTITIONED_TABLES, add_months, create_partition, ensure_partitions, month_start
+from Database.database import Base, SessionLocal, VideoKey, create_tables, created_empty, engine
+
+logger = get_logger(__name__)
+
+MIGRATION_BATCH_SIZE = 1000
+
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    applied_at = Column(DateTime, default=datetime.utcnow)
+
+
+def _is_partitioned(db: Session, table: str) -> bool:
+    return db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :table"
+    ), {"table": table}).first() is not None
+
+
+def migrate_predictions_to_video_emotions(db: Session) -> None:
+    """
+    Fold legacy one-row-per-emotion predictions into one video_emotions row per
+    video. The prediction rows stay (labels with no standard emotion only live
+    there until migration 8 copies them); see purge_migrated_predictions.
+    Works in batches of videos and commits per batch, so it can be interrupted
+    and re-run.
+
+    Plain SQL rather than the models: the keys are still the legacy varchar
+    ids here (migration 2 converts them), and video_emotions may already have
+    been created from the current model, with uuid keys and monthly partitions.
+    """
+    postgresql = engine.dialect.name == "postgresql"
+    if postgresql and _is_partitioned(db, "video_emotions"):
+        # create_tables() only adds partitions from this month on
+        first = db.execute(text("SELECT min(created_at) FROM predictions")).scalar()
+        month = month_start(first.date() if first else datetime.utcnow().date())
+        while month <= datetime.utcnow().date():
+            create_partition(db.connection(), "video_emotions", month)
+            month = add_months(month, 1)
+        db.commit()
+
+    pending_videos = text(
+        "SELECT p.video_id FROM predictions p WHERE NOT EXISTS ("
+        "SELECT 1 FROM video_emotions ve WHERE CAST(ve.video_id AS VARCHAR) = CAST(p.video_id AS VARCHAR)) "
+        "GROUP BY p.video_id LIMIT :limit"
+    )
+    video_predictions = text(
+        "SELECT video_id, emotion_label, score, created_at FROM predictions WHERE video_id IN :video_ids"
+    ).bindparams(bindparam("video_ids", expanding=True)).columns(created_at=DateTime)
+    columns = ["video_id", "top_emotion", "top_score", "created_at", *STANDARD_EMOTIONS]
+    insert_video_emotion = text("INSERT INTO video_emotions ({}) VALUES ({})".format(
+        ", ".join(columns), ", ".join(f":{c}" for c in columns)))
+
+    migrated = 0
+    while True:
+        video_ids = db.execute(pending_videos, {"limit": MIGRATION_BATCH_SIZE}).scalars().all()
+        if not video_ids:
+            break
+
+        grouped = {}
+        for video_id, label, score, created_at in db.execute(video_predictions, {"video_ids": video_ids}):
+            scores, latest = grouped.setdefault(video_id, ({}, None))
+            std = map_emotion(label)
+            if std in STANDARD_EMOTIONS:
+                scores[std] = float(score)
+            if created_at and (latest is None or created_at > latest):
+                grouped[video_id] = (scores, created_at)
+
+        rows = []
+        for video_id, (scores, created_at) in grouped.items():
+            top_emotion, top_score = top_of_vector([scores.get(e) for e in STANDARD_EMOTIONS])
+            rows.append({"video_id": video_id, "top_emotion": top_emotion, "top_score": top_score,
+                         "created_at": created_at or datetime.utcnow(),
+                         **{e: scores.get(e) for e in STANDARD_EMOTIONS}})
+        db.execute(insert_video_emotion, rows)
+        db.commit()
+        migrated += len(video_ids)
+        logger.info("Migrated %d videos", migrated)
+
+    if postgresql:
+        # The company_stats view used to read `predictions`; run_migrations recreates it
+        db.execute(text("DROP MATERIALIZED VIEW IF EXISTS company_stats"))
+        db.commit()
+
+
+UUID_KEY_COLUMNS = [
+    ("companies", "id"),
+    ("users", "user_id"),
+    ("users", "company_id"),
+    ("videos", "video_id"),
+    ("videos", "user_id"),
+    ("predictions", "prediction_id"),
+    ("predictions", "video_id"),
+    ("video_emotions", "video_id"),
+    ("departments", "id"),
+    ("departments", "company_id"),
+    ("company_data_versions", "company_id"),
+    ("emotion_sketches", "company_id"),
+]
+
+
+def migrate_string_keys_to_uuid(db: Session) -> None:
+    """
+    Convert varchar uuid4 keys to native UUID columns. Existing ids keep their
+    values; only rows inserted afterwards get time-ordered (v7) keys.
+
+    PostgreSQL: foreign keys and the company_stats view are dropped, the
+    columns retyped in one transaction, and everything recreated.
+    Elsewhere the key is stored as 32-char hex, so the dashes are stripped.
+    """
+    if engine.dialect.name != "postgresql":
+        for table, column in UUID_KEY_COLUMNS:
+            db.execute(text(f"UPDATE {table} SET {column} = replace({column}, '-', '')"))
+        db.commit()
+        return
+
+    inspector = inspect(engine)
+    pending = [
+        (table, column) for table, column in UUID_KEY_COLUMNS
+        if inspector.has_table(table)
+        and next(c for c in inspector.get_columns(table) if c["name"] == column)["type"].__visit_name__ != "UUID"
+    ]
+    if not pending:
+        return
+
+    tables = {table for table, _ in UUID_KEY_COLUMNS if inspector.has_table(table)}
+    foreign_keys = [(table, fk) for table in tables for fk in inspector.get_foreign_keys(table)]
+
+    db.execute(text("DROP MATERIALIZED VIEW IF EXISTS company_stats"))
+    for table, fk in foreign_keys:
+        db.execute(text('ALTER TABLE {} DROP CONSTRAINT "{}"'.format(table, fk["name"])))
+    for table, column in pending:
+        db.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE uuid USING {column}::uuid"))
+    for table, fk in foreign_keys:
+        db.execute(text('ALTER TABLE {} ADD CONSTRAINT "{}" FOREIGN KEY ({}) REFERENCES {} ({})'.format(
+            table, fk["name"], ", ".join(fk["constrained_columns"]),
+            fk["referred_table"], ", ".join(fk["referred_columns"]),
+        )))
+    db.commit()
+
+
+def migrate_partition_by_month(db: Session) -> None:
+    """
+    Rebuild videos and video_emotions as monthly RANGE-partitioned tables
+    (PostgreSQL only). Each table is renamed aside, recreated from the model,
+    given partitions for every month that has data, refilled and dropped.
+    Foreign keys pointing at videos are removed: the partitioned primary key
+    includes upload_timestamp, so video_id alone cannot be referenced.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    inspector = inspect(engine)
+    old_columns = {table: {c["name"] for c in inspector.get_columns(table)} for table in PARTITIONED_TABLES}
+    db.execute(text("DROP MATERIALIZED VIEW IF EXISTS company_stats"))
+    for table in ("predictions", "video_emotions"):
+        for fk in inspector.get_foreign_keys(table):
+            if fk["referred_table"] == "videos":
+                db.execute(text('ALTER TABLE {} DROP CONSTRAINT "{}"'.format(table, fk["name"])))
+
+    for table, key in PARTITIONED_TABLES.items():
+        if _is_partitioned(db, table):
+            continue
+
+        old = f"{table}_unpartitioned"
+        db.execute(text(f"ALTER TABLE {table} RENAME TO {old}"))
+        pkey = inspector.get_pk_constraint(table)["name"]
+        if pkey:
+            db.execute(text(f'ALTER TABLE {old} RENAME CONSTRAINT "{pkey}" TO "{old}_pkey"'))
+        db.execute(text(f"UPDATE {old} SET {key} = now() WHERE {key} IS NULL"))
+
+        model_table = Base.metadata.tables[table]
+        model_table.create(bind=db.connection())
+        first, last = db.execute(text(f"SELECT min({key}), max({key}) FROM {old}")).first()
+        if first is not None:
+            month = month_start(first.date())
+            while month <= last.date():
+                create_partition(db.connection(), table, month)
+                month = add_months(month, 1)
+
+        # Columns added by later migrations don't exist in the old table yet
+        columns = ", ".join(c.name for c in model_table.columns if c.name in old_columns[table])
+        db.execute(text(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {old}"))
+        db.execute(text(f"DROP TABLE {old}"))
+        logger.info("Partitioned %s", table)
+
+    db.commit()
+
+
+def drop_company_stats_view(db: Session) -> None:
+    """Drop company_stats after its definition changed; run_migrations recreates it."""
+    if engine.dialect.name != "postgresql":
+        return
+    db.execute(text("DROP MATERIALIZED VIEW IF EXISTS company_stats"))
+    db.commit()
+
+
+def add_video_trace_context(db: Session) -> None:
+    """Add videos.trace_context (nullable; on PostgreSQL the partitions inherit it)."""
+    if "trace_context" in {c["name"] for c in inspect(engine).get_columns("videos")}:
+        return
+    db.execute(text("ALTER TABLE videos ADD COLUMN trace_context VARCHAR"))
+    db.commit()
+
+
+def add_model_version_dedupe_video_emotions(db: Session) -> None:
+    """
+    Add video_emotions.model_version and drop duplicate rows left by videos
+    that were processed more than once (the newest row per video stays).
+    """
+    if "model_version" not in {c["name"] for c in inspect(engine).get_columns("video_emotions")}:
+        db.execute(text("ALTER TABLE video_emotions ADD COLUMN model_version VARCHAR"))
+    removed = db.execute(text(
+        "DELETE FROM video_emotions WHERE EXISTS ("
+        "SELECT 1 FROM video_emotions newer WHERE newer.video_id = video_emotions.video_id "
+        "AND newer.created_at > video_emotions.created_at)"
+    )).rowcount
+    db.commit()
+    if removed:
+        logger.info("Removed %d duplicate video_emotions rows", removed)
+
+
+def add_video_emotions_frames_used(db: Session) -> None:
+    """Add video_emotions.frames_used (NULL for videos processed before adaptive sampling)."""
+    if "frames_used" in {c["name"] for c in inspect(engine).get_columns("video_emotions")}:
+        return
+    db.execute(text("ALTER TABLE video_emotions ADD COLUMN frames_used INTEGER"))
+    db.commit()
+
+
+def add_video_emotions_model_predictions(db: Session) -> None:
+    """
+    Add video_emotions.model_predictions and fill it for migrated videos from
+    their legacy prediction rows, so labels with no standard emotion survive.
+    """
+    if "model_predictions" not in {c["name"] for c in inspect(engine).get_columns("video_emotions")}:
+        db.execute(text("ALTER TABLE video_emotions ADD COLUMN model_predictions TEXT"))
+        db.commit()
+
+    pending_videos = text(
+        "SELECT ve.video_id FROM video_emotions ve WHERE ve.model_predictions IS NULL AND EXISTS ("
+        "SELECT 1 FROM predictions p WHERE CAST(p.video_id AS VARCHAR) = CAST(ve.video_id AS VARCHAR)) "
+        "LIMIT :limit"
+    )
+    video_predictions = text(
+        "SELECT video_id, emotion_label, score FROM predictions WHERE video_id IN :video_ids ORDER BY created_at"
+    ).bindparams(bindparam("video_ids", expanding=True))
+    update_video_emotion = text("UPDATE video_emotions SET model_predictions = :raw WHERE video_id = :video_id")
+
+    filled = 0
+    while True:
+        video_ids = db.execute(pending_videos, {"limit": MIGRATION_BATCH_SIZE}).scalars().all()
+        if not video_ids:
+            break
+        grouped = {}
+        for video_id, label, score in db.execute(video_predictions, {"video_ids": video_ids}):
+            grouped.setdefault(video_id, {})[label] = float(score)
+        db.execute(update_video_emotion, [
+            {"video_id": video_id, "raw": json.dumps(predictions)} for video_id, predictions in grouped.items()
+        ])
+        db.commit()
+        filled += len(video_ids)
+        logger.info("Copied model predictions of %d videos", filled)
+
+
+def purge_migrated_predictions(db: Session) -> int:
+    """
+    Delete legacy prediction rows of videos whose video_emotions row holds the
+    full model output. Opt-in (--purge-predictions): run it once the migrated
+    rows have been checked. Returns how many rows were deleted.
+    """
+    purge = text(
+        "DELETE FROM predictions WHERE video_id IN ("
+        "SELECT ve.video_id FROM video_emotions ve WHERE ve.model_predictions IS NOT NULL)"
+    )
+    deleted = db.execute(purge).rowcount
+    db.commit()
+    return deleted
+
+
+def add_video_keys(db: Session) -> None:
+    """
+    Fill video_keys (video_id -> upload_timestamp) for existing videos: it keeps
+    video_id unique and lets lookups by id prune to one videos partition.
+    """
+    VideoKey.__table__.create(bind=db.connection(), checkfirst=True)
+    added = db.execute(text(
+        "INSERT INTO video_keys (video_id, upload_timestamp) "
+        "SELECT v.video_id, min(v.upload_timestamp) FROM videos v "
+        "WHERE v.upload_timestamp IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM video_keys k WHERE k.video_id = v.video_id) "
+        "GROUP BY v.video_id"
+    )).rowcount
+    db.commit()
+    logger.info("Added %d video keys", added)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Session], None]]] = [
+    (1, "predictions_to_video_emotions", migrate_predictions_to_video_emotions),
+    (2, "string_keys_to_uuid", migrate_string_keys_to_uuid),
+    (3, "partition_by_month", migrate_partition_by_month),
+    (4, "company_stats_compacted_stress", drop_company_stats_view),
+    (5, "video_trace_context", add_video_trace_context),
+    (6, "video_emotions_model_version_dedupe", add_model_version_dedupe_video_emotions),
+    (7, "video_emotions_frames_used", add_video_emotions_frames_used),
+    (8, "video_emotions_model_predictions", add_video_emotions_model_predictions),
+    (9, "video_keys", add_video_keys),
+]
+
+
+def schema_is_current() -> bool:
+    """
+    Whether every migration has been applied, so partition and view DDL may
+    run against the current models. A database create_tables() just built
+    from scratch has nothing to migrate and is stamped as such.
+    """
+    SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        current = db.query(func.max(SchemaMigration.version)).scalar() or 0
+        if current == 0 and created_empty:
+            db.add_all(SchemaMigration(version=version, name=name) for version, name, _ in MIGRATIONS)
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another process stamped it first
+            return True
+        return current >= MIGRATIONS[-1][0]
+    finally:
+        db.close()
+
+
+def run_migrations(db: Session) -> int:
+    """Apply pending migrations in order. Returns how many were applied."""
+    SchemaMigration.__table__.create(bind=engine, checkfirst=True)
+    current = db.query(func.max(SchemaMigration.version)).scalar() or 0
+
+    applied = 0
+    for version, name, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info("Applying migration %d: %s", version, name)
+        migrate(db)
+        db.add(SchemaMigration(version=version, name=name))
+        db.commit()
+        applied += 1
+
+    # Tables, partitions and the stats view that depend on the migrated schema
+    create_tables()
+    ensure_partitions()
+    ensure_company_stats_view()
+    return applied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--purge-predictions", action="store_true",
+                        help="Then delete legacy prediction rows already copied to video_emotions")
+    args = parser.parse_args()
+
+    session = SessionLocal()
+    try:
+        count = run_migrations(session)
+        print(f"✅ Applied {count} migration(s)")
+        if args.purge_predictions:
+            print(f"✅ Deleted {purge_migrated_predictions(session)} legacy prediction row(s)")
+    finally:
+        session.close()
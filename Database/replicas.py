@@ -0,0 +1,146 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS lists read replicas (comma separated). Read-only routes
+take their session from auth.dependencies.get_read_db, which picks a healthy
+replica unless the user wrote something in the last READ_YOUR_WRITES_SECONDS
+(then the read stays on the primary so it sees its own write). Replicas are
+checked every REPLICA_HEALTH_INTERVAL_SECONDS; one lagging more than
+REPLICA_MAX_LAG_SECONDS, or unreachable, is skipped until it catches up. With
+no healthy replica every read goes to the primary.
+
+Read-your-writes pins live in this process only; keep the lag limit well
+under the pin window when running several workers.
+"""
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.log import get_logger
+from Database.database import SessionLocal
+
+logger = get_logger(__name__)
+
+# Every worker checks its replicas; "liveall" keeps one series per live worker under multiprocess metrics
+REPLICA_LAG_SECONDS = Gauge("db_replica_lag_seconds", "Replication lag at the last health check", ["replica"],
+                            multiprocess_mode="liveall")
+REPLICA_HEALTHY = Gauge("db_replica_healthy", "1 when the replica serves reads", ["replica"],
+                        multiprocess_mode="liveall")
+
+# Seconds behind the primary; 0 when the replica has replayed everything it received
+LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine: Engine = create_engine(url, pool_pre_ping=True)
+        os.register_at_fork(after_in_child=lambda: self.engine.dispose(close=False))
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+
+    def check(self) -> None:
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name == "postgresql":
+                    lag = float(conn.execute(LAG_SQL).scalar())
+                else:
+                    conn.execute(text("SELECT 1"))
+                    lag = 0.0
+        except Exception as e:
+            self._set_health(False, None, f"unreachable ({e.__class__.__name__})")
+            return
+        if lag > settings.REPLICA_MAX_LAG_SECONDS:
+            self._set_health(False, lag, f"lagging {lag:.1f}s")
+        else:
+            self._set_health(True, lag, None)
+
+    def _set_health(self, healthy: bool, lag: Optional[float], reason: Optional[str]) -> None:
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Replica back in rotation", extra={"replica": self.name, "lag_s": lag})
+            else:
+                logger.warning("Replica out of rotation: %s", reason, extra={"replica": self.name, "lag_s": lag})
+        self.healthy = healthy
+        self.lag_seconds = lag
+        REPLICA_HEALTHY.labels(self.name).set(1 if healthy else 0)
+        if lag is not None:
+            REPLICA_LAG_SECONDS.labels(self.name).set(lag)
+
+
+replicas: List[Replica] = [
+    Replica(url.strip()) for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+]
+
+# user id -> time.monotonic() until which that user's reads stay on the primary
+_pins: Dict[str, float] = {}
+_pins_lock = threading.Lock()
+
+
+def check_replicas() -> None:
+    """Refresh replica health and lag (scheduler job; also run once at startup)."""
+    for replica in replicas:
+        replica.check()
+
+
+def pick_replica() -> Optional[Replica]:
+    healthy = [r for r in replicas if r.healthy]
+    return random.choice(healthy) if healthy else None
+
+
+def pin_primary(key: str) -> None:
+    """Keep `key`'s reads on the primary for READ_YOUR_WRITES_SECONDS."""
+    now = time.monotonic()
+    with _pins_lock:
+        _pins[key] = now + settings.READ_YOUR_WRITES_SECONDS
+        if len(_pins) > 10000:
+            for stale in [k for k, until in _pins.items() if until <= now]:
+                del _pins[stale]
+
+
+def is_pinned(key: str) -> bool:
+    with _pins_lock:
+        until = _pins.get(key)
+    return until is not None and until > time.monotonic()
+
+
+def read_session(pin_key: Optional[str]) -> Optional[Session]:
+    """A session on a healthy replica, or None when the read must go to the primary."""
+    if pin_key is not None and is_pinned(pin_key):
+        return None
+    replica = pick_replica()
+    if replica is None:
+        return None
+    session = SessionLocal(bind=replica.engine)
+    session.info["replica"] = replica.name
+    return session
+
+
+# Primary sessions note ORM writes; on commit the session's user (get_current_user
+# stores it in session.info["pin_key"]) is pinned to the primary.
+@event.listens_for(SessionLocal, "after_flush")
+def _after_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _do_orm_execute(state):
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info["wrote"] = True
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False) and replicas and session.info.get("pin_key"):
+        pin_primary(session.info["pin_key"])
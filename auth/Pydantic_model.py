@@ -1,4 +1,7 @@
-from pydantic import BaseModel, EmailStr
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, EmailStr, Field
 
 class UserCreate(BaseModel):
     #username: str
@@ -36,4 +39,98 @@ class CreateVideo(BaseModel):
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
-    
\ No newline at end of file
+    
+
+
+class RetentionPolicy(BaseModel):
+    # Days of raw predictions to keep; older days are served from daily aggregates.
+    # None = server default (RAW_RETENTION_DAYS), 0 = keep raw predictions forever
+    raw_retention_days: Optional[int] = Field(None, ge=0)
+
+
+class BulkEmployee(BaseModel):
+    email: EmailStr
+    password: Optional[str] = Field(None, min_length=1)  # None = send an invite instead
+
+
+class BulkEmployeeImport(BaseModel):
+    # Validated row by row (as BulkEmployee) so one bad row doesn't reject the import
+    employees: List[Dict[str, Any]]
+
+
+class AcceptInvite(BaseModel):
+    token: str
+    password: str = Field(..., min_length=1)
+
+
+# Response models: serialized by pydantic-core instead of FastAPI's generic jsonable_encoder
+
+class VideoItem(BaseModel):
+    video_id: str
+    gcs_url: str
+    original_filename: str
+    upload_timestamp: Optional[datetime] = None
+    is_processed: Optional[bool] = None
+
+
+class EmployeeItem(BaseModel):
+    user_id: str
+    email: Optional[str] = None
+    role: str
+    last_video_id: Optional[str] = None
+    last_prediction: Optional[Dict[str, float]] = None
+    top_emotion: Optional[str] = None
+    top_score: Optional[float] = None
+
+
+class EmployeePage(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    items: List[EmployeeItem]
+
+
+class EmployeeVideo(BaseModel):
+    video_id: str
+    uploaded_at: Optional[datetime] = None
+    is_processed: Optional[bool] = None
+    predictions: Dict[str, float]
+    top_emotion: Optional[str] = None
+    top_score: Optional[float] = None
+
+
+class EmployeeDetail(BaseModel):
+    user_id: str
+    email: Optional[str] = None
+    history: List[EmployeeVideo]
+
+
+class TrendPoint(BaseModel):
+    date: str
+    stress: float
+    anxiety: float
+    fatigue: float
+    happiness: float
+    neutral: float
+    anger: float
+    surprise: float
+
+
+class EmotionTrend(BaseModel):
+    series: List[TrendPoint]
+
+
+class DepartmentItem(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    company_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class EmployeeDepartments(BaseModel):
+    total_employees: int
+    departments: List[DepartmentItem]
@@ -0,0 +1,101 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from auth.Pydantic_model import BulkEmployee
+from core.config import settings
+from core.security import create_invite_token, hash_password, unusable_password
+from Database.database import Users, uuid7
+
+# Emails per duplicate-check query (keeps the IN list under bind-parameter limits)
+EMAIL_CHECK_CHUNK = 5000
+
+# bcrypt releases the GIL while hashing, so a thread pool spreads the work over every core
+_hash_pool = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+
+
+def parse_csv(content: bytes) -> List[Dict[str, Optional[str]]]:
+    """Rows of an "email[,password]" CSV with a header line."""
+    reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    if not reader.fieldnames or "email" not in [f.strip().lower() for f in reader.fieldnames]:
+        raise ValueError("CSV needs a header row with an 'email' column")
+    return [
+        {(k or "").strip().lower(): (v.strip() if isinstance(v, str) and v.strip() else None) for k, v in row.items()}
+        for row in reader
+    ]
+
+
+def existing_emails(db: Session, emails: List[str]) -> set:
+    found = set()
+    for start in range(0, len(emails), EMAIL_CHECK_CHUNK):
+        chunk = emails[start:start + EMAIL_CHECK_CHUNK]
+        found.update(e for (e,) in db.query(Users.email).filter(Users.email.in_(chunk)))
+    return found
+
+
+def bulk_create_employees(db: Session, company_id: str, rows: List[Dict], dry_run: bool = False) -> Dict:
+    """
+    Validate and create employees of a company in one transaction.
+
+    Rows with a password get it hashed (in parallel); rows without one are created
+    with an unusable password and get an invite token to set it via
+    /auth/accept-invite. Invalid rows and emails that already exist (in the
+    database or earlier in the file) are skipped and reported by 1-based row number.
+    """
+    errors = []
+    valid: List[tuple] = []  # (row number, BulkEmployee)
+    seen = set()
+    for number, row in enumerate(rows, start=1):
+        try:
+            employee = BulkEmployee.model_validate(row)
+        except ValidationError as e:
+            errors.append({"row": number, "email": row.get("email"), "error": e.errors()[0]["msg"]})
+            continue
+        if employee.email in seen:
+            errors.append({"row": number, "email": employee.email, "error": "Duplicate email in import"})
+            continue
+        seen.add(employee.email)
+        valid.append((number, employee))
+
+    taken = existing_emails(db, [e.email for _, e in valid])
+    to_create = []
+    for number, employee in valid:
+        if employee.email in taken:
+            errors.append({"row": number, "email": employee.email, "error": "Email already registered"})
+        else:
+            to_create.append(employee)
+    errors.sort(key=lambda e: e["row"])
+
+    report = {"valid": len(to_create), "created": 0, "invited": 0, "errors": errors, "invites": []}
+    if dry_run or not to_create:
+        return report
+
+    with_password = [e for e in to_create if e.password]
+    hashes = dict(zip(
+        (e.email for e in with_password),
+        _hash_pool.map(hash_password, (e.password for e in with_password)),
+    ))
+
+    db.execute(insert(Users), [
+        {
+            "user_id": uuid7(),
+            "email": e.email,
+            "hashed_password": hashes.get(e.email) or unusable_password(),
+            "role": "employee",
+            "company_id": company_id,
+        }
+        for e in to_create
+    ])
+    db.commit()
+
+    report["created"] = len(to_create)
+    report["invited"] = len(to_create) - len(with_password)
+    report["invites"] = [
+        {"email": e.email, "invite_token": create_invite_token(e.email)} for e in to_create if not e.password
+    ]
+    return report
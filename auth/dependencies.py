@@ -3,6 +3,7 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from sqlalchemy.orm import Session
 from Database.database import Users,SessionLocal
+from Database.replicas import read_session
 from core.security import decode_access_token
 from core.VideoUploader import VideoUploader
 # OAuth2 scheme
@@ -30,6 +31,20 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
+    # Writes committed on this session pin the user's next reads to the primary
+    db.info["pin_key"] = user.user_id
     return user
 
+# Dependency: DB session for read-only routes (a replica when one is healthy and
+# the user has no recent write; otherwise the request's primary session)
+def get_read_db(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    replica_db = read_session(user.user_id)
+    if replica_db is None:
+        yield db
+        return
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
+
 uploader = VideoUploader()
\ No newline at end of file
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from sqlalchemy.orm import Session
 from auth import Pydantic_model, utils
-from auth.dependencies import get_db
+from auth.bulk_import import bulk_create_employees, parse_csv
+from auth.dependencies import get_current_user, get_db
+from core.config import settings
 from Database.database import Users,Company
 from core.security import create_access_token
 router = APIRouter()
@@ -84,3 +88,43 @@ def login_hr(user: Pydantic_model.HRLogin, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during HR login. Please try again."
         )
+
+
+def _import_employees(db: Session, user: Users, rows: List[Dict], dry_run: bool):
+    if user.role != "hr":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="HR role required")
+    if len(rows) > settings.BULK_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.BULK_IMPORT_MAX_ROWS} employees per import",
+        )
+    return bulk_create_employees(db, user.company_id, rows, dry_run=dry_run)
+
+
+@router.post("/employees/bulk")
+def bulk_import_employees(
+    payload: Pydantic_model.BulkEmployeeImport,
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user),
+):
+    """
+    Create many employees of the HR's company in one transaction. Rows without a
+    password get an invite token instead. Returns per-row errors; dry_run only validates.
+    """
+    return _import_employees(db, user, payload.employees, dry_run)
+
+
+@router.post("/employees/bulk/csv")
+def bulk_import_employees_csv(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user),
+):
+    """Same as /hr/employees/bulk from a CSV with an "email" and optional "password" column."""
+    try:
+        rows = parse_csv(file.file.read())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid CSV: {e}")
+    return _import_employees(db, user, rows, dry_run)
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from .Pydantic_model import UserCreate, Token, UserResponse, LoginRequest
+from .Pydantic_model import UserCreate, Token, UserResponse, LoginRequest, AcceptInvite
 from auth.utils import create_user, authenticate_user, get_company_by_name
 from auth.dependencies import get_db
-from core.security import create_access_token
+from core.security import UNUSABLE_PASSWORD_PREFIX, create_access_token, decode_invite_token, hash_password
 from Database.database import Users
 
 router = APIRouter()
@@ -76,3 +76,18 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred during login. Please try again."
         )
+
+
+# Accept an invite from a bulk import: set the password and log in
+@router.post("/accept-invite", response_model=Token)
+def accept_invite(invite: AcceptInvite, db: Session = Depends(get_db)):
+    email = decode_invite_token(invite.token)
+    user = db.query(Users).filter(Users.email == email).first() if email else None
+    # Only users still waiting for their first password can use an invite
+    if user is None or not user.hashed_password.startswith(UNUSABLE_PASSWORD_PREFIX):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid or expired invite")
+
+    user.hashed_password = hash_password(invite.password)
+    db.commit()
+    token_data = {"sub": user.email, "role": user.role, "company_id": user.company_id}
+    return {"access_token": create_access_token(token_data), "token_type": "bearer"}
@@ -0,0 +1,55 @@
+import os
+import random
+from typing import Dict
+
+# CPU milliseconds the fake model backend spends per scored frame (0 = none)
+FAKE_FRAME_MS = float(os.getenv("BENCH_MODEL_FRAME_MS", 0))
+
+MODEL_LABELS = ["happy", "sad", "angry", "stressed", "neutral", "excited", "calm", "frustrated"]
+
+
+class FakeBlob:
+    def __init__(self, name: str):
+        self.name = name
+
+    def generate_signed_url(self, version="v4", expiration=None, method="GET", **kwargs) -> str:
+        return f"https://storage.invalid/bench/{self.name}?method={method}&sig=fake"
+
+    def upload_from_file(self, file_obj, content_type=None) -> None:
+        while file_obj.read(1 << 20):
+            pass
+
+
+class FakeBucket:
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(name)
+
+
+class FakeStorageClient:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def bucket(self, name: str) -> FakeBucket:
+        return FakeBucket()
+
+
+def fake_predictions() -> Dict[str, float]:
+    """Same predictions shape as core.AI_Service.EmotionModel: three labels with scores summing to 1."""
+    scores = [random.uniform(0.1, 0.4) for _ in range(3)]
+    total = sum(scores)
+    labels = random.sample(MODEL_LABELS, 3)
+    return {label: round(score / total, 3) for label, score in zip(labels, scores)}
+
+
+def install_fakes() -> None:
+    """
+    Swap Google Cloud Storage for an in-process stand-in and run the emotion
+    model on the fake backend. Call before importing `main` (the uploader
+    builds its storage client at import).
+    """
+    import core.VideoUploader
+    from core.config import settings
+
+    core.VideoUploader.storage.Client = FakeStorageClient
+    settings.MODEL_BACKEND = "fake"
+    settings.MODEL_FAKE_FRAME_MS = FAKE_FRAME_MS
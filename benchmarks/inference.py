@@ -0,0 +1,103 @@
+"""
+Videos per second of one inference process for combinations of worker
+threads (INFERENCE_WORKERS) and intra-op threads per model call
+(MODEL_INTRA_OP_THREADS), to pick the cores per worker on CPU-only nodes.
+Model load and warmup are not timed. No database needed.
+
+    python -m benchmarks.inference --threads 1 2 4 --intra-op 1 2 4 --frame-ms 2
+    python -m benchmarks.inference --backend onnx --model model.int8.onnx --video clips/*.mp4 \
+        --threads 1 2 --intra-op 1 2 4 --out inference.json
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import core.AI_Service as ai
+from core.model_backends import create_backend
+
+
+def run_combination(backend_name: str, threads: int, intra_op: int, urls: List[str],
+                    model_path: str, frame_ms: float) -> Dict:
+    ai.load_model(create_backend(backend_name, intra_op_threads=intra_op, model_path=model_path, frame_ms=frame_ms))
+
+    def timed(url: str):
+        start = time.perf_counter()
+        output = ai.EmotionModel(url)
+        return time.perf_counter() - start, output.frames_used
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(timed, urls))
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu_start
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "threads": threads,
+        "intra_op": intra_op,
+        "cores_used": round(cpu / elapsed, 2),
+        "videos_per_s": round(len(urls) / elapsed, 2),
+        "p50_s": round(latencies[len(latencies) // 2], 4),
+        "p95_s": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4),
+        "cpu_s_per_video": round(cpu / len(urls), 4),
+        "avg_frames": round(statistics.mean(frames for _, frames in results), 1),
+    }
+
+
+def run(backend_name: str, threads: List[int], intra_op: List[int], urls: List[str],
+        model_path: str, frame_ms: float) -> Dict:
+    rows = [run_combination(backend_name, t, i, urls, model_path, frame_ms) for t in threads for i in intra_op]
+    ai.unload_model()
+    return {
+        "backend": backend_name,
+        "cpu_count": os.cpu_count(),
+        "videos": len(urls),
+        "frame_ms": frame_ms if backend_name == "fake" else None,
+        "results": rows,
+        "best": max(rows, key=lambda row: row["videos_per_s"]),
+    }
+
+
+def print_report(result: Dict) -> None:
+    print(f"{result['backend']} backend, {result['videos']} videos, {result['cpu_count']} cores")
+    print(f"{'threads':>7} {'intra-op':>8} {'videos/s':>9} {'p50 s':>8} {'p95 s':>8} {'cpu s/video':>11} {'cores':>6}")
+    for row in result["results"]:
+        print(f"{row['threads']:>7} {row['intra_op']:>8} {row['videos_per_s']:>9} {row['p50_s']:>8} "
+              f"{row['p95_s']:>8} {row['cpu_s_per_video']:>11} {row['cores_used']:>6}")
+    best = result["best"]
+    print(f"Best: INFERENCE_WORKERS={best['threads']} MODEL_INTRA_OP_THREADS={best['intra_op']} "
+          f"({best['videos_per_s']} videos/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark model backend throughput per thread layout")
+    parser.add_argument("--backend", choices=["fake", "onnx"], default="fake")
+    parser.add_argument("--model", default="", help="ONNX model (default MODEL_PATH)")
+    parser.add_argument("--video", nargs="*", default=[],
+                        help="Video files, cycled through (onnx); the fake backend makes up URLs")
+    parser.add_argument("--videos", type=int, default=40)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--intra-op", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--frame-ms", type=float, default=1.0, help="Fake backend CPU time per frame")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if args.video:
+        urls = [args.video[i % len(args.video)] for i in range(args.videos)]
+    elif args.backend == "fake":
+        urls = [f"https://storage.googleapis.com/bench/video-{i}.mp4" for i in range(args.videos)]
+    else:
+        parser.error("--backend onnx needs --video files")
+
+    result = run(args.backend, args.threads, args.intra_op, urls, args.model, args.frame_ms)
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"✅ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Drive the API with a weighted mix of auth, upload, AI and HR dashboard calls at
+a fixed concurrency, then report latency percentiles and throughput per endpoint.
+
+    python -m benchmarks.serve --port 8080            # app with fake storage / model
+    python -m benchmarks.load --url http://127.0.0.1:8080 --concurrency 32 --duration 60 \\
+        --companies 3 --employees 1000 --out results.json --baseline previous.json
+
+--in-process runs the app inside the driver instead (no network hop, same fakes).
+The --companies / --employees / --prefix values must match the seeded dataset.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import platform
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.seed import BENCH_PASSWORD, employee_email, hr_email
+
+DEFAULT_MIX = {
+    "login": 1,
+    "upload": 2,
+    "my_videos": 2,
+    "dashboard_summary": 3,
+    "dashboard_overview": 3,
+    "dashboard_charts": 3,
+    "employees": 2,
+    "employee_detail": 2,
+}
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def parse_mix(raw: Optional[str]) -> Dict[str, float]:
+    """"scenario=weight,..." overriding DEFAULT_MIX (weight 0 disables a scenario)."""
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (part.strip() for part in (raw or "").split(","))):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_MIX:
+            raise SystemExit(f"❌ Unknown scenario '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+class LoadRun:
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.hr_tokens: Dict[int, str] = {}
+        self.employee_ids: Dict[int, List[str]] = {}
+
+    async def call(self, label: str, method: str, url: str, token: Optional[str] = None, **kwargs) -> Optional[httpx.Response]:
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=headers, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            return None
+        return response
+
+    async def login_employee(self, company: int) -> Optional[str]:
+        email = employee_email(self.args.prefix, company, random.randrange(self.args.employees))
+        response = await self.call("POST /auth/token", "POST", "/auth/token",
+                                   json={"email": email, "password": BENCH_PASSWORD})
+        return response.json()["access_token"] if response else None
+
+    async def setup(self) -> None:
+        for company in range(self.args.companies):
+            response = await self.call("POST /hr/login", "POST", "/hr/login",
+                                       json={"email": hr_email(self.args.prefix, company), "password": BENCH_PASSWORD})
+            if response is None:
+                raise SystemExit(f"❌ HR login failed for company {company}; seed with the same --prefix first")
+            self.hr_tokens[company] = response.json()["access_token"]
+            page = await self.call("GET /hr/employees", "GET", "/hr/employees?page=1&page_size=100",
+                                   self.hr_tokens[company])
+            self.employee_ids[company] = [item["user_id"] for item in page.json()["items"]] if page else []
+
+    async def scenario(self, name: str, company: int, token: str) -> None:
+        hr_token = self.hr_tokens[company]
+        if name == "login":
+            await self.login_employee(company)
+        elif name == "upload":
+            filename = f"bench-{random.getrandbits(64):016x}.mp4"
+            await self.call("GET /generate_signed_url", "GET", "/generate_signed_url",
+                            params={"filename": filename})
+            response = await self.call("POST /upload_complete", "POST", "/upload_complete", token,
+                                       json={"original_filename": filename})
+            if response is not None:
+                video_id = response.json()["video_id"]
+                await self.call("POST /ai/process-video/{video_id}", "POST", f"/ai/process-video/{video_id}", token)
+        elif name == "my_videos":
+            await self.call("GET /my/videos", "GET", "/my/videos", token)
+        elif name == "dashboard_summary":
+            await self.call("GET /hr/dashboard/summary", "GET", "/hr/dashboard/summary", hr_token)
+        elif name == "dashboard_overview":
+            await self.call("GET /hr/dashboard/overview", "GET", "/hr/dashboard/overview", hr_token)
+        elif name == "dashboard_charts":
+            path = random.choice([
+                "/hr/dashboard/emotion-distribution",
+                "/hr/dashboard/emotion-pie-distribution",
+                "/hr/dashboard/emotion-trend",
+                "/hr/dashboard/emotion-histogram-distribution",
+            ])
+            await self.call(f"GET {path}", "GET", path, hr_token)
+        elif name == "employees":
+            pages = max(1, self.args.employees // 10)
+            await self.call("GET /hr/employees", "GET", "/hr/employees", hr_token,
+                            params={"page": random.randint(1, pages)})
+        elif name == "employee_detail" and self.employee_ids[company]:
+            employee_id = random.choice(self.employee_ids[company])
+            await self.call("GET /hr/employees/{employee_id}", "GET", f"/hr/employees/{employee_id}", hr_token)
+
+    async def user(self, mix: Dict[str, float], deadline: float) -> None:
+        company = random.randrange(self.args.companies)
+        token = await self.login_employee(company)
+        names, weights = list(mix), list(mix.values())
+        while token and time.perf_counter() < deadline:
+            await self.scenario(random.choices(names, weights)[0], company, token)
+
+    async def run(self, mix: Dict[str, float]) -> float:
+        await self.setup()
+        # Setup logins are not part of the measured window
+        self.latencies.clear()
+        self.errors.clear()
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        await asyncio.gather(*(self.user(mix, deadline) for _ in range(self.args.concurrency)))
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies[label])
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors[label],
+                "rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {
+            "meta": {
+                "finished_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "target": "in-process" if self.args.in_process else self.args.url,
+                "concurrency": self.args.concurrency,
+                "duration_s": round(elapsed, 2),
+                "companies": self.args.companies,
+                "employees": self.args.employees,
+                "seed": self.args.seed,
+            },
+            "total": {
+                "requests": total,
+                "errors": sum(e["errors"] for e in endpoints.values()),
+                "rps": round(total / elapsed, 2),
+            },
+            "endpoints": endpoints,
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result: Dict, baseline: Optional[Dict] = None) -> None:
+    base = baseline["endpoints"] if baseline else {}
+    print(f"{'endpoint':<48} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}  vs baseline p95")
+    for label, e in result["endpoints"].items():
+        delta = ""
+        if label in base and base[label]["p95_ms"]:
+            delta = f"{(e['p95_ms'] / base[label]['p95_ms'] - 1) * 100:+.1f}%"
+        print(f"{label:<48} {e['requests']:>7} {e['errors']:>5} {e['rps']:>8.1f} "
+              f"{e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f}  {delta}")
+    total = result["total"]
+    print(f"📊 {total['requests']} requests, {total['errors']} errors, {total['rps']} req/s")
+
+
+async def _main(args) -> Dict:
+    random.seed(args.seed)
+    if args.in_process:
+        from benchmarks.fakes import install_fakes
+        install_fakes()
+        import main
+        transport = httpx.ASGITransport(app=main.app)
+        base_url = "http://bench"
+        # ASGITransport skips lifespan events; the app's inference workers start there
+        lifespan = main.app.router.lifespan_context(main.app)
+    else:
+        transport = None
+        base_url = args.url
+        lifespan = contextlib.nullcontext()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with lifespan, httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=60) as client:
+        run = LoadRun(client, args)
+        elapsed = await run.run(parse_mix(args.mix))
+        return run.report(elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the API against a seeded database")
+    parser.add_argument("--url", default="http://127.0.0.1:8080")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process with fakes")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--companies", type=int, default=3)
+    parser.add_argument("--employees", type=int, default=1000, help="Employees per company")
+    parser.add_argument("--prefix", default="bench")
+    parser.add_argument("--mix", help=f"scenario=weight overrides; scenarios: {', '.join(DEFAULT_MIX)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare p95 latencies against")
+    args = parser.parse_args()
+
+    result = asyncio.run(_main(args))
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"✅ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
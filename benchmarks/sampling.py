@@ -0,0 +1,86 @@
+"""
+Compare adaptive frame sampling with scoring every frame on the fake model
+backend: frames scored, model time and how far the adaptive top 3 lands from
+the full pass. No database needed.
+
+    python -m benchmarks.sampling --videos 50 --frame-ms 1 --out sampling.json
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Dict
+
+import core.AI_Service as ai
+from core.config import settings
+from core.model_backends import create_backend
+
+
+def run_model(url: str, sampling: str):
+    settings.INFERENCE_SAMPLING = sampling
+    start = time.perf_counter()
+    output = ai.EmotionModel(url)
+    return output, time.perf_counter() - start
+
+
+def run(videos: int, frame_ms: float) -> Dict:
+    ai.load_model(create_backend("fake", frame_ms=frame_ms))
+    rows = []
+    for i in range(videos):
+        url = f"https://storage.googleapis.com/bench/video-{i}.mp4"
+        full, full_s = run_model(url, "full")
+        adaptive, adaptive_s = run_model(url, "adaptive")
+        same_labels = set(full.predictions) == set(adaptive.predictions)
+        rows.append({
+            "frame_count": full.frame_count,
+            "frames_used": adaptive.frames_used,
+            "full_s": full_s,
+            "adaptive_s": adaptive_s,
+            "same_top3": same_labels,
+            "same_top1": next(iter(full.predictions)) == next(iter(adaptive.predictions)),
+            "max_score_error": max(abs(full.predictions[label] - adaptive.predictions[label])
+                                   for label in full.predictions) if same_labels else None,
+        })
+    errors = [r["max_score_error"] for r in rows if r["max_score_error"] is not None]
+    return {
+        "videos": videos,
+        "frame_ms": frame_ms,
+        "tolerance": settings.SAMPLING_TOLERANCE,
+        "avg_frames_full": round(statistics.mean(r["frame_count"] for r in rows), 1),
+        "avg_frames_adaptive": round(statistics.mean(r["frames_used"] for r in rows), 1),
+        "avg_full_s": round(statistics.mean(r["full_s"] for r in rows), 4),
+        "avg_adaptive_s": round(statistics.mean(r["adaptive_s"] for r in rows), 4),
+        "same_top1": sum(r["same_top1"] for r in rows),
+        "same_top3": sum(r["same_top3"] for r in rows),
+        "max_score_error": round(max(errors), 4) if errors else None,
+        "mean_score_error": round(statistics.mean(errors), 4) if errors else None,
+    }
+
+
+def print_report(result: Dict) -> None:
+    print(f"{result['videos']} videos, {result['frame_ms']} ms per frame, tolerance {result['tolerance']}")
+    print(f"frames per video  full {result['avg_frames_full']:>9}  adaptive {result['avg_frames_adaptive']:>7}")
+    print(f"model time        full {result['avg_full_s']:>8.3f}s  adaptive {result['avg_adaptive_s']:>6.3f}s  "
+          f"({result['avg_full_s'] / max(result['avg_adaptive_s'], 1e-9):.0f}x less)")
+    print(f"same top emotion {result['same_top1']}/{result['videos']}, same top 3 {result['same_top3']}/{result['videos']}, "
+          f"score error mean {result['mean_score_error']} max {result['max_score_error']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark adaptive frame sampling against scoring every frame")
+    parser.add_argument("--videos", type=int, default=50)
+    parser.add_argument("--frame-ms", type=float, default=0.0,
+                        help="Fake model CPU time per frame (0 = measure sampling overhead only)")
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    result = run(args.videos, args.frame_ms)
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"✅ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Seed a database with synthetic companies, employees, videos and predictions.
+
+    python -m benchmarks.seed --companies 5 --employees 10000 --videos-per-employee 20
+
+Uses DATABASE_URL like the app. Rows go in through COPY on PostgreSQL and
+executemany batches elsewhere; sketches and summary statistics are rebuilt at
+the end so the dashboards see the data exactly as production would.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from sqlalchemy import Table
+
+from benchmarks.fakes import fake_predictions
+from core.company_stats import ensure_company_stats_view, refresh_company_stats
+from core.emotions import STANDARD_EMOTIONS, to_score_vector, top_of_vector
+from core.partitions import ensure_partitions
+from core.security import hash_password
+from core.sketches import rebuild_company_sketches
+from Database.database import Company, SessionLocal, Users, Video, VideoEmotion, VideoKey, engine, uuid7
+
+BENCH_PASSWORD = "benchmark-password"
+BATCH_SIZE = 50000
+
+
+def company_name(prefix: str, company: int) -> str:
+    return f"{prefix}-company-{company}"
+
+
+def hr_email(prefix: str, company: int) -> str:
+    return f"{prefix}-c{company}-hr@example.com"
+
+
+def employee_email(prefix: str, company: int, employee: int) -> str:
+    return f"{prefix}-c{company}-e{employee}@example.com"
+
+
+def _copy_rows(table: Table, rows: List[Dict]) -> None:
+    """COPY rows into a PostgreSQL table (partitioned parents route rows themselves)."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buffer.seek(0)
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def bulk_insert(table: Table, rows: Iterator[Dict]) -> int:
+    """Insert rows in BATCH_SIZE chunks; returns the number inserted."""
+    total = 0
+    batch: List[Dict] = []
+
+    def flush():
+        if not batch:
+            return
+        if engine.dialect.name == "postgresql":
+            _copy_rows(table, batch)
+        else:
+            with engine.begin() as conn:
+                conn.execute(table.insert(), batch)
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush()
+            total += len(batch)
+            batch = []
+    flush()
+    return total + len(batch)
+
+
+def _video_rows(args, employees: List[str], key_rows: List[Dict], emotion_rows: List[Dict],
+                now: datetime) -> Iterator[Dict]:
+    span = args.days * 86400
+    for user_id in employees:
+        for _ in range(args.videos_per_employee):
+            uploaded = now - timedelta(seconds=random.uniform(0, span))
+            video_id = uuid7()
+            processed = random.random() < args.processed_ratio
+            key_rows.append({"video_id": video_id, "upload_timestamp": uploaded})
+            yield {
+                "video_id": video_id,
+                "user_id": user_id,
+                "gcs_url": f"https://storage.invalid/bench/{video_id}.mp4",
+                "original_filename": f"{video_id}.mp4",
+                "upload_timestamp": uploaded,
+                "is_processed": processed,
+            }
+            if processed:
+                vector = to_score_vector(fake_predictions())
+                top_emotion, top_score = top_of_vector(vector)
+                emotion_rows.append({
+                    "video_id": video_id,
+                    **dict(zip(STANDARD_EMOTIONS, vector)),
+                    "top_emotion": top_emotion,
+                    "top_score": top_score,
+                    "created_at": min(uploaded + timedelta(minutes=random.uniform(1, 30)), now),
+                })
+
+
+def seed(args) -> Dict[str, int]:
+    random.seed(args.seed)
+    now = datetime.utcnow()
+    counts = {"companies": 0, "users": 0, "videos": 0, "video_emotions": 0}
+
+    db = SessionLocal()
+    try:
+        if db.query(Company).filter(Company.name == company_name(args.prefix, 0)).first():
+            raise SystemExit(f"❌ Companies with prefix '{args.prefix}' already exist; pick another --prefix")
+    finally:
+        db.close()
+
+    ensure_partitions(since=(now - timedelta(days=args.days)).date())
+    # One bcrypt hash shared by every seeded user: hashing millions of passwords would dominate seeding
+    hashed = hash_password(BENCH_PASSWORD)
+
+    company_ids = [uuid7() for _ in range(args.companies)]
+    counts["companies"] = bulk_insert(Company.__table__, (
+        {"id": company_id, "name": company_name(args.prefix, c), "created_at": now}
+        for c, company_id in enumerate(company_ids)
+    ))
+
+    employees_per_batch = max(1, BATCH_SIZE // max(1, args.videos_per_employee))
+    for c, company_id in enumerate(company_ids):
+        users = [{"user_id": uuid7(), "email": hr_email(args.prefix, c), "hashed_password": hashed,
+                  "role": "hr", "company_id": company_id}]
+        users += [
+            {"user_id": uuid7(), "email": employee_email(args.prefix, c, e), "hashed_password": hashed,
+             "role": "employee", "company_id": company_id}
+            for e in range(args.employees)
+        ]
+        counts["users"] += bulk_insert(Users.__table__, iter(users))
+
+        employees = [u["user_id"] for u in users[1:]]
+        for start in range(0, len(employees), employees_per_batch):
+            key_rows: List[Dict] = []
+            emotion_rows: List[Dict] = []
+            chunk = employees[start:start + employees_per_batch]
+            counts["videos"] += bulk_insert(Video.__table__, _video_rows(args, chunk, key_rows, emotion_rows, now))
+            bulk_insert(VideoKey.__table__, iter(key_rows))
+            counts["video_emotions"] += bulk_insert(VideoEmotion.__table__, iter(emotion_rows))
+        print(f"🏢 Seeded {company_name(args.prefix, c)} ({counts['videos']} videos so far)")
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    db = SessionLocal()
+    try:
+        for company_id in company_ids:
+            rebuild_company_sketches(db, company_id)
+    finally:
+        db.close()
+    ensure_company_stats_view()
+    refresh_company_stats()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed synthetic benchmark data")
+    parser.add_argument("--companies", type=int, default=3)
+    parser.add_argument("--employees", type=int, default=1000, help="Employees per company")
+    parser.add_argument("--videos-per-employee", type=int, default=10)
+    parser.add_argument("--processed-ratio", type=float, default=0.9, help="Share of videos with predictions")
+    parser.add_argument("--days", type=int, default=180, help="Spread uploads over this many past days")
+    parser.add_argument("--prefix", default="bench", help="Prefix of company names and user emails")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same dataset shape)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed(args)
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(f"✅ Seeded {counts} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
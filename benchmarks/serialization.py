@@ -0,0 +1,160 @@
+"""
+Time response serialization of large list payloads: FastAPI's generic path
+(jsonable_encoder + json.dumps) against the declared response models
+(pydantic-core validation and dump) rendered with orjson, plus the cost and
+size of gzip / brotli on the result. No database needed.
+
+    python -m benchmarks.serialization --rows 1000 --repeat 50 --out serialization.json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from auth.Pydantic_model import EmotionTrend, EmployeeDetail, EmployeePage, VideoItem
+from core.emotions import STANDARD_EMOTIONS
+from core.responses import FastJSONResponse, brotli, compress
+
+
+def _scores(rng: random.Random) -> Dict[str, float]:
+    return {e: rng.random() for e in STANDARD_EMOTIONS}
+
+
+def build_payloads(rows: int, seed: int) -> Dict[str, tuple]:
+    """{name: (response model, payload with `rows` items)} shaped like the real endpoints."""
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+    videos = [
+        {
+            "video_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "gcs_url": f"https://storage.googleapis.com/bucket/video-{i}.mp4?X-Goog-Signature={rng.getrandbits(256):064x}",
+            "original_filename": f"video-{i}.mp4",
+            "upload_timestamp": now - timedelta(minutes=i),
+            "is_processed": i % 3 != 0,
+        }
+        for i in range(rows)
+    ]
+    employees = {
+        "total": rows, "page": 1, "page_size": rows,
+        "items": [
+            {
+                "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "email": f"employee{i}@example.com",
+                "role": "employee",
+                "last_video_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "last_prediction": _scores(rng),
+                "top_emotion": rng.choice(STANDARD_EMOTIONS),
+                "top_score": rng.random(),
+            }
+            for i in range(rows)
+        ],
+    }
+    detail = {
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "email": "employee@example.com",
+        "history": [
+            {
+                "video_id": v["video_id"],
+                "uploaded_at": v["upload_timestamp"],
+                "is_processed": True,
+                "predictions": _scores(rng),
+                "top_emotion": rng.choice(STANDARD_EMOTIONS),
+                "top_score": rng.random(),
+            }
+            for v in videos
+        ],
+    }
+    start = date(2025, 1, 1)
+    trend = {
+        "series": [
+            {"date": (start + timedelta(days=i)).isoformat(), **_scores(rng)}
+            for i in range(rows)
+        ],
+    }
+    return {
+        "my_videos": (List[VideoItem], videos),
+        "employees": (EmployeePage, employees),
+        "employee_detail": (EmployeeDetail, detail),
+        "emotion_trend": (EmotionTrend, trend),
+    }
+
+
+def generic_path(payload) -> bytes:
+    """What FastAPI does for a route without a response model."""
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def typed_path(adapter: TypeAdapter) -> Callable[[object], bytes]:
+    """What FastAPI does for a route with a response model, rendered by the default response class."""
+    def serialize(payload) -> bytes:
+        return FastJSONResponse(adapter.dump_python(adapter.validate_python(payload), mode="json")).body
+    return serialize
+
+
+def timed(fn: Callable, arg, repeat: int) -> float:
+    """Median milliseconds of `repeat` calls."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def run(rows: int, repeat: int, seed: int) -> Dict:
+    results = {}
+    for name, (model, payload) in build_payloads(rows, seed).items():
+        typed = typed_path(TypeAdapter(model))
+        # Same document either way (modulo whitespace)
+        assert json.loads(generic_path(payload)) == json.loads(typed(payload)), name
+        body = typed(payload)
+        entry = {
+            "bytes": len(body),
+            "generic_ms": round(timed(generic_path, payload, repeat), 3),
+            "typed_ms": round(timed(typed, payload, repeat), 3),
+            "gzip_ms": round(timed(lambda b: compress(b, "gzip"), body, repeat), 3),
+            "gzip_bytes": len(compress(body, "gzip")),
+        }
+        if brotli is not None:
+            entry["br_ms"] = round(timed(lambda b: compress(b, "br"), body, repeat), 3)
+            entry["br_bytes"] = len(compress(body, "br"))
+        entry["speedup"] = round(entry["generic_ms"] / entry["typed_ms"], 2) if entry["typed_ms"] else None
+        results[name] = entry
+    return {"rows": rows, "repeat": repeat, "payloads": results}
+
+
+def print_report(result: Dict) -> None:
+    print(f"{'payload':<18} {'bytes':>9} {'generic':>9} {'typed':>9} {'speedup':>8} {'gzip':>15} {'br':>15}")
+    for name, e in result["payloads"].items():
+        gz = f"{e['gzip_bytes']}/{e['gzip_ms']:.1f}ms"
+        br = f"{e['br_bytes']}/{e['br_ms']:.1f}ms" if "br_ms" in e else "-"
+        print(f"{name:<18} {e['bytes']:>9} {e['generic_ms']:>7.2f}ms {e['typed_ms']:>7.2f}ms "
+              f"{e['speedup']:>7.1f}x {gz:>15} {br:>15}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark response serialization on large payloads")
+    parser.add_argument("--rows", type=int, default=1000, help="Items per payload")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per payload (median reported)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    result = run(args.rows, args.repeat, args.seed)
+    print_report(result)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+        print(f"✅ Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Run the API with fake storage and a fake emotion model for load tests.
+
+    python -m benchmarks.serve --port 8080
+
+Set BENCH_MODEL_FRAME_MS to give the fake model backend a CPU cost per scored frame.
+"""
+import argparse
+
+import uvicorn
+
+from benchmarks.fakes import install_fakes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the API with benchmark fakes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+
+    install_fakes()
+    import main as app_module
+
+    uvicorn.run(app_module.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,214 @@
 # core/AI_Service.py
+import json
+import threading
 import time
-import random
-from typing import Dict, Tuple
+from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
 from sqlalchemy.orm import Session
-from Database.database import Video, Prediction
+from Database.database import Video, VideoEmotion, video_id_filter
+from core.cache import bump_company_version
+from core.config import settings
+from core.sketches import record_prediction_sketches
+from core.columnar import columnar_store
+from core.emotions import STANDARD_EMOTIONS, to_score_vector, top_of_vector
+from core.log import get_logger
+from core.metrics import INFERENCE_FRAMES
+from core.model_backends import ModelBackend, create_backend
+from core.processing_state import AttemptLost, begin_attempt, fail_attempt, finish_attempt
+from core.tracing import span
 
-def EmotionModel(video_file_path: str) -> Dict[str, float]:
+logger = get_logger(__name__)
+
+class ModelOutput(NamedTuple):
+    predictions: Dict[str, float]  # top 3 labels, scores summing to 1
+    frames_used: int
+    frame_count: int
+    model_version: str
+
+# The process's model runtime (core/model_backends.py), loaded once
+_backend: Optional[ModelBackend] = None
+_backend_lock = threading.Lock()
+
+def _top3(mean: np.ndarray) -> Tuple[Tuple[int, ...], np.ndarray]:
+    order = tuple(int(i) for i in np.argsort(mean)[::-1][:3])
+    return order, mean[list(order)]
+
+def sample_frames(score: Callable[[Sequence[int]], np.ndarray], frame_count: int) -> Tuple[np.ndarray, int]:
     """
-    Dummy AI model function that simulates emotion predictions.
-    Accepts a GCS signed URL and returns top 3 emotions with scores.
+    Mean frame scores of a video and the number of frames scored.
+
+    Adaptive (INFERENCE_SAMPLING): score SAMPLING_INITIAL_FRAMES evenly spaced
+    frames, each standing for the frames nearest to it. Then, each round,
+    score SAMPLING_REFINE_FRAMES more at the middle of the gaps whose two
+    ends disagree most (weighted by gap length), i.e. around scene changes.
+    Stop once the top 3 emotions and their scores moved less than
+    SAMPLING_TOLERANCE for SAMPLING_STABLE_ROUNDS rounds in a row, or when
+    no gap is left to split.
     """
-    time.sleep(2)  # simulate processing
+    if settings.INFERENCE_SAMPLING == "full" or frame_count <= settings.SAMPLING_INITIAL_FRAMES:
+        return score(range(frame_count)).mean(axis=0), frame_count
 
-    emotions = ["happy", "sad", "angry", "stressed", "neutral", "excited", "calm", "frustrated"]
-    scores = [random.uniform(0.1, 0.4) for _ in range(3)]
-    total = sum(scores)
-    scores = [s / total for s in scores]
+    n = settings.SAMPLING_INITIAL_FRAMES
+    positions = [int((i + 0.5) * frame_count / n) for i in range(n)]
+    scores = score(positions)
+    previous, stable = None, 0
+    while True:
+        # Each sample weighs the frames closer to it than to its neighbours
+        edges = np.concatenate(([0], (np.add(positions[:-1], positions[1:])) / 2, [frame_count]))
+        mean = np.average(scores, axis=0, weights=np.diff(edges))
+        top = _top3(mean)
+        if previous is not None and top[0] == previous[0] and np.abs(top[1] - previous[1]).max() <= settings.SAMPLING_TOLERANCE:
+            stable += 1
+            if stable >= settings.SAMPLING_STABLE_ROUNDS:
+                break
+        else:
+            stable = 0
+        previous = top
 
-    selected = random.sample(emotions, 3)
-    return {selected[i]: round(scores[i], 3) for i in range(3)}
+        gaps = np.diff(positions)
+        disagreement = np.abs(np.diff(scores, axis=0)).sum(axis=1) + settings.SAMPLING_TOLERANCE
+        uncertainty = np.where(gaps > 1, disagreement * gaps, 0.0)
+        split = [i for i in np.argsort(uncertainty)[::-1][:settings.SAMPLING_REFINE_FRAMES] if uncertainty[i] > 0]
+        if not split:
+            break
+        new_positions = [positions[i] + gaps[i] // 2 for i in split]
+        new_scores = score(new_positions)
+        order = np.argsort(positions + new_positions, kind="stable")
+        positions = [int(p) for p in np.asarray(positions + new_positions)[order]]
+        scores = np.concatenate((scores, new_scores))[order]
+    return mean, len(positions)
 
-def compute_derived_fields(predictions: Dict[str, float]) -> Tuple[str, float]:
+def EmotionModel(video_file_path: str) -> ModelOutput:
     """
-    Compute top emotion and its score from predictions.
+    Accepts a GCS signed URL, scores (a sample of) its frames on the
+    configured model backend and returns the top 3 emotions with scores
+    summing to 1.
     """
-    if not predictions:
-        return None, None
-    top_emotion = max(predictions, key=predictions.get)
-    return top_emotion, predictions[top_emotion]
+    backend = get_backend()
+    with backend.open(video_file_path) as video:
+        mean, frames_used = sample_frames(video.score, video.frame_count)
+    labels, scores = _top3(mean)
+    scores = scores / scores.sum()
+    predictions = {backend.labels[label]: round(float(score), 3) for label, score in zip(labels, scores)}
+    return ModelOutput(predictions, frames_used, video.frame_count, backend.version)
+
+def get_backend() -> ModelBackend:
+    """The loaded model backend, loading the configured one on first use."""
+    if _backend is None:
+        load_model()
+    return _backend
+
+def load_model(backend: Optional[ModelBackend] = None) -> None:
+    """
+    Load and warm up `backend` (default: the one MODEL_BACKEND configures)
+    and use it from now on. Inference workers and the API's inline queue
+    call this at startup, so the first video does not pay for it.
+    """
+    global _backend
+    with _backend_lock:
+        if backend is None and _backend is not None:
+            return
+        backend = backend or create_backend()
+        start = time.perf_counter()
+        backend.load()
+        loaded = time.perf_counter()
+        backend.warmup(settings.MODEL_WARMUP_RUNS)
+        previous, _backend = _backend, backend
+    if previous is not None:
+        previous.close()
+    logger.info("Model loaded", extra={
+        "backend": backend.name, "model_version": backend.version,
+        "intra_op_threads": getattr(backend, "intra_op_threads", None),
+        "load_s": round(loaded - start, 3), "warmup_s": round(time.perf_counter() - loaded, 3),
+    })
+
+def unload_model() -> None:
+    """Release what load_model() acquired (called on shutdown)."""
+    global _backend
+    with _backend_lock:
+        backend, _backend = _backend, None
+    if backend is not None:
+        backend.close()
+        logger.info("Model unloaded", extra={"backend": backend.name})
 
 def process_video_with_ai(video_id: str, db: Session):
     """
     Fetch the video from DB, generate predictions, and store them.
+
+    Single-flight across processes (core/processing_state.py): when the video
+    is already processed, being processed elsewhere, waiting for a retry or
+    dead-lettered, this returns without running the model. A failure is
+    recorded for retry and re-raised.
     """
-    video = db.query(Video).filter(Video.video_id == video_id).first()
+    video = db.query(Video).filter(*video_id_filter(db, video_id)).first()
     if not video:
-        print(f"⚠️ Video {video_id} not found")
+        logger.warning("Video not found", extra={"video_id": video_id})
+        return
+    if video.is_processed:
         return
 
+    attempt_id = begin_attempt(db, video_id)
+    if attempt_id is None:
+        logger.debug("Video already being processed or not due", extra={"video_id": video_id})
+        return
+    try:
+        _run_attempt(video, attempt_id, db)
+    except AttemptLost:
+        db.rollback()
+        logger.warning("Processing attempt was taken over; its predictions were discarded",
+                       extra={"video_id": video_id})
+    except Exception as e:
+        db.rollback()
+        fail_attempt(db, video_id, attempt_id, e)
+        raise
+
+def _run_attempt(video: Video, attempt_id: str, db: Session):
+    video_id = video.video_id
+
     # ✅ 1. Get signed URL
     signed_url = video.gcs_url
 
-    # ✅ 2. Get predictions from dummy AI
-    predictions = EmotionModel(signed_url)
+    # ✅ 2. Get predictions from the model (download, decode and inference all happen in the model call)
+    with span("model.predict", video_id=video_id) as model_span:
+        output = EmotionModel(signed_url)
+        predictions = output.predictions
+        if model_span is not None:
+            model_span.set_attribute("model_version", output.model_version)
+            model_span.set_attribute("frames_used", output.frames_used)
+            model_span.set_attribute("frame_count", output.frame_count)
+    INFERENCE_FRAMES.observe(output.frames_used)
 
-    # ✅ 3. Compute top emotion & score
-    top_emotion, top_score = compute_derived_fields(predictions)
+    # ✅ 3. Align to the standard emotions & compute top emotion / score
+    vector = to_score_vector(predictions)
+    top_emotion, top_score = top_of_vector(vector)
 
-    # ✅ 4. Save predictions to DB
-    for emotion, score in predictions.items():
-        db.add(Prediction(video_id=video_id, emotion_label=emotion, score=score))
+    # ✅ 4. Save one compact row for the video
+    with span("prediction.store", video_id=video_id):
+        now = datetime.utcnow()
+        # Upsert: created_at (the partition key) is part of the primary key, so
+        # replace any earlier row for the video rather than relying on a conflict
+        db.query(VideoEmotion).filter(VideoEmotion.video_id == video_id).delete(synchronize_session=False)
+        db.add(VideoEmotion(
+            video_id=video_id,
+            top_emotion=top_emotion,
+            top_score=top_score,
+            model_version=output.model_version,
+            frames_used=output.frames_used,
+            model_predictions=json.dumps(predictions),
+            created_at=now,
+            **dict(zip(STANDARD_EMOTIONS, vector)),
+        ))
 
-    video.is_processed = True
-    db.commit()
-    print(f"✅ Processed video {video_id} — {predictions}")
+        video.is_processed = True
+        company_id = video.user.company_id
+        user_id = video.user_id
+        version = bump_company_version(db, company_id)
+        record_prediction_sketches(db, company_id, now.date(), predictions)
+        # Commits only if this is still the video's attempt
+        finish_attempt(db, video_id, attempt_id, output.model_version)
+        db.commit()
+    columnar_store.record(company_id, version - 1, version, [(video_id, user_id, now, *vector)])
+    logger.info("Processed video", extra={"event": "video_processed", "video_id": video_id,
+                                          "company_id": company_id, "top_emotion": top_emotion,
+                                          "frames_used": output.frames_used, "frame_count": output.frame_count})
@@ -4,6 +4,12 @@ import requests
 import os
 import time
 
+from core.log import get_logger
+from core.metrics import SIGNING_SECONDS
+from core.tracing import span
+
+logger = get_logger(__name__)
+
 
 class VideoUploader:
     def __init__(self,credentials_path=r"cloud_credentials.json",bucket_name="luminar-img-uploader"):
@@ -15,13 +21,15 @@ class VideoUploader:
 
     def request_url(self,file_name: str, content_type: str="video/mp4", expiration_minutes: int = 15) -> str:
             blob = self.bucket.blob(file_name)
-            url = blob.generate_signed_url(
-                version="v4",
-                expiration=timedelta(minutes=expiration_minutes),
-                method="PUT",
-                content_type=content_type,
-                headers={"Content-Type": content_type},
-            )
-            print(url)
+            with span("storage.sign", method="PUT"), SIGNING_SECONDS.labels("PUT").time():
+                url = blob.generate_signed_url(
+                    version="v4",
+                    expiration=timedelta(minutes=expiration_minutes),
+                    method="PUT",
+                    content_type=content_type,
+                    headers={"Content-Type": content_type},
+                )
+            # Never log the URL itself: it is a bearer credential for the object
+            logger.debug("Signed upload URL", extra={"event": "signed_url", "file_name": file_name})
             return url
         
\ No newline at end of file
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from Database.database import CompanyDataVersion, SessionLocal
+
+
+def get_company_version(db: Session, company_id: str) -> int:
+    """Current data version of a company (0 if nothing has been written yet)."""
+    row = (
+        db.query(CompanyDataVersion.version)
+        .filter(CompanyDataVersion.company_id == company_id)
+        .first()
+    )
+    return row[0] if row else 0
+
+
+def bump_company_version(db: Session, company_id: str) -> int:
+    """
+    Increment the company's data version inside the caller's transaction and
+    return the new version. Call it next to any write that changes dashboard
+    results; the caller commits.
+    """
+    stmt = (
+        update(CompanyDataVersion)
+        .where(CompanyDataVersion.company_id == company_id)
+        .values(version=CompanyDataVersion.version + 1, updated_at=datetime.utcnow())
+        .returning(CompanyDataVersion.version)
+        .execution_options(synchronize_session=False)
+    )
+    version = db.execute(stmt).scalar()
+    if version is not None:
+        return version
+    try:
+        with db.begin_nested():
+            db.add(CompanyDataVersion(company_id=company_id, version=1))
+        return 1
+    except IntegrityError:
+        # Another writer created the row first
+        return db.execute(stmt).scalar()
+
+
+class ResultCache:
+    """Thread-safe LRU of computed results, each tagged with the data version it was built from."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: int, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, version: int, compute: Callable[[], Any]) -> Any:
+        value = self.get(key, version)
+        if value is None:
+            value = compute()
+            self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache(settings.DASHBOARD_CACHE_MAX_ENTRIES)
+
+
+def make_etag(company_id: str, version: int, endpoint: str, params: Tuple) -> str:
+    digest = hashlib.sha1(
+        json.dumps([company_id, endpoint, params], default=str).encode("utf-8")
+    ).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag[2:] in candidates
+
+
+def cached_company_result(
+    request: Request,
+    response: Response,
+    db: Session,
+    company_id: str,
+    endpoint: str,
+    params: Tuple,
+    compute: Callable[[], Any],
+):
+    """
+    Serve a company-scoped result with ETag / If-None-Match support.
+    Returns 304 when the client already has the current version, otherwise the
+    cached body for (company, endpoint, params) or a freshly computed one.
+
+    The version always comes from the primary. On a replica that has not
+    replayed it yet the body is computed from the replica but neither cached
+    nor tagged, so lagging data never passes for the current version.
+    """
+    if db.info.get("replica"):
+        with SessionLocal() as primary:
+            version = get_company_version(primary, company_id)
+        stale = get_company_version(db, company_id) < version
+    else:
+        version, stale = get_company_version(db, company_id), False
+    etag = make_etag(company_id, version, endpoint, params)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if stale:
+        response.headers["Cache-Control"] = "private, no-cache"
+        return compute()
+    response.headers.update(headers)
+    return result_cache.get_or_compute((company_id, endpoint, params), version, compute)
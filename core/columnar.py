@@ -0,0 +1,301 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from core.cache import get_company_version
+from core.config import settings
+from core.emotions import STANDARD_EMOTIONS
+from core.sketches import SKETCH_RESOLUTION, ScoreSketch
+from Database.database import Users, Video, VideoEmotion
+
+EMOTION_CODES = {e: i for i, e in enumerate(STANDARD_EMOTIONS)}
+
+# day (int32) + emotion (int8) + score (float64) + user (int32)
+ROW_BYTES = 17
+
+# Videos committed by other processes can carry a created_at slightly older
+# than rows already loaded; catch-up re-reads this window and dedupes by video id.
+# Anything it still misses (older rows, purges, replaced rows) shows up as a video
+# count that differs from the database's, and the company is reloaded.
+CATCH_UP_LAG = timedelta(minutes=10)
+
+
+class CompanyColumns:
+    """
+    Column arrays for one company's predictions: day ordinal, emotion code,
+    score and user index. Appends fill spare capacity in place so readers can
+    keep using a snapshot of the first `size` rows.
+    """
+
+    def __init__(self, company_id: str, capacity: int = 1024):
+        self.company_id = company_id
+        self.size = 0
+        self.day = np.empty(capacity, dtype=np.int32)
+        self.emotion = np.empty(capacity, dtype=np.int8)
+        self.score = np.empty(capacity, dtype=np.float64)
+        self.user = np.empty(capacity, dtype=np.int32)
+        self.user_ids: List[str] = []
+        self.user_index: Dict[str, int] = {}
+        self.videos = 0
+        self.version = 0
+        self.watermark: Optional[datetime] = None
+        self.recent_ids: Dict[str, datetime] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self.day.nbytes + self.emotion.nbytes + self.score.nbytes + self.user.nbytes
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.size + extra
+        if needed <= len(self.day):
+            return
+        capacity = max(needed, 2 * len(self.day))
+        for name in ("day", "emotion", "score", "user"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def append(self, rows: Sequence[Tuple]) -> int:
+        """
+        Append (video_id, user_id, created_at, *scores) video rows, scores
+        aligned to STANDARD_EMOTIONS; returns the number of (emotion, score) entries added.
+        """
+        days, codes, scores, users = [], [], [], []
+        for video_id, user_id, created_at, *vector in rows:
+            if video_id in self.recent_ids:
+                continue
+            if self.watermark is None or created_at > self.watermark:
+                self.watermark = created_at
+            self.recent_ids[video_id] = created_at
+            self.videos += 1
+            idx = self.user_index.get(user_id)
+            if idx is None:
+                idx = self.user_index[user_id] = len(self.user_ids)
+                self.user_ids.append(user_id)
+            day = created_at.toordinal()
+            for code, score in enumerate(vector):
+                if score is None:
+                    continue
+                days.append(day)
+                codes.append(code)
+                scores.append(score)
+                users.append(idx)
+
+        if self.watermark is not None:
+            horizon = self.watermark - CATCH_UP_LAG
+            self.recent_ids = {k: v for k, v in self.recent_ids.items() if v >= horizon}
+
+        n = len(days)
+        if n:
+            self._reserve(n)
+            end = self.size + n
+            self.day[self.size:end] = days
+            self.emotion[self.size:end] = codes
+            self.score[self.size:end] = scores
+            self.user[self.size:end] = users
+            self.size = end
+        return n
+
+    def snapshot(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = self.size
+        return self.day[:n], self.emotion[:n], self.score[:n]
+
+    def distribution(self, start_date: Optional[date] = None) -> Dict[str, float]:
+        day, emotion, score = self.snapshot()
+        if start_date is not None:
+            mask = day >= start_date.toordinal()
+            emotion, score = emotion[mask], score[mask]
+        sums = np.bincount(emotion, weights=score, minlength=len(STANDARD_EMOTIONS))
+        return {e: float(sums[i]) for i, e in enumerate(STANDARD_EMOTIONS)}
+
+    def trend(self, start_date: date, end_date: date) -> List[Dict]:
+        day, emotion, score = self.snapshot()
+        start, days = start_date.toordinal(), (end_date - start_date).days + 1
+        mask = (day >= start) & (day < start + days)
+        k = len(STANDARD_EMOTIONS)
+        idx = (day[mask] - start) * k + emotion[mask]
+        sums = np.bincount(idx, weights=score[mask], minlength=days * k).reshape(days, k)
+        counts = np.bincount(idx, minlength=days * k).reshape(days, k)
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+
+        series = []
+        for i in range(days):
+            entry = {"date": date.fromordinal(start + i).isoformat()}
+            for j, e in enumerate(STANDARD_EMOTIONS):
+                entry[e] = float(means[i, j])
+            series.append(entry)
+        return series
+
+    def scores_for(self, emotion_name: str, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> np.ndarray:
+        day, emotion, score = self.snapshot()
+        mask = emotion == EMOTION_CODES[emotion_name]
+        if start_date is not None:
+            mask &= day >= start_date.toordinal()
+        if end_date is not None:
+            mask &= day <= end_date.toordinal()
+        return score[mask]
+
+    def histogram(self, emotion_name: str, bins: int, start_date: Optional[date] = None,
+                  end_date: Optional[date] = None, percentiles: Iterable[float] = ()) -> Dict:
+        scores = self.scores_for(emotion_name, start_date, end_date)
+        counts, edges = np.histogram(scores, bins=bins, range=(0.0, 1.0))
+        result = {
+            "emotion": emotion_name,
+            "histogram": [
+                {"from": round(float(edges[i]), 3), "to": round(float(edges[i + 1]), 3), "count": int(counts[i])}
+                for i in range(bins)
+            ],
+            "count": int(scores.size),
+        }
+        percentiles = list(percentiles)
+        if percentiles:
+            values = np.percentile(scores, percentiles) if scores.size else [None] * len(percentiles)
+            result["percentiles"] = {
+                f"p{p:g}": (float(v) if v is not None else None) for p, v in zip(percentiles, values)
+            }
+        return result
+
+
+    def sketch_for(self, emotion_name: str, start_date: Optional[date] = None,
+                   end_date: Optional[date] = None) -> ScoreSketch:
+        """The selected scores bucketed into a ScoreSketch, for merging with stored daily sketches."""
+        scores = self.scores_for(emotion_name, start_date, end_date)
+        if not scores.size:
+            return ScoreSketch()
+        idx = np.clip((scores * SKETCH_RESOLUTION).astype(np.int64), 0, SKETCH_RESOLUTION - 1)
+        counts = np.bincount(idx, minlength=SKETCH_RESOLUTION)
+        return ScoreSketch(
+            buckets={int(i): int(counts[i]) for i in np.flatnonzero(counts)},
+            count=int(scores.size),
+            total=float(scores.sum()),
+            min_score=float(scores.min()),
+            max_score=float(scores.max()),
+        )
+
+
+def _company_row_batches(db: Session, company_id: str, since: Optional[datetime] = None):
+    stmt = (
+        select(VideoEmotion.video_id, Video.user_id, VideoEmotion.created_at, *VideoEmotion.score_columns())
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .where(Users.company_id == company_id)
+        .execution_options(yield_per=5000)
+    )
+    if since is not None:
+        stmt = stmt.where(VideoEmotion.created_at >= since)
+    return db.execute(stmt).partitions()
+
+
+def _count_company_videos(db: Session, company_id: str) -> int:
+    """Processed videos of the company (video_emotions rows)."""
+    return (
+        db.query(func.count(VideoEmotion.video_id))
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+        .scalar()
+    )
+
+
+def _load_company(db: Session, company_id: str, version: int, videos: int,
+                  max_bytes: int) -> Optional[CompanyColumns]:
+    """All of a company's rows, or None when they would not fit in `max_bytes`."""
+    # Upper bound on (emotion, score) entries: processed videos x emotions
+    if videos * len(STANDARD_EMOTIONS) * ROW_BYTES > max_bytes:
+        return None
+    cols = CompanyColumns(company_id)
+    with cols.lock:
+        for batch in _company_row_batches(db, company_id):
+            cols.append(batch)
+        cols.version = version
+    return cols
+
+
+class ColumnarStore:
+    """Per-company CompanyColumns kept in an LRU bounded by total array bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._companies: "OrderedDict[str, CompanyColumns]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        total = sum(c.nbytes for c in self._companies.values())
+        while total > self.max_bytes and len(self._companies) > 1:
+            _, evicted = self._companies.popitem(last=False)
+            total -= evicted.nbytes
+
+    def _put(self, company_id: str, cols: Optional[CompanyColumns]) -> None:
+        with self._lock:
+            if cols is None:
+                self._companies.pop(company_id, None)
+            else:
+                self._companies[company_id] = cols
+            self._evict()
+
+    def get(self, db: Session, company_id: str) -> Optional[CompanyColumns]:
+        """
+        Columns for a company, warmed on first access. When the company's data
+        version moved (a write in any process), rows written elsewhere are
+        caught up; if the video count then disagrees with the database, the
+        company is reloaded. Returns None when the company alone would not fit
+        in the memory budget.
+        """
+        version = get_company_version(db, company_id)
+        with self._lock:
+            cols = self._companies.get(company_id)
+            if cols is not None:
+                self._companies.move_to_end(company_id)
+
+        if cols is None:
+            cols = _load_company(db, company_id, version, _count_company_videos(db, company_id), self.max_bytes)
+            self._put(company_id, cols)
+            return cols
+
+        if cols.version != version:
+            reload = False
+            with cols.lock:
+                if cols.version != version:
+                    since = cols.watermark - CATCH_UP_LAG if cols.watermark else None
+                    for batch in _company_row_batches(db, company_id, since):
+                        cols.append(batch)
+                    videos = _count_company_videos(db, company_id)
+                    reload = cols.videos != videos
+                    cols.version = version
+            if reload:
+                cols = _load_company(db, company_id, version, videos, self.max_bytes)
+            self._put(company_id, cols)
+        return cols
+
+    def record(self, company_id: str, previous_version: int, version: int, rows: Sequence[Tuple]) -> None:
+        """
+        Write-path hook: append freshly committed video rows to a warm company
+        and fast-forward its version when no other writer got in between.
+        """
+        with self._lock:
+            cols = self._companies.get(company_id)
+        if cols is None:
+            return
+        with cols.lock:
+            cols.append(rows)
+            if cols.version == previous_version and version == previous_version + 1:
+                cols.version = version
+
+    def discard(self, company_id: str) -> None:
+        with self._lock:
+            self._companies.pop(company_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._companies.clear()
+
+
+columnar_store = ColumnarStore(settings.COLUMNAR_STORE_MAX_MB * 1024 * 1024)
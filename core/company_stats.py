@@ -0,0 +1,191 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, distinct, func, text
+from sqlalchemy.orm import Session
+
+from core.log import get_logger
+from core.sketches import merge_sketches
+from Database.database import CompanyRetention, Users, Video, VideoEmotion, engine
+
+logger = get_logger(__name__)
+
+# One row per company; the unique index is what allows REFRESH ... CONCURRENTLY
+COMPANY_STATS_VIEW_DDL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS company_stats AS
+SELECT c.id AS company_id,
+       COALESCE(vs.total_videos, 0) AS total_videos,
+       COALESCE(vs.processed_videos, 0) AS processed_videos,
+       COALESCE(vs.active_employees, 0) AS active_employees,
+       COALESCE(ps.avg_stress, 0.0) AS avg_stress,
+       now() AS refreshed_at
+FROM companies c
+LEFT JOIN (
+    SELECT u.company_id,
+           count(*) AS total_videos,
+           count(*) FILTER (WHERE v.is_processed) AS processed_videos,
+           count(DISTINCT v.user_id) AS active_employees
+    FROM videos v JOIN users u ON u.user_id = v.user_id
+    GROUP BY u.company_id
+) vs ON vs.company_id = c.id
+LEFT JOIN (
+    SELECT company_id, sum(total) / NULLIF(sum(n), 0) AS avg_stress
+    FROM (
+        -- raw rows after the company's compacted days ...
+        SELECT u.company_id, sum(ve.stress) AS total, count(ve.stress) AS n
+        FROM video_emotions ve
+        JOIN videos v ON v.video_id = ve.video_id
+        JOIN users u ON u.user_id = v.user_id
+        LEFT JOIN company_retention r ON r.company_id = u.company_id
+        WHERE r.compacted_through IS NULL OR ve.created_at >= r.compacted_through + 1
+        GROUP BY u.company_id
+        UNION ALL
+        -- ... plus the daily aggregates of the compacted days
+        SELECT s.company_id, sum((s.sketch::json ->> 's')::float), sum(s.count)
+        FROM emotion_sketches s
+        JOIN company_retention r ON r.company_id = s.company_id
+        WHERE s.emotion = 'stress' AND s.day <= r.compacted_through
+        GROUP BY s.company_id
+    ) parts
+    GROUP BY company_id
+) ps ON ps.company_id = c.id
+"""
+
+COMPANY_STATS_INDEX_DDL = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS company_stats_company_id_idx ON company_stats (company_id)"
+)
+
+_refresh_lock = threading.Lock()
+# Advisory lock taken by a refresh, so API workers, the sweep process and
+# inference nodes never refresh the view at the same time
+REFRESH_LOCK_KEY = 7261_0001
+
+
+def stats_view_supported() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def ensure_company_stats_view() -> None:
+    """Create the company_stats materialized view (PostgreSQL only)."""
+    if not stats_view_supported():
+        return
+    with engine.begin() as conn:
+        conn.execute(text(COMPANY_STATS_VIEW_DDL))
+        conn.execute(text(COMPANY_STATS_INDEX_DDL))
+
+
+def refresh_company_stats(min_interval_seconds: float = 0) -> bool:
+    """
+    Refresh company_stats without blocking readers.
+    Skips (returns False) while another refresh is running in any process, or
+    when the view was refreshed (anywhere) less than `min_interval_seconds` ago.
+    """
+    if not stats_view_supported():
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False
+    try:
+        with engine.begin() as conn:
+            if not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": REFRESH_LOCK_KEY}).scalar():
+                return False
+            if min_interval_seconds:
+                age = conn.execute(text(
+                    "SELECT extract(epoch FROM now() - max(refreshed_at)) FROM company_stats"
+                )).scalar()
+                if age is not None and age < min_interval_seconds:
+                    return False
+            conn.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY company_stats"))
+        return True
+    except Exception as e:
+        logger.error("Error refreshing company stats: %s", e)
+        return False
+    finally:
+        _refresh_lock.release()
+
+
+def get_company_video_stats(db: Session, company_id: str) -> Dict[str, int]:
+    """Total videos, processed videos and active employees in a single aggregate query."""
+    total_videos, processed_videos, active_employees = (
+        db.query(
+            func.count(Video.video_id),
+            func.count(case((Video.is_processed == True, 1))),
+            func.count(distinct(Video.user_id)),
+        )
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+        .one()
+    )
+    return {
+        "total_videos": total_videos,
+        "processed_videos": processed_videos,
+        "active_employees": active_employees,
+    }
+
+
+def compute_live_company_stats(db: Session, company_id: str) -> Dict:
+    """Same figures as the materialized view, computed on demand (refreshed_at is None)."""
+    stats = get_company_video_stats(db, company_id)
+    compacted_through = (
+        db.query(CompanyRetention.compacted_through)
+        .filter(CompanyRetention.company_id == company_id)
+        .scalar()
+    )
+    q = (
+        db.query(func.sum(VideoEmotion.stress), func.count(VideoEmotion.stress))
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+    )
+    if compacted_through is not None:
+        q = q.filter(VideoEmotion.created_at >= datetime.combine(compacted_through + timedelta(days=1), datetime.min.time()))
+    total, count = q.one()
+    total, count = float(total or 0.0), count or 0
+    if compacted_through is not None:
+        # Days past the raw retention window only exist as daily sketches
+        sketch = merge_sketches(db, company_id, "stress", end_date=compacted_through)
+        total, count = total + sketch.total, count + sketch.count
+    stats["avg_stress"] = total / count if count else 0.0
+    stats["refreshed_at"] = None
+    return stats
+
+
+def get_company_stats_refreshed_at(db: Session, company_id: str) -> Optional[str]:
+    """
+    When the company's company_stats row was refreshed, without reading the figures
+    (None off PostgreSQL or before the company's first refresh). Keys cached stats.
+    """
+    if not stats_view_supported():
+        return None
+    refreshed_at = db.execute(
+        text("SELECT refreshed_at FROM company_stats WHERE company_id = :company_id"),
+        {"company_id": company_id},
+    ).scalar()
+    return refreshed_at.isoformat() if refreshed_at else None
+
+
+def get_company_stats(db: Session, company_id: str) -> Dict:
+    """
+    Summary-card figures for a company from a single indexed row of company_stats.
+    Falls back to a live computation when the view is unavailable or the
+    company has not been picked up by a refresh yet.
+    """
+    row: Optional[tuple] = None
+    if stats_view_supported():
+        row = db.execute(
+            text(
+                "SELECT total_videos, processed_videos, active_employees, avg_stress, refreshed_at "
+                "FROM company_stats WHERE company_id = :company_id"
+            ),
+            {"company_id": company_id},
+        ).first()
+    if row is None:
+        return compute_live_company_stats(db, company_id)
+
+    return {
+        "total_videos": row.total_videos,
+        "processed_videos": row.processed_videos,
+        "active_employees": row.active_employees,
+        "avg_stress": float(row.avg_stress),
+        "refreshed_at": row.refreshed_at.isoformat() if row.refreshed_at else None,
+    }
@@ -11,6 +11,63 @@ class Settings:
         self.ALGORITHM = os.getenv("ALGORITHM", "HS256")
         self.ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
         self.DATABASE_URL = os.getenv("DATABASE_URL")
+        self.COMPANY_STATS_REFRESH_MINUTES = int(os.getenv("COMPANY_STATS_REFRESH_MINUTES", 5))
+        self.COMPANY_STATS_BATCH_REFRESH_SECONDS = int(os.getenv("COMPANY_STATS_BATCH_REFRESH_SECONDS", 60))  # min gap between refreshes after processing batches
+        self.EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 50000))
+        self.DASHBOARD_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_CACHE_MAX_ENTRIES", 1024))
+        self.COLUMNAR_STORE_MAX_MB = int(os.getenv("COLUMNAR_STORE_MAX_MB", 256))
+        self.PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+        self.RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", 0))  # 0 = keep raw predictions forever
+        self.RETENTION_PURGE_BATCH_SIZE = int(os.getenv("RETENTION_PURGE_BATCH_SIZE", 5000))
+        self.INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+        self.INTERACTIVE_RESERVED_WORKERS = int(os.getenv("INTERACTIVE_RESERVED_WORKERS", 1))  # on top of INFERENCE_WORKERS
+        self.TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", 1))
+        self.TENANT_MAX_QUEUE_DEPTH = int(os.getenv("TENANT_MAX_QUEUE_DEPTH", 1000))
+        self.TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")  # "company_id=2,company_id=0.5"
+        self.INFERENCE_MODE = os.getenv("INFERENCE_MODE", "inline")  # inline | remote (python -m core.inference_worker)
+        self.INFERENCE_WORKER_PORT = int(os.getenv("INFERENCE_WORKER_PORT", 9100))  # worker health / metrics
+        self.INFERENCE_POLL_SECONDS = float(os.getenv("INFERENCE_POLL_SECONDS", 1))
+        self.INFERENCE_LEASE_SECONDS = int(os.getenv("INFERENCE_LEASE_SECONDS", 300))  # claimed job of a dead worker is retaken after this
+        self.INFERENCE_MAX_ATTEMPTS = int(os.getenv("INFERENCE_MAX_ATTEMPTS", 5))  # then the video is dead-lettered
+        self.INFERENCE_RETRY_BASE_SECONDS = int(os.getenv("INFERENCE_RETRY_BASE_SECONDS", 60))  # doubled per failed attempt
+        self.INFERENCE_RETRY_MAX_SECONDS = int(os.getenv("INFERENCE_RETRY_MAX_SECONDS", 3600))
+        self.INFERENCE_SAMPLING = os.getenv("INFERENCE_SAMPLING", "adaptive")  # adaptive | full (every frame)
+        self.SAMPLING_INITIAL_FRAMES = int(os.getenv("SAMPLING_INITIAL_FRAMES", 16))  # evenly spaced first pass
+        self.SAMPLING_REFINE_FRAMES = int(os.getenv("SAMPLING_REFINE_FRAMES", 8))  # added per refinement round
+        self.SAMPLING_TOLERANCE = float(os.getenv("SAMPLING_TOLERANCE", 0.02))  # top-3 score change counted as stable
+        self.SAMPLING_STABLE_ROUNDS = int(os.getenv("SAMPLING_STABLE_ROUNDS", 2))  # stable rounds in a row before stopping
+        self.MODEL_BACKEND = os.getenv("MODEL_BACKEND", "fake")  # fake | onnx (core/model_backends.py)
+        self.MODEL_PATH = os.getenv("MODEL_PATH", "")  # .onnx file, int8-quantized for the CPU
+        self.MODEL_INTRA_OP_THREADS = int(os.getenv("MODEL_INTRA_OP_THREADS", 0))  # per inference call, 0 = cores / INFERENCE_WORKERS
+        self.MODEL_INTER_OP_THREADS = int(os.getenv("MODEL_INTER_OP_THREADS", 1))  # parallel graph branches, 1 = sequential
+        self.MODEL_BATCH_SIZE = int(os.getenv("MODEL_BATCH_SIZE", 8))  # frames per inference call
+        self.MODEL_WARMUP_RUNS = int(os.getenv("MODEL_WARMUP_RUNS", 3))  # inference calls before the first video
+        self.MODEL_FAKE_FRAME_MS = float(os.getenv("MODEL_FAKE_FRAME_MS", 1))  # fake backend CPU time per frame
+        self.INVITE_TOKEN_EXPIRE_HOURS = int(os.getenv("INVITE_TOKEN_EXPIRE_HOURS", 72))
+        self.BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", 20000))
+        self.PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+        self.LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+        self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+        self.LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # per logger: "core.processing_queue=DEBUG,apscheduler=WARNING"
+        self.LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")  # per event: "video_processed=0.1"
+        self.TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none")  # none | console | file | otlp
+        self.TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+        self.TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "neurofy-api")
+        self.TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", 1.0))
+        self.QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 20))  # statements per request, 0 = off
+        self.QUERY_TIME_BUDGET_MS = int(os.getenv("QUERY_TIME_BUDGET_MS", 500))  # DB time per request, 0 = off
+        self.DATABASE_REPLICA_URLS = os.getenv("DATABASE_REPLICA_URLS", "")  # comma separated; empty = all reads on the primary
+        self.REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", 5))
+        self.REPLICA_HEALTH_INTERVAL_SECONDS = int(os.getenv("REPLICA_HEALTH_INTERVAL_SECONDS", 10))
+        self.READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", 15))
+        self.SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", 20))  # running inference jobs on shutdown
+        self.PORT = int(os.getenv("PORT", 8080))
+        self.WEB_WORKERS = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+        self.WEB_BACKLOG = int(os.getenv("WEB_BACKLOG", 2048))
+        self.WEB_KEEPALIVE_SECONDS = int(os.getenv("WEB_KEEPALIVE_SECONDS", 75))  # above the load balancer's idle timeout
+        self.WEB_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("WEB_GRACEFUL_TIMEOUT_SECONDS", 30))
+        self.COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))  # gzip/brotli responses from this size, 0 = off
 
 settings = Settings()
 
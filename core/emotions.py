@@ -0,0 +1,58 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+STANDARD_EMOTIONS = [
+    "stress",
+    "anxiety",
+    "fatigue",
+    "happiness",
+    "neutral",
+    "anger",
+    "surprise",
+]
+
+
+SYNONYM_TO_STANDARD = {
+    # model -> standard mapping
+    "stressed": "stress",
+    "stress": "stress",
+    "anxious": "anxiety",
+    "anxiety": "anxiety",
+    "tired": "fatigue",
+    "fatigue": "fatigue",
+    "happy": "happiness",
+    "happiness": "happiness",
+    "neutral": "neutral",
+    "angry": "anger",
+    "anger": "anger",
+    "surprised": "surprise",
+    "surprise": "surprise",
+}
+
+
+def map_emotion(label: str) -> Optional[str]:
+    if not label:
+        return None
+    key = label.strip().lower()
+    return SYNONYM_TO_STANDARD.get(key)
+
+
+def to_score_vector(predictions: Dict[str, float]) -> List[Optional[float]]:
+    """
+    Align model output to STANDARD_EMOTIONS; unmapped labels are dropped
+    (the full output is kept in VideoEmotion.model_predictions).
+    """
+    vector: List[Optional[float]] = [None] * len(STANDARD_EMOTIONS)
+    for label, score in predictions.items():
+        std = map_emotion(label)
+        if std is not None:
+            vector[STANDARD_EMOTIONS.index(std)] = float(score)
+    return vector
+
+
+def top_of_vector(vector: Iterable[Optional[float]]) -> Tuple[Optional[str], Optional[float]]:
+    best: Tuple[Optional[str], Optional[float]] = (None, None)
+    for emotion, score in zip(STANDARD_EMOTIONS, vector):
+        if score is not None and (best[1] is None or score > best[1]):
+            best = (emotion, score)
+    return best
@@ -0,0 +1,210 @@
+"""
+Inference jobs shared through the database (INFERENCE_MODE=remote).
+
+API nodes and the pending-video sweep insert one inference_jobs row per
+video; inference worker nodes (core/inference_worker.py) claim rows under a
+lease, process the videos and delete the rows. A claim is a conditional
+UPDATE, so two workers racing for a row cannot both win it. A worker that
+dies stops renewing its leases and its videos are claimed again after
+INFERENCE_LEASE_SECONDS.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.log import request_id_var
+from core.processing_queue import LANES
+from core.tracing import current_traceparent
+from Database.database import InferenceJob
+
+# Ids per IN (...) list, well under SQLite's bound-parameter limit
+CHUNK_SIZE = 1000
+
+
+def _lane_rank(lane_column):
+    return case({lane: rank for rank, lane in enumerate(LANES)}, value=lane_column)
+
+
+def _claimable(now: datetime):
+    expired = now - timedelta(seconds=settings.INFERENCE_LEASE_SECONDS)
+    return or_(InferenceJob.claimed_at.is_(None), InferenceJob.claimed_at < expired)
+
+
+def _insert(db: Session):
+    dialect = {"postgresql": postgresql, "sqlite": sqlite}[db.get_bind().dialect.name]
+    return dialect.insert(InferenceJob).on_conflict_do_nothing(index_elements=["video_id"])
+
+
+def enqueue_jobs(db: Session, videos: Iterable[Tuple[str, str, Optional[str]]],
+                 lane: str) -> Tuple[List[str], List[str]]:
+    """
+    Hand (company_id, video_id, traceparent) videos to the worker nodes in
+    `lane`, with FairProcessingQueue.submit's rules: videos already claimed, or
+    waiting in the same or a higher lane, count as accepted, one waiting in a
+    lower lane is moved up, and a company with TENANT_MAX_QUEUE_DEPTH videos
+    waiting in the lane is refused. Returns accepted and rejected ids; commits.
+    """
+    videos = list(videos)
+    accepted, rejected = [], []
+    if not videos:
+        return accepted, rejected
+
+    existing: Dict[str, Tuple[str, bool]] = {}  # video_id -> (lane, claimed)
+    ids = [video_id for _, video_id, _ in videos]
+    for i in range(0, len(ids), CHUNK_SIZE):
+        existing.update(
+            (video_id, (job_lane, claimed_at is not None))
+            for video_id, job_lane, claimed_at in db.query(
+                InferenceJob.video_id, InferenceJob.lane, InferenceJob.claimed_at,
+            ).filter(InferenceJob.video_id.in_(ids[i:i + CHUNK_SIZE]))
+        )
+    depth = dict(
+        db.query(InferenceJob.company_id, func.count())
+        .filter(InferenceJob.lane == lane, InferenceJob.claimed_at.is_(None))
+        .group_by(InferenceJob.company_id)
+    )
+
+    now = datetime.utcnow()
+    request_id = request_id_var.get()
+    rows, promote = [], []
+    for company_id, video_id, traceparent in videos:
+        if video_id in existing:
+            job_lane, claimed = existing[video_id]
+            if not claimed and LANES.index(job_lane) > LANES.index(lane):
+                promote.append(video_id)
+            accepted.append(video_id)
+            continue
+        if depth.get(company_id, 0) >= settings.TENANT_MAX_QUEUE_DEPTH:
+            rejected.append(video_id)
+            continue
+        depth[company_id] = depth.get(company_id, 0) + 1
+        rows.append({
+            "video_id": video_id, "company_id": company_id, "lane": lane, "enqueued_at": now,
+            "request_id": request_id, "trace_context": traceparent or current_traceparent(),
+        })
+        accepted.append(video_id)
+
+    # Another node may insert the same video meanwhile; its row wins
+    for i in range(0, len(rows), CHUNK_SIZE):
+        db.execute(_insert(db), rows[i:i + CHUNK_SIZE])
+    for i in range(0, len(promote), CHUNK_SIZE):
+        db.execute(
+            update(InferenceJob)
+            .where(InferenceJob.video_id.in_(promote[i:i + CHUNK_SIZE]), InferenceJob.claimed_at.is_(None))
+            .values(lane=lane)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return accepted, rejected
+
+
+def claim_jobs(db: Session, worker_id: str, limit: int, lanes: Tuple[str, ...] = LANES,
+               busy_companies: Iterable[str] = ()) -> List:
+    """
+    Lease up to `limit` waiting (or expired) jobs in `lanes` to `worker_id`:
+    highest lane first and, within a lane, every company's oldest video before
+    any company's second, at most TENANT_MAX_CONCURRENCY per company and none
+    of `busy_companies` (already at their cap on this worker). Returns the
+    claimed rows; commits.
+    """
+    if limit <= 0:
+        return []
+    now = datetime.utcnow()
+    turn = func.row_number().over(
+        partition_by=(InferenceJob.lane, InferenceJob.company_id), order_by=InferenceJob.enqueued_at,
+    ).label("turn")
+    candidates = (
+        db.query(InferenceJob.video_id, InferenceJob.company_id, InferenceJob.lane, InferenceJob.enqueued_at, turn)
+        .filter(InferenceJob.lane.in_(lanes), _claimable(now))
+        .subquery()
+    )
+    q = db.query(candidates.c.video_id).filter(candidates.c.turn <= settings.TENANT_MAX_CONCURRENCY)
+    busy_companies = list(busy_companies)
+    if busy_companies:
+        q = q.filter(candidates.c.company_id.not_in(busy_companies))
+    ids = [
+        video_id for (video_id,) in
+        q
+        .order_by(_lane_rank(candidates.c.lane), candidates.c.turn, candidates.c.enqueued_at)
+        .limit(limit)
+    ]
+    if not ids:
+        db.rollback()
+        return []
+    # Re-checked per row: a job another worker claimed since the SELECT is skipped
+    claimed = db.execute(
+        update(InferenceJob)
+        .where(InferenceJob.video_id.in_(ids), _claimable(now))
+        .values(claimed_by=worker_id, claimed_at=now)
+        .returning(InferenceJob.video_id, InferenceJob.company_id, InferenceJob.lane,
+                   InferenceJob.request_id, InferenceJob.trace_context)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    order = {video_id: i for i, video_id in enumerate(ids)}
+    return sorted(claimed, key=lambda row: order[row.video_id])
+
+
+def renew_leases(db: Session, worker_id: str, video_ids: List[str]) -> None:
+    """Restart the lease of `worker_id`'s jobs; commits."""
+    for i in range(0, len(video_ids), CHUNK_SIZE):
+        db.execute(
+            update(InferenceJob)
+            .where(InferenceJob.video_id.in_(video_ids[i:i + CHUNK_SIZE]), InferenceJob.claimed_by == worker_id)
+            .values(claimed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+def release_jobs(db: Session, worker_id: str, video_ids: List[str]) -> None:
+    """Hand `worker_id`'s unstarted jobs back to the other workers; commits."""
+    for i in range(0, len(video_ids), CHUNK_SIZE):
+        db.execute(
+            update(InferenceJob)
+            .where(InferenceJob.video_id.in_(video_ids[i:i + CHUNK_SIZE]), InferenceJob.claimed_by == worker_id)
+            .values(claimed_by=None, claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+def finish_job(db: Session, worker_id: str, video_id: str) -> None:
+    """
+    Remove a job `worker_id` ran. A video whose processing failed is still
+    unprocessed, so the pending-video sweep queues it again once its retry
+    is due. Commits.
+    """
+    db.execute(
+        delete(InferenceJob)
+        .where(InferenceJob.video_id == video_id, InferenceJob.claimed_by == worker_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def job_stats(db: Session, company_id: Optional[str] = None) -> Dict[str, Dict]:
+    """Per-lane waiting / claimed counts (optionally for one company) and the oldest waiting job's age."""
+    now = datetime.utcnow()
+    q = db.query(
+        InferenceJob.lane,
+        func.count(InferenceJob.claimed_at),
+        func.count() - func.count(InferenceJob.claimed_at),
+        func.min(case((InferenceJob.claimed_at.is_(None), InferenceJob.enqueued_at))),
+    ).group_by(InferenceJob.lane)
+    if company_id is not None:
+        q = q.filter(InferenceJob.company_id == company_id)
+    rows = {lane: (running, queued, oldest) for lane, running, queued, oldest in q}
+    lanes = {}
+    for lane in LANES:
+        running, queued, oldest = rows.get(lane, (0, 0, None))
+        lanes[lane] = {
+            "queued": queued,
+            "running": running,
+            "oldest_age_s": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+        }
+    return lanes
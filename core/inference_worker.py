@@ -0,0 +1,229 @@
+"""
+Standalone inference worker: `python -m core.inference_worker`.
+
+Runs only the video processing loop, so inference nodes scale apart from the
+API. Start the API workers and the sweep process with INFERENCE_MODE=remote;
+they then hand videos over through the inference_jobs table
+(core/inference_jobs.py) instead of running inference threads themselves.
+
+Each worker loads the model, then claims as many jobs as it has free threads
+(reserved interactive threads only ever claim interactive jobs), feeds them to
+its own fair-share queue and renews their leases while they wait or run.
+GET /healthz (loop alive), /readyz (model loaded, database reachable, not
+draining) and /metrics are served on INFERENCE_WORKER_PORT. On SIGTERM the
+worker stops claiming, hands unstarted jobs back and drains running ones for
+up to SHUTDOWN_DRAIN_SECONDS.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from core.AI_Service import load_model, unload_model
+from core.config import settings
+from core.inference_jobs import claim_jobs, finish_job, release_jobs, renew_leases
+from core.log import correlation, get_logger
+from core.metrics import _scrape_registry
+from core.processing_queue import INTERACTIVE, LANES, FairProcessingQueue, Job, processing_queue
+from Database.database import SessionLocal
+
+logger = get_logger(__name__)
+
+
+class InferenceWorker:
+    def __init__(self, queue: FairProcessingQueue, worker_id: str, poll_seconds: float):
+        self.queue = queue
+        self.worker_id = worker_id
+        self.poll_seconds = poll_seconds
+        self.model_loaded = False
+        self.db_ok = False
+        self.last_loop = time.monotonic()
+        self._renewed_at = 0.0
+        self._held: Dict[str, Tuple[str, str]] = {}  # claimed video_id -> (lane, company_id), until the job has run
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        queue.on_done = self._job_done
+
+    @property
+    def draining(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def health(self) -> Dict:
+        with self._lock:
+            held = len(self._held)
+        return {
+            "worker_id": self.worker_id,
+            "alive": time.monotonic() - self.last_loop < max(30.0, 5 * self.poll_seconds),
+            "ready": self.model_loaded and self.db_ok and not self.draining,
+            "model_loaded": self.model_loaded,
+            "database": self.db_ok,
+            "draining": self.draining,
+            "held_jobs": held,
+            "lanes": self.queue.stats(),
+        }
+
+    def _job_done(self, job: Job) -> None:
+        db = SessionLocal()
+        try:
+            finish_job(db, self.worker_id, job.video_id)
+        except Exception:
+            # The lease runs out and another worker (or this one) takes the video again
+            db.rollback()
+            logger.exception("Could not finish inference job", extra={"video_id": job.video_id})
+        finally:
+            db.close()
+            with self._lock:
+                self._held.pop(job.video_id, None)
+            self._wake.set()
+
+    def _poll(self) -> None:
+        """Renew held leases and claim jobs for the free threads."""
+        with self._lock:
+            held = dict(self._held)
+        shared_free = self.queue.workers - sum(1 for lane, _ in held.values() if lane != INTERACTIVE)
+        free = self.queue.workers + self.queue.reserved_workers - len(held)
+        # Jobs of a company at its concurrency cap would only wait here while other workers idle
+        per_company = Counter(held.values())
+        busy = {lane: [cid for (l, cid), n in per_company.items() if l == lane and n >= self.queue.max_concurrency]
+                for lane in LANES}
+        db = SessionLocal()
+        try:
+            if held and time.monotonic() - self._renewed_at > settings.INFERENCE_LEASE_SECONDS / 3:
+                renew_leases(db, self.worker_id, list(held))
+                self._renewed_at = time.monotonic()
+            claimed = claim_jobs(db, self.worker_id, free, (INTERACTIVE,), busy[INTERACTIVE])
+            for lane in LANES[1:]:
+                limit = min(free - len(claimed), shared_free - sum(1 for row in claimed if row.lane != INTERACTIVE))
+                claimed += claim_jobs(db, self.worker_id, limit, (lane,), busy[lane])
+            self.db_ok = True
+        except Exception:
+            db.rollback()
+            if self.db_ok:
+                logger.exception("Inference job poll failed")
+            self.db_ok = False
+            return
+        finally:
+            db.close()
+
+        refused = []
+        for row in claimed:
+            with self._lock:
+                self._held[row.video_id] = (row.lane, row.company_id)
+            # Logs and spans of the job join the request (or sweep / upload) that queued it
+            with correlation(row.request_id):
+                if not self.queue.submit(row.company_id, row.video_id, row.lane, row.trace_context):
+                    refused.append(row.video_id)
+        if refused:
+            # Company queue full here (TENANT_MAX_QUEUE_DEPTH): hand the jobs back
+            self._release(refused)
+        if claimed:
+            logger.debug("Claimed inference jobs", extra={"claimed": len(claimed), "released": len(refused)})
+
+    def _release(self, video_ids: List[str]) -> None:
+        """Drop jobs this worker will not run and release their leases to the other workers."""
+        with self._lock:
+            for video_id in video_ids:
+                self._held.pop(video_id, None)
+        db = SessionLocal()
+        try:
+            release_jobs(db, self.worker_id, video_ids)
+        except Exception:
+            db.rollback()
+            logger.exception("Could not release inference jobs; their leases will expire")
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        load_model()
+        self.model_loaded = True
+        self.queue.start()
+        logger.info("Inference worker started", extra={
+            "worker_id": self.worker_id, "workers": self.queue.workers,
+            "reserved_workers": self.queue.reserved_workers,
+        })
+        while not self.draining:
+            self._wake.clear()
+            self._poll()
+            self.last_loop = time.monotonic()
+            self._wake.wait(self.poll_seconds)
+
+        self.queue.shutdown(settings.SHUTDOWN_DRAIN_SECONDS)
+        with self._lock:
+            unstarted = list(self._held)
+        if unstarted:
+            self._release(unstarted)
+        unload_model()
+        self.model_loaded = False
+        logger.info("Inference worker stopped", extra={"worker_id": self.worker_id, "released": len(unstarted)})
+
+
+def serve_health(worker: InferenceWorker, port: int) -> ThreadingHTTPServer:
+    """Serve /healthz, /readyz and /metrics on `port` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST)
+                return
+            if self.path not in ("/healthz", "/readyz"):
+                self._send(404, b'{"detail":"Not Found"}', "application/json")
+                return
+            health = worker.health()
+            ok = health["alive"] if self.path == "/healthz" else health["ready"]
+            self._send(200 if ok else 503, json.dumps(health).encode(), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # probes every few seconds would flood the logs
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="worker-health", daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run inference on videos handed over by the API nodes")
+    parser.add_argument("--workers", type=int, default=settings.INFERENCE_WORKERS,
+                        help="Inference threads serving every lane")
+    parser.add_argument("--reserved-workers", type=int, default=settings.INTERACTIVE_RESERVED_WORKERS,
+                        help="Extra threads serving only the interactive lane")
+    parser.add_argument("--port", type=int, default=settings.INFERENCE_WORKER_PORT,
+                        help="Health / metrics port (0 = off)")
+    parser.add_argument("--poll-seconds", type=float, default=settings.INFERENCE_POLL_SECONDS)
+    args = parser.parse_args()
+
+    processing_queue.workers = args.workers
+    processing_queue.reserved_workers = args.reserved_workers
+    worker = InferenceWorker(processing_queue, f"{socket.gethostname()}-{os.getpid()}", args.poll_seconds)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: worker.stop())
+    server = serve_health(worker, args.port) if args.port else None
+    try:
+        worker.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Optional
+
+from core.config import settings
+
+# Correlation id of the request (or background job) being handled; copied onto every log record
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "event"}
+
+_configured = False
+_configure_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_levels(raw: str) -> Dict[str, str]:
+    """Parse "logger=LEVEL,logger=LEVEL" (LOG_LEVELS)."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def parse_rates(raw: str) -> Dict[str, float]:
+    """Parse "event=rate,event=rate" (LOG_SAMPLE_RATES)."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "event", None):
+            entry["event"] = record.event
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id") or record.request_id is None:
+            record.request_id = "-"
+        line = super().format(record)
+        fields = {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS}
+        return f"{line} {fields}" if fields else line
+
+
+class ContextFilter(logging.Filter):
+    """
+    Stamp the caller's correlation id on the record and sample high-volume events.
+    Records logged with extra={"event": name} are kept with probability
+    LOG_SAMPLE_RATES[name]; warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        event = getattr(record, "event", None)
+        if event is not None and record.levelno < logging.WARNING:
+            rate = self.rates.get(event, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread, keeping `extra` fields and request ids intact."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging() -> None:
+    """
+    Route all logging through a queue to one listener thread that writes to
+    stdout, so request and worker threads never block on the stream. Idempotent.
+    """
+    global _configured, _listener
+    with _configure_lock:
+        if _configured:
+            return
+        _configured = True
+
+        stream = logging.StreamHandler(sys.stdout)
+        stream.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+        listener = logging.handlers.QueueListener(queue.SimpleQueue(), stream, respect_handler_level=False)
+        handler = _QueueHandler(listener.queue)
+        handler.addFilter(ContextFilter(parse_rates(settings.LOG_SAMPLE_RATES)))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        for name, level in parse_levels(settings.LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+        listener.start()
+        _listener = listener
+        # Flush what is still queued on shutdown
+        atexit.register(_stop_listener)
+
+
+def _stop_listener() -> None:
+    if _listener is not None:
+        _listener.stop()
+
+
+def _restart_listener_after_fork() -> None:
+    """The listener thread does not survive fork (preforking servers): give the child its own."""
+    global _listener
+    if _listener is None:
+        return
+    handler = next(h for h in logging.getLogger().handlers if isinstance(h, _QueueHandler))
+    _listener = logging.handlers.QueueListener(queue.SimpleQueue(), *_listener.handlers, respect_handler_level=False)
+    handler.queue = _listener.queue
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    configure_logging()
+    return logging.getLogger(name)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def correlation(request_id: Optional[str]) -> Iterator[Optional[str]]:
+    """Run a block (e.g. a background job) under `request_id` (a fresh one when None)."""
+    token = request_id_var.set(request_id or new_request_id())
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving each request a correlation id: the caller's X-Request-ID
+    when present, otherwise a new one. It is echoed in the response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")[:64]
+        with correlation(incoming or None) as request_id:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,131 @@
+import os
+import time
+
+from fastapi import FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily, REGISTRY
+
+from core.query_budget import check_query_budget, track_request_queries
+from Database.database import engine
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements executed per HTTP request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 200),
+)
+DB_SECONDS_PER_REQUEST = Histogram(
+    "db_seconds_per_request", "Time spent in SQL statements per HTTP request", ["route"],
+)
+INFERENCE_SECONDS = Histogram(
+    "inference_duration_seconds", "Time to process one video", ["lane"],
+    buckets=(0.5, 1, 2, 3, 5, 10, 20, 30, 60, 120, 300),
+)
+INFERENCE_FAILURES = Counter("inference_failures_total", "Videos whose processing raised", ["lane"])
+INFERENCE_FRAMES = Histogram(
+    "inference_frames_used", "Frames scored per processed video",
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384),
+)
+INFERENCE_DEAD_LETTERS = Counter("inference_dead_letters_total", "Videos given up on after INFERENCE_MAX_ATTEMPTS")
+QUEUE_WAIT_SECONDS = Histogram(
+    "inference_queue_wait_seconds", "Time a video waited in the inference queue", ["lane"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600),
+)
+PENDING_VIDEOS = Gauge("pending_videos", "Unprocessed videos seen by the last pending-video sweep")
+SIGNING_SECONDS = Histogram("gcs_signing_duration_seconds", "Time to sign a GCS URL", ["method"])
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash / verify time", ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1, 2),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and DB usage per route template, and
+    logging requests over the query budget.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        with track_request_queries() as db_stats:
+            start = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                # Label by template ("/hr/employees/{employee_id}") to keep the series count bounded
+                path = route.path if route is not None else "unmatched"
+                HTTP_REQUEST_SECONDS.labels(scope["method"], path, str(status[0])).observe(elapsed)
+                DB_QUERIES_PER_REQUEST.labels(path).observe(db_stats.count)
+                DB_SECONDS_PER_REQUEST.labels(path).observe(db_stats.seconds)
+                check_query_budget(scope["method"], path, db_stats)
+
+
+class RuntimeCollector:
+    """Gauges read at scrape time: inference queue depth / age per lane and DB pool usage."""
+
+    def describe(self):
+        # Keeps registration from calling collect(), which would import the (possibly half-loaded) queue module
+        return []
+
+    def collect(self):
+        from core.processing_queue import processing_queue
+
+        depth = GaugeMetricFamily("inference_queue_depth", "Videos waiting per lane", labels=["lane"])
+        running = GaugeMetricFamily("inference_running", "Videos being processed per lane", labels=["lane"])
+        age = GaugeMetricFamily("inference_queue_oldest_age_seconds", "Wait of the oldest queued video", labels=["lane"])
+        for lane, stats in processing_queue.stats().items():
+            depth.add_metric([lane], stats["queued"])
+            running.add_metric([lane], stats["running"])
+            age.add_metric([lane], stats["oldest_age_s"])
+        yield from (depth, running, age)
+
+        pool = engine.pool
+        if hasattr(pool, "checkedout"):
+            for name, value in (
+                ("db_pool_size", pool.size()),
+                ("db_pool_checked_out", pool.checkedout()),
+                ("db_pool_overflow", pool.overflow()),
+            ):
+                yield GaugeMetricFamily(name, "SQLAlchemy connection pool " + name[len("db_pool_"):], value=value)
+
+
+REGISTRY.register(RuntimeCollector())
+
+
+def _scrape_registry() -> CollectorRegistry:
+    """
+    The default registry, or under several workers (PROMETHEUS_MULTIPROC_DIR set,
+    see gunicorn.conf.py) one aggregating every worker's metric files. Runtime
+    gauges are then those of the worker answering the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(RuntimeCollector())
+    return registry
+
+
+def install_metrics(app: FastAPI) -> None:
+    """Add the metrics middleware and the /metrics endpoint to the app."""
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(generate_latest(_scrape_registry()), media_type=CONTENT_TYPE_LATEST)
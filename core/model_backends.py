@@ -0,0 +1,296 @@
+"""
+Model runtimes behind core.AI_Service.EmotionModel.
+
+MODEL_BACKEND picks one:
+
+- "fake": deterministic frame scores (a few scenes per video, each with its
+  own emotion mix, plus per-frame noise). It stands in until a trained model
+  ships and backs tests and benchmarks. Every frame costs MODEL_FAKE_FRAME_MS
+  of GIL-free CPU work, split over the intra-op threads like a real runtime,
+  so cores per worker can be tuned without a model.
+- "onnx": an ONNX model at MODEL_PATH (int8 weights, see
+  `python -m core.model_backends quantize`) run by ONNX Runtime on the CPU,
+  with frames decoded by PyAV. Needs the `onnx` extra.
+
+MODEL_INTRA_OP_THREADS threads work on each inference call (0 = the cores
+divided by INFERENCE_WORKERS) and MODEL_INTER_OP_THREADS run independent
+graph branches (1 = sequential). A backend is loaded once per process and
+warmed up with MODEL_WARMUP_RUNS calls before the first video.
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from core.config import settings
+
+try:
+    import av
+    import onnxruntime as ort
+except ImportError:  # optional: pip install ".[onnx]"
+    av = ort = None
+
+# Labels of models that do not list theirs in the "labels" metadata entry
+DEFAULT_LABELS = ["happy", "sad", "angry", "stressed", "neutral", "excited", "calm", "frustrated"]
+FAKE_FRAME_RATE = 30
+FAKE_MODEL_VERSION = "fake-emotion-1"
+# Decode forward to a frame up to this far ahead instead of seeking to it
+SEEK_AFTER_SECONDS = 2
+
+
+def default_intra_op_threads() -> int:
+    return settings.MODEL_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // max(1, settings.INFERENCE_WORKERS))
+
+
+class VideoFrames:
+    """An opened video: `frame_count` frames, scored on demand."""
+
+    frame_count: int
+
+    def score(self, indices: Sequence[int]) -> np.ndarray:
+        """Scores over the backend's labels, one row per frame index."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "VideoFrames":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ModelBackend:
+    name = "base"
+    labels: List[str] = DEFAULT_LABELS
+    version = "unknown"  # stored with every prediction
+
+    def load(self) -> None:
+        pass
+
+    def warmup(self, runs: int) -> None:
+        pass
+
+    def open(self, video_file_path: str) -> VideoFrames:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class _FakeVideo(VideoFrames):
+    def __init__(self, backend: "FakeBackend", video_file_path: str):
+        self.backend = backend
+        self.key = list(video_file_path.encode())
+        # 10 s to 10 min, fixed per URL
+        self.frame_count = random.Random(video_file_path).randint(10, 600) * FAKE_FRAME_RATE
+        rng = np.random.default_rng(self.key)
+        scenes = int(rng.integers(1, 6))
+        self.scene_starts = np.sort(np.concatenate(([0], rng.integers(1, self.frame_count, scenes - 1))))
+        mixes = rng.random((scenes, len(backend.labels))) ** 3
+        self.scene_mixes = mixes / mixes.sum(axis=1, keepdims=True)
+
+    def score(self, indices: Sequence[int]) -> np.ndarray:
+        indices = np.asarray(indices, dtype=np.int64)
+        self.backend.burn(len(indices))
+        noise = np.random.default_rng([*self.key, *indices.tolist()]).normal(0, 0.05, (len(indices), len(self.backend.labels)))
+        scores = np.clip(self.scene_mixes[np.searchsorted(self.scene_starts, indices, side="right") - 1] + noise, 0, None)
+        return scores / np.maximum(scores.sum(axis=1, keepdims=True), 1e-9)
+
+
+class FakeBackend(ModelBackend):
+    name = "fake"
+    version = FAKE_MODEL_VERSION
+
+    def __init__(self, frame_ms: float, intra_op_threads: int):
+        self.frame_ms = frame_ms
+        self.intra_op_threads = intra_op_threads
+        self._buffer = os.urandom(1 << 22)
+        self._bytes_per_ms = 0.0
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def load(self) -> None:
+        # How much hashing (which releases the GIL) takes a millisecond on one core here
+        best = min(self._timed_hash() for _ in range(5))
+        self._bytes_per_ms = len(self._buffer) / (best * 1000)
+        if self.intra_op_threads > 1:
+            self._pool = ThreadPoolExecutor(self.intra_op_threads, thread_name_prefix="fake-intra-op")
+
+    def _timed_hash(self) -> float:
+        start = time.perf_counter()
+        hashlib.sha256(self._buffer).digest()
+        return time.perf_counter() - start
+
+    def _hash(self, size: int) -> None:
+        for offset in range(0, size, len(self._buffer)):
+            hashlib.sha256(memoryview(self._buffer)[:min(len(self._buffer), size - offset)]).digest()
+
+    def burn(self, frames: int) -> None:
+        """Spend `frames` frames' worth of CPU, over the intra-op threads."""
+        size = int(frames * self.frame_ms * self._bytes_per_ms)
+        if size <= 0:
+            return
+        if self._pool is None:
+            self._hash(size)
+            return
+        share = -(-size // self.intra_op_threads)
+        list(self._pool.map(self._hash, [share] * self.intra_op_threads))
+
+    def warmup(self, runs: int) -> None:
+        for _ in range(runs):
+            self.burn(1)
+
+    def open(self, video_file_path: str) -> VideoFrames:
+        return _FakeVideo(self, video_file_path)
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+class _DecodedVideo(VideoFrames):
+    def __init__(self, backend: "OnnxBackend", video_file_path: str):
+        self.backend = backend
+        self.container = av.open(video_file_path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        self.rate = float(self.stream.average_rate or self.stream.guessed_rate or FAKE_FRAME_RATE)
+        if self.stream.frames:
+            self.frame_count = self.stream.frames
+        elif self.stream.duration is not None:
+            self.frame_count = max(1, int(self.stream.duration * self.stream.time_base * self.rate))
+        else:
+            self.frame_count = max(1, int(self.container.duration / av.time_base * self.rate))
+        self._decoder, self._pts = None, -1
+        self._seek_distance = int(SEEK_AFTER_SECONDS / self.stream.time_base)
+
+    def _frame_at(self, index: int, previous: Optional[np.ndarray]) -> np.ndarray:
+        target = int(index / self.rate / self.stream.time_base) + (self.stream.start_time or 0)
+        # Close ahead: keep decoding forward rather than seek back to a keyframe
+        if self._decoder is None or not self._pts < target <= self._pts + self._seek_distance:
+            self.container.seek(target, stream=self.stream, backward=True, any_frame=False)
+            self._decoder = self.container.decode(self.stream)
+        for frame in self._decoder:
+            self._pts = frame.pts if frame.pts is not None else self._pts
+            if frame.pts is None or frame.pts >= target:
+                return frame.to_ndarray(format="rgb24", width=self.backend.width, height=self.backend.height)
+        self._decoder = None
+        if previous is None:
+            raise ValueError(f"No frame at or after {index} in the video")
+        return previous  # past the last frame: the duration overestimated the frame count
+
+    def score(self, indices: Sequence[int]) -> np.ndarray:
+        order = np.argsort(indices)
+        frames, previous = [None] * len(indices), None
+        for i in order:  # forward through the file
+            previous = frames[i] = self._frame_at(int(indices[i]), previous)
+        batch = np.stack(frames).transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+        return self.backend.infer(batch)
+
+    def close(self) -> None:
+        self.container.close()
+
+
+class OnnxBackend(ModelBackend):
+    """
+    ONNX Runtime on the CPU. The model takes float32 RGB frames in [0, 1] as
+    (batch, 3, height, width) and returns one row of scores (or logits) per
+    frame; its "labels" and "version" metadata entries name the outputs and
+    the model (version defaults to the file name and content hash).
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, intra_op_threads: int, inter_op_threads: int, batch_size: int):
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.batch_size = batch_size
+        self.session = None
+
+    def load(self) -> None:
+        if ort is None:
+            raise RuntimeError('MODEL_BACKEND=onnx needs onnxruntime and av: pip install ".[onnx]"')
+        if not self.model_path:
+            raise RuntimeError("MODEL_BACKEND=onnx needs MODEL_PATH")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+        options.execution_mode = (ort.ExecutionMode.ORT_SEQUENTIAL if self.inter_op_threads <= 1
+                                  else ort.ExecutionMode.ORT_PARALLEL)
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "labels" in metadata:
+            self.labels = [label.strip() for label in metadata["labels"].split(",")]
+        if "version" in metadata:
+            self.version = metadata["version"]
+        else:
+            with open(self.model_path, "rb") as f:
+                digest = hashlib.file_digest(f, "sha256").hexdigest()
+            self.version = f"{os.path.splitext(os.path.basename(self.model_path))[0]}-{digest[:12]}"
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        _, _, self.height, self.width = model_input.shape
+
+    def warmup(self, runs: int) -> None:
+        batch = np.zeros((self.batch_size, 3, self.height, self.width), dtype=np.float32)
+        for _ in range(runs):
+            self.infer(batch)
+
+    def infer(self, batch: np.ndarray) -> np.ndarray:
+        outputs = [
+            self.session.run(None, {self.input_name: batch[i:i + self.batch_size]})[0]
+            for i in range(0, len(batch), self.batch_size)
+        ]
+        scores = np.concatenate(outputs).astype(np.float64)
+        if not np.allclose(scores.sum(axis=1), 1.0, atol=1e-3) or scores.min() < 0:
+            scores = np.exp(scores - scores.max(axis=1, keepdims=True))  # logits -> probabilities
+            scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def open(self, video_file_path: str) -> VideoFrames:
+        return _DecodedVideo(self, video_file_path)
+
+    def close(self) -> None:
+        self.session = None
+
+
+def create_backend(name: Optional[str] = None, intra_op_threads: Optional[int] = None,
+                   inter_op_threads: Optional[int] = None, model_path: Optional[str] = None,
+                   frame_ms: Optional[float] = None) -> ModelBackend:
+    """The configured backend (arguments override the MODEL_* settings); not loaded yet."""
+    name = name or settings.MODEL_BACKEND
+    intra_op_threads = intra_op_threads or default_intra_op_threads()
+    if name == "fake":
+        return FakeBackend(settings.MODEL_FAKE_FRAME_MS if frame_ms is None else frame_ms, intra_op_threads)
+    if name == "onnx":
+        return OnnxBackend(model_path or settings.MODEL_PATH, intra_op_threads,
+                           inter_op_threads or settings.MODEL_INTER_OP_THREADS, settings.MODEL_BATCH_SIZE)
+    raise ValueError(f"Unknown MODEL_BACKEND {name!r}; use fake or onnx")
+
+
+def quantize(source: str, target: str) -> None:
+    """Write an int8 (dynamically quantized) copy of an ONNX model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Model backend tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    quantize_cmd = commands.add_parser("quantize", help="Quantize an ONNX model's weights to int8")
+    quantize_cmd.add_argument("source")
+    quantize_cmd.add_argument("target")
+    args = parser.parse_args()
+    quantize(args.source, args.target)
+    print(f"✅ Wrote {args.target}")
@@ -0,0 +1,176 @@
+import argparse
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+
+from core.config import settings
+from Database.database import engine
+
+# Monthly RANGE-partitioned tables and their partition key (PostgreSQL only)
+PARTITIONED_TABLES: Dict[str, str] = {
+    "videos": "upload_timestamp",
+    "video_emotions": "created_at",
+}
+
+
+def partitioning_supported() -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def _exists(conn, name: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+
+def create_default_partition(conn, table: str) -> None:
+    """Create the partition catching rows outside every monthly one (no-op if it exists)."""
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default_partition_name(table)} PARTITION OF {table} DEFAULT"))
+
+
+def create_partition(conn, table: str, month: date) -> None:
+    """
+    Create the partition of `table` holding `month` (no-op if it exists). Rows of
+    that month that landed in the default partition are moved into it, in the
+    caller's transaction.
+    """
+    name = partition_name(table, month)
+    if _exists(conn, name):
+        return
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    default = default_partition_name(table)
+    has_default, moved = _exists(conn, default), 0
+    if has_default:
+        # The new partition cannot be attached while the default still holds its rows
+        key = PARTITIONED_TABLES[table]
+        conn.execute(text(f"CREATE TEMP TABLE moved_rows (LIKE {table}) ON COMMIT DROP"))
+        moved = conn.execute(text(
+            f"WITH moved AS (DELETE FROM {default} WHERE {key} >= '{start}' AND {key} < '{end}' RETURNING *) "
+            f"INSERT INTO moved_rows SELECT * FROM moved"
+        )).rowcount
+    conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    if has_default:
+        if moved:
+            conn.execute(text(f"INSERT INTO {table} SELECT * FROM moved_rows"))
+        conn.execute(text("DROP TABLE moved_rows"))
+
+
+def ensure_partitions(months_ahead: Optional[int] = None, since: Optional[date] = None) -> int:
+    """
+    Make sure every partitioned table has partitions from `since` (default: this
+    month) through `months_ahead` months into the future, plus a default partition
+    so rows beyond them are still accepted. Safe to call repeatedly; returns the
+    number of months covered.
+    """
+    if not partitioning_supported():
+        return 0
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    current = month_start(datetime.utcnow().date())
+    month = month_start(since) if since else current
+    months = []
+    while month <= add_months(current, months_ahead):
+        months.append(month)
+        month = add_months(month, 1)
+    for table in PARTITIONED_TABLES:
+        existing = {m for _, m in list_partitions(table)}
+        missing = [m for m in months if m not in existing]
+        with engine.connect() as conn:
+            has_default = _exists(conn, default_partition_name(table))
+        if not missing and has_default:
+            continue
+        # Creating a partition locks the parent; give up rather than queue behind long transactions
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+            for month in missing:
+                create_partition(conn, table, month)
+            create_default_partition(conn, table)
+    return len(months)
+
+
+def list_partitions(table: str) -> List[Tuple[str, date]]:
+    """Attached monthly partitions of `table` as (name, month), oldest first."""
+    with engine.connect() as conn:
+        names = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ), {"table": table}).scalars().all()
+
+    prefix = f"{table}_y"
+    partitions = []
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split("m")
+            partitions.append((name, date(int(year), int(month), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def detach_partitions_before(cutoff: date, drop: bool = False,
+                             tables: Sequence[str] = ("video_emotions",)) -> List[str]:
+    """
+    Detach (and optionally drop) every monthly partition of `tables` that ends on
+    or before `cutoff`. Detaching is a catalog operation, so removing a month of
+    data costs the same regardless of how many rows it holds. Only video_emotions
+    by default: detaching `videos` months removes those videos themselves.
+    """
+    if not partitioning_supported():
+        return []
+    removed = []
+    for table in tables:
+        for name, month in list_partitions(table):
+            if add_months(month, 1) > cutoff:
+                continue
+            # Not CONCURRENTLY: PostgreSQL refuses that next to a default partition. The
+            # plain detach locks the parent, so give up rather than queue behind long transactions
+            with engine.begin() as conn:
+                conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                if table == "videos":
+                    conn.execute(text(f"DELETE FROM video_keys k USING {name} v WHERE k.video_id = v.video_id"))
+                if drop:
+                    conn.execute(text(f"DROP TABLE {name}"))
+            removed.append(name)
+    return removed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage monthly partitions of videos / video_emotions")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ensure = sub.add_parser("ensure", help="Create missing partitions up to N months ahead")
+    ensure.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    detach = sub.add_parser("detach", help="Detach partitions of months ending on or before a date")
+    detach.add_argument("--before", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    detach.add_argument("--drop", action="store_true", help="Drop detached partitions")
+    detach.add_argument("--table", dest="tables", action="append", choices=list(PARTITIONED_TABLES),
+                        help="Table to detach from, repeatable (default video_emotions)")
+    args = parser.parse_args()
+
+    if not partitioning_supported():
+        parser.error("partitioning requires PostgreSQL")
+
+    if args.command == "ensure":
+        print(f"✅ Partitions cover {ensure_partitions(args.months_ahead)} months")
+    else:
+        for name in detach_partitions_before(args.before, args.drop, args.tables or ["video_emotions"]):
+            print(f"🗑️ {'Dropped' if args.drop else 'Detached'} {name}")
+
+
+if __name__ == "__main__":
+    main()
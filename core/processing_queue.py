@@ -0,0 +1,332 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.AI_Service import process_video_with_ai
+from core.company_stats import refresh_company_stats
+from core.config import settings
+from core.log import correlation, get_logger, request_id_var
+from core.metrics import INFERENCE_FAILURES, INFERENCE_SECONDS, QUEUE_WAIT_SECONDS
+from core.processing_state import startable
+from core.tracing import current_traceparent, record_span, resume_trace
+from Database.database import SessionLocal, Users, Video, VideoProcessing
+
+
+def parse_weights(raw: str) -> Dict[str, float]:
+    """Parse "company_id=weight,company_id=weight" (TENANT_WEIGHTS)."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        company_id, _, weight = item.partition("=")
+        weights[company_id.strip()] = float(weight)
+    return weights
+
+
+# Priority lanes, highest first. Lanes are served in order whenever a worker is free
+# (a running job is never preempted); reserved workers only ever serve "interactive".
+LANES: Tuple[str, ...] = ("interactive", "normal", "backfill")
+INTERACTIVE, NORMAL, BACKFILL = LANES
+
+WAIT_SAMPLE_SIZE = 1024
+
+logger = get_logger(__name__)
+
+
+class Job(NamedTuple):
+    lane: str
+    company_id: str
+    video_id: str
+    enqueued_at: float  # time.monotonic()
+    request_id: Optional[str]  # correlation id of the submitter
+    traceparent: Optional[str]  # trace the job continues
+
+
+class _Tenant:
+    def __init__(self, weight: float):
+        self.weight = weight
+        self.pending: Deque[Tuple[float, Job]] = deque()  # (virtual finish time, job)
+        self.last_finish = 0.0
+        self.running = 0
+
+
+class _Lane:
+    def __init__(self, name: str):
+        self.name = name
+        self.tenants: Dict[str, _Tenant] = {}
+        self.virtual_time = 0.0
+        self.waits: Deque[float] = deque(maxlen=WAIT_SAMPLE_SIZE)  # recent queue waits, seconds
+        self.started = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.waits.append(seconds)
+        self.started += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+        QUEUE_WAIT_SECONDS.labels(self.name).observe(seconds)
+
+    def wait_stats(self) -> Dict[str, float]:
+        recent = sorted(self.waits)
+        return {
+            "started": self.started,
+            "wait_avg_s": round(self.wait_total / self.started, 3) if self.started else 0.0,
+            "wait_p50_s": round(recent[len(recent) // 2], 3) if recent else 0.0,
+            "wait_p95_s": round(recent[int(len(recent) * 0.95)], 3) if recent else 0.0,
+            "wait_max_s": round(self.wait_max, 3),
+        }
+
+
+class FairProcessingQueue:
+    """
+    Weighted fair queue of video inference jobs across companies, split into
+    priority lanes.
+
+    Within a lane each job gets a virtual finish time of max(virtual clock, tenant's
+    last finish) + 1/weight, and workers take the tenant head with the smallest
+    finish time. A tenant with a large backlog therefore only gets its weighted
+    share of the workers, while a company that just uploaded one video is served
+    within one round. Tenants at their concurrency cap (counted per lane) are
+    skipped until a job of theirs finishes, and enqueueing beyond a tenant's
+    queue-depth limit is refused.
+
+    Shared workers take the highest non-empty lane; `reserved_workers` extra
+    workers only take interactive jobs, so a user waiting on screen never queues
+    behind a backfill batch that already occupies the shared pool.
+
+    `on_done`, when set, is called with every job once it has run (succeeded or not).
+    """
+
+    def __init__(self, workers: int, max_concurrency: int, max_depth: int,
+                 weights: Optional[Dict[str, float]] = None, reserved_workers: int = 0):
+        self.workers = workers
+        self.reserved_workers = reserved_workers
+        self.max_concurrency = max_concurrency
+        self.max_depth = max_depth
+        self.weights = weights or {}
+        self._lanes: Dict[str, _Lane] = {lane: _Lane(lane) for lane in LANES}
+        self._queued: Dict[str, Tuple[str, str]] = {}  # video_id -> (lane, company_id) while waiting
+        self._running: Set[str] = set()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self.on_done: Optional[Callable[[Job], None]] = None
+
+    def _tenant(self, lane: str, company_id: str) -> _Tenant:
+        tenants = self._lanes[lane].tenants
+        tenant = tenants.get(company_id)
+        if tenant is None:
+            tenant = tenants[company_id] = _Tenant(self.weights.get(company_id, 1.0))
+        return tenant
+
+    def _withdraw(self, video_id: str) -> None:
+        lane, company_id = self._queued.pop(video_id)
+        tenants = self._lanes[lane].tenants
+        tenant = tenants[company_id]
+        tenant.pending = deque(item for item in tenant.pending if item[1].video_id != video_id)
+        if not tenant.pending and not tenant.running:
+            del tenants[company_id]
+
+    def submit(self, company_id: str, video_id: str, lane: str = NORMAL,
+               traceparent: Optional[str] = None) -> bool:
+        """
+        Queue one video in `lane`. Returns False when the company's queue in that
+        lane is full; videos already running or queued in the same or a higher lane
+        count as accepted, and a video waiting in a lower lane is moved up.
+        The job continues `traceparent` (default: the caller's current trace).
+        """
+        with self._cond:
+            if video_id in self._running:
+                return True
+            if video_id in self._queued:
+                if LANES.index(self._queued[video_id][0]) <= LANES.index(lane):
+                    return True
+                self._withdraw(video_id)
+            lane_state = self._lanes[lane]
+            tenant = self._tenant(lane, company_id)
+            if len(tenant.pending) >= self.max_depth:
+                return False
+            finish = max(lane_state.virtual_time, tenant.last_finish) + 1.0 / tenant.weight
+            tenant.last_finish = finish
+            job = Job(lane, company_id, video_id, time.monotonic(), request_id_var.get(),
+                      traceparent or current_traceparent())
+            tenant.pending.append((finish, job))
+            self._queued[video_id] = (lane, company_id)
+            self._cond.notify_all()
+            return True
+
+    def _next_job(self, lanes: Tuple[str, ...]) -> Optional[Job]:
+        for lane in lanes:
+            lane_state = self._lanes[lane]
+            best: Optional[Tuple[float, str]] = None
+            for company_id, tenant in lane_state.tenants.items():
+                if not tenant.pending or tenant.running >= self.max_concurrency:
+                    continue
+                finish = tenant.pending[0][0]
+                if best is None or finish < best[0]:
+                    best = (finish, company_id)
+            if best is None:
+                continue
+
+            finish, company_id = best
+            tenant = lane_state.tenants[company_id]
+            _, job = tenant.pending.popleft()
+            tenant.running += 1
+            lane_state.virtual_time = max(lane_state.virtual_time, finish)
+            lane_state.record_wait(time.monotonic() - job.enqueued_at)
+            del self._queued[job.video_id]
+            self._running.add(job.video_id)
+            return job
+        return None
+
+    def take(self, lanes: Tuple[str, ...] = LANES,
+             timeout: Optional[float] = None) -> Optional[Job]:
+        """Block until a job in `lanes` is runnable; returns it, or None on timeout or shutdown."""
+        with self._cond:
+            job = None if self._stopping else self._next_job(lanes)
+            while job is None:
+                if self._stopping or not self._cond.wait(timeout):
+                    return None
+                job = None if self._stopping else self._next_job(lanes)
+            return job
+
+    def done(self, lane: str, company_id: str, video_id: str) -> None:
+        with self._cond:
+            tenants = self._lanes[lane].tenants
+            tenant = tenants[company_id]
+            tenant.running -= 1
+            self._running.discard(video_id)
+            if not tenant.pending and not tenant.running:
+                del tenants[company_id]
+            self._cond.notify_all()
+
+    def idle(self) -> bool:
+        with self._cond:
+            return not self._queued and not self._running
+
+    def stats(self, company_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Per-lane queued / running counts (optionally for one company) and queue-wait metrics."""
+        now = time.monotonic()
+        with self._cond:
+            lanes = {}
+            for lane, lane_state in self._lanes.items():
+                tenants = [t for cid, t in lane_state.tenants.items() if company_id is None or cid == company_id]
+                oldest = min((t.pending[0][1].enqueued_at for t in tenants if t.pending), default=now)
+                lanes[lane] = {
+                    "queued": sum(len(t.pending) for t in tenants),
+                    "running": sum(t.running for t in tenants),
+                    "oldest_age_s": round(now - oldest, 3),
+                    **lane_state.wait_stats(),
+                }
+            return lanes
+
+    def _work(self, lanes: Tuple[str, ...]) -> None:
+        while True:
+            job = self.take(lanes)
+            if job is None:
+                return
+            # Logs and spans of the job join the request (or sweep / upload) that queued it
+            with correlation(job.request_id), \
+                    resume_trace(job.traceparent, "inference.job", video_id=job.video_id, lane=job.lane):
+                record_span("queue.wait", job.enqueued_at, lane=job.lane)
+                db = SessionLocal()
+                try:
+                    with INFERENCE_SECONDS.labels(job.lane).time():
+                        process_video_with_ai(job.video_id, db)
+                except Exception:
+                    INFERENCE_FAILURES.labels(job.lane).inc()
+                    db.rollback()
+                    logger.exception("Error processing video", extra={"video_id": job.video_id, "lane": job.lane})
+                finally:
+                    db.close()
+                    self.done(job.lane, job.company_id, job.video_id)
+                    if self.on_done is not None:
+                        self.on_done(job)
+            if self.idle():
+                # Backlog drained: pick up the processed batch in the summary cards, at most
+                # every COMPANY_STATS_BATCH_REFRESH_SECONDS across all processes
+                refresh_company_stats(settings.COMPANY_STATS_BATCH_REFRESH_SECONDS)
+
+    def start(self) -> None:
+        """Start the worker threads (idempotent)."""
+        with self._cond:
+            if self._threads:
+                return
+            pools = [
+                ("inference", LANES, self.workers),
+                ("inference-interactive", (INTERACTIVE,), self.reserved_workers),
+            ]
+            for name, lanes, count in pools:
+                for i in range(count):
+                    thread = threading.Thread(target=self._work, args=(lanes,), name=f"{name}-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def shutdown(self, timeout: float) -> bool:
+        """
+        Stop taking jobs and wait up to `timeout` seconds for the running ones.
+        Queued videos are dropped; they are still unprocessed in the database,
+        so the next pending-video sweep picks them up. Returns True when drained.
+        """
+        with self._cond:
+            self._stopping = True
+            dropped = len(self._queued)
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        drained = not any(thread.is_alive() for thread in self._threads)
+        logger.info("Inference workers stopped", extra={"drained": drained, "dropped_queued": dropped})
+        return drained
+
+
+processing_queue = FairProcessingQueue(
+    workers=settings.INFERENCE_WORKERS,
+    max_concurrency=settings.TENANT_MAX_CONCURRENCY,
+    max_depth=settings.TENANT_MAX_QUEUE_DEPTH,
+    weights=parse_weights(settings.TENANT_WEIGHTS),
+    reserved_workers=settings.INTERACTIVE_RESERVED_WORKERS,
+)
+
+
+def submit_videos(db: Session, videos: Iterable[Tuple[str, str, Optional[str]]],
+                  lane: str) -> Tuple[List[str], List[str]]:
+    """
+    Hand (company_id, video_id, traceparent) videos to inference in `lane`: this
+    process's queue, or with INFERENCE_MODE=remote the inference worker nodes
+    (core/inference_jobs.py). Returns accepted and rejected video ids.
+    """
+    if settings.INFERENCE_MODE == "remote":
+        from core.inference_jobs import enqueue_jobs  # imports this module
+
+        return enqueue_jobs(db, videos, lane)
+    accepted, rejected = [], []
+    for company_id, video_id, traceparent in videos:
+        (accepted if processing_queue.submit(company_id, video_id, lane, traceparent) else rejected).append(video_id)
+    return accepted, rejected
+
+
+def enqueue_pending_videos(db: Session, company_id: Optional[str] = None, user_id: Optional[str] = None,
+                           lane: str = BACKFILL) -> Dict[str, List[str]]:
+    """
+    Queue unprocessed videos (optionally of one company / user) in `lane`; returns accepted and rejected ids.
+    Videos being processed, waiting for a retry or dead-lettered are left out.
+    """
+    q = (
+        db.query(Users.company_id, Video.video_id, Video.trace_context)
+        .select_from(Video)
+        .join(Users, Users.user_id == Video.user_id)
+        .outerjoin(VideoProcessing, VideoProcessing.video_id == Video.video_id)
+        .filter(Video.is_processed == False, startable())
+        .order_by(Video.upload_timestamp)
+    )
+    if company_id is not None:
+        q = q.filter(Users.company_id == company_id)
+    if user_id is not None:
+        q = q.filter(Video.user_id == user_id)
+
+    # Processing continues the upload's trace, so one trace spans upload to prediction
+    accepted, rejected = submit_videos(db, q.all(), lane)
+    return {"accepted": accepted, "rejected": rejected}
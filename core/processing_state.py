@@ -0,0 +1,182 @@
+"""
+Per-video processing state: single-flight attempts, retries and dead letters.
+
+Every run of process_video_with_ai starts with begin_attempt(), one atomic
+upsert on the video's video_processing row. It only succeeds when no other
+attempt is running anywhere (API workers, the sweep process, worker nodes)
+and the retry backoff has passed, so a concurrent request for the same
+video joins the running computation instead of starting another. The
+predictions of an attempt are committed together with its finish_attempt(),
+which fails once another attempt has taken over.
+
+A failed attempt is retried by the pending-video sweep after
+INFERENCE_RETRY_BASE_SECONDS, doubling per attempt up to
+INFERENCE_RETRY_MAX_SECONDS. After INFERENCE_MAX_ATTEMPTS the video is
+dead-lettered and left alone until HR retries it. An attempt still running
+after INFERENCE_LEASE_SECONDS is taken to have died with its process and
+counts as failed.
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.log import get_logger
+from core.metrics import INFERENCE_DEAD_LETTERS
+from Database.database import Users, Video, VideoProcessing
+
+logger = get_logger(__name__)
+
+RUNNING, FAILED, DEAD, DONE = "running", "failed", "dead", "done"
+
+# Longest stored error message
+MAX_ERROR_LENGTH = 2000
+
+
+class AttemptLost(Exception):
+    """The attempt was presumed dead and another one took over the video."""
+
+
+def _stale_before(now: datetime) -> datetime:
+    return now - timedelta(seconds=settings.INFERENCE_LEASE_SECONDS)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff after the `attempts`-th failed attempt."""
+    seconds = settings.INFERENCE_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.INFERENCE_RETRY_MAX_SECONDS))
+
+
+def startable(now: Optional[datetime] = None):
+    """
+    Filter for videos (outer-joined to VideoProcessing) an attempt may start
+    on: never tried, failed with the backoff passed, or running but stale.
+    """
+    now = now or datetime.utcnow()
+    return or_(
+        VideoProcessing.video_id.is_(None),
+        and_(VideoProcessing.status == FAILED, VideoProcessing.next_attempt_at <= now),
+        and_(VideoProcessing.status == RUNNING, VideoProcessing.started_at < _stale_before(now)),
+    )
+
+
+def begin_attempt(db: Session, video_id: str) -> Optional[str]:
+    """
+    Start an attempt on `video_id`. Returns its id, or None when the video is
+    being processed elsewhere, waiting for a retry, dead-lettered or done.
+    Commits.
+    """
+    now = datetime.utcnow()
+    attempt_id = uuid.uuid4().hex
+    dialect = {"postgresql": postgresql, "sqlite": sqlite}[db.get_bind().dialect.name]
+    stmt = dialect.insert(VideoProcessing).values(
+        video_id=video_id, status=RUNNING, attempts=1, attempt_id=attempt_id,
+        started_at=now, updated_at=now,
+    )
+    current = VideoProcessing.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["video_id"],
+        set_={
+            "status": RUNNING, "attempts": current.attempts + 1, "attempt_id": attempt_id,
+            "started_at": now, "next_attempt_at": None, "updated_at": now,
+        },
+        where=or_(
+            and_(current.status == FAILED, current.next_attempt_at <= now),
+            and_(current.status == RUNNING, current.started_at < _stale_before(now)),
+        ),
+    ).returning(current.attempts)
+    attempts = db.execute(stmt).scalar()
+    db.commit()
+    if attempts is None:
+        return None
+    if attempts > 1:
+        logger.info("Retrying video", extra={"video_id": video_id, "attempt": attempts})
+    return attempt_id
+
+
+def finish_attempt(db: Session, video_id: str, attempt_id: str, model_version: Optional[str]) -> None:
+    """Mark the attempt done in the caller's transaction; raises AttemptLost if it was taken over."""
+    result = db.execute(
+        update(VideoProcessing)
+        .where(VideoProcessing.video_id == video_id, VideoProcessing.attempt_id == attempt_id,
+               VideoProcessing.status == RUNNING)
+        .values(status=DONE, attempt_id=None, last_error=None, model_version=model_version,
+                updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise AttemptLost(video_id)
+
+
+def fail_attempt(db: Session, video_id: str, attempt_id: str, error: BaseException) -> Optional[str]:
+    """
+    Record a failed attempt: FAILED with a retry time, or DEAD after
+    INFERENCE_MAX_ATTEMPTS. Returns the new status (None if the attempt had
+    been taken over). Commits.
+    """
+    state = (
+        db.query(VideoProcessing)
+        .filter(VideoProcessing.video_id == video_id, VideoProcessing.attempt_id == attempt_id)
+        .with_for_update()
+        .first()
+    )
+    if state is None or state.status != RUNNING:
+        db.rollback()
+        return None
+    now = datetime.utcnow()
+    state.attempt_id = None
+    state.last_error = f"{error.__class__.__name__}: {error}"[:MAX_ERROR_LENGTH]
+    state.updated_at = now
+    if state.attempts >= settings.INFERENCE_MAX_ATTEMPTS:
+        state.status = DEAD
+        state.next_attempt_at = None
+        INFERENCE_DEAD_LETTERS.inc()
+        logger.error("Video dead-lettered", extra={"video_id": video_id, "attempts": state.attempts,
+                                                   "error": state.last_error})
+    else:
+        state.status = FAILED
+        state.next_attempt_at = now + retry_delay(state.attempts)
+    status = state.status
+    db.commit()
+    return status
+
+
+def get_state(db: Session, video_id: str) -> Optional[VideoProcessing]:
+    return db.query(VideoProcessing).filter(VideoProcessing.video_id == video_id).first()
+
+
+def dead_letters(db: Session, company_id: str) -> List[Dict]:
+    """The company's dead-lettered videos, most recent first."""
+    rows = (
+        db.query(VideoProcessing, Video.user_id)
+        .join(Video, Video.video_id == VideoProcessing.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id, VideoProcessing.status == DEAD)
+        .order_by(VideoProcessing.updated_at.desc())
+    )
+    return [
+        {
+            "video_id": state.video_id,
+            "user_id": user_id,
+            "attempts": state.attempts,
+            "last_error": state.last_error,
+            "failed_at": state.updated_at,
+        }
+        for state, user_id in rows
+    ]
+
+
+def retry_dead_letter(db: Session, video_id: str) -> bool:
+    """Give a dead-lettered video a fresh set of attempts, due now. Commits."""
+    result = db.execute(
+        update(VideoProcessing)
+        .where(VideoProcessing.video_id == video_id, VideoProcessing.status == DEAD)
+        .values(status=FAILED, attempts=0, next_attempt_at=datetime.utcnow(), updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
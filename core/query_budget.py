@@ -0,0 +1,129 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from prometheus_client import Histogram
+from sqlalchemy import event
+
+from core.config import settings
+from core.log import get_logger
+from Database.database import engine
+from Database.replicas import replicas
+
+logger = get_logger(__name__)
+
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of single SQL statements")
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:[^()]|\([^()]*\))*\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals and IN-lists collapsed, so repeats of one query compare equal."""
+    statement = _IN_LIST.sub("IN (...)", statement)
+    statement = _LITERAL.sub("?", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryStats:
+    """Statements executed in one unit of work (a request or an assert_max_queries block)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def add(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] += 1
+
+    def repeated(self, min_count: int = 2) -> List[tuple]:
+        """(fingerprint, count) of statements executed at least `min_count` times, most frequent first."""
+        repeats = Counter()
+        for statement, count in self.statements.items():
+            repeats[fingerprint(statement)] += count
+        return [(fp, n) for fp, n in repeats.most_common() if n >= min_count]
+
+    def summary(self, limit: int = 5) -> str:
+        lines = [f"  {n}x {fp[:200]}" for fp, n in self.repeated()[:limit]]
+        return "\n".join(lines) if lines else "  (no repeated statements)"
+
+
+# Stats of the request being served. The object is shared with the threadpool
+# copies of the context, so sync endpoints and dependencies add to it.
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+# Blocks of assert_max_queries; they count every statement, whichever thread runs it
+_watchers: List[QueryStats] = []
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.add(statement, elapsed)
+    for watcher in _watchers:
+        watcher.add(statement, elapsed)
+
+
+# Primary and replicas alike
+for _engine in [engine, *(r.engine for r in replicas)]:
+    event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_request_queries() -> Iterator[QueryStats]:
+    """Count the statements of the current request (used by the metrics middleware)."""
+    stats = QueryStats()
+    token = _request_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_queries.reset(token)
+
+
+def check_query_budget(method: str, path: str, stats: QueryStats) -> bool:
+    """Log a request over QUERY_BUDGET statements or QUERY_TIME_BUDGET_MS of DB time; returns True if over."""
+    over_count = settings.QUERY_BUDGET > 0 and stats.count > settings.QUERY_BUDGET
+    over_time = settings.QUERY_TIME_BUDGET_MS > 0 and stats.seconds * 1000 > settings.QUERY_TIME_BUDGET_MS
+    if not (over_count or over_time):
+        return False
+    logger.warning("Request over query budget", extra={
+        "method": method,
+        "route": path,
+        "queries": stats.count,
+        "db_ms": round(stats.seconds * 1000, 1),
+        "query_budget": settings.QUERY_BUDGET,
+        "db_ms_budget": settings.QUERY_TIME_BUDGET_MS,
+        "repeated": [{"count": n, "statement": fp[:200]} for fp, n in stats.repeated()[:5]],
+    })
+    return True
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """
+    Fail when the block runs more than `max_queries` statements, listing the
+    repeated ones. Pins an endpoint's query count in tests:
+
+        with assert_max_queries(6):
+            client.get("/hr/employees", headers=hr_headers)
+    """
+    stats = QueryStats()
+    _watchers.append(stats)
+    try:
+        yield stats
+    finally:
+        _watchers.remove(stats)
+    if stats.count > max_queries:
+        raise AssertionError(f"{stats.count} queries executed, expected at most {max_queries}\n{stats.summary()}")
@@ -0,0 +1,194 @@
+import argparse
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import literal_column, tuple_
+from sqlalchemy.orm import Session
+
+from core.cache import bump_company_version
+from core.columnar import columnar_store
+from core.config import settings
+from core.log import get_logger
+from core.sketches import build_sketches
+from Database.database import Company, CompanyRetention, EmotionSketch, Prediction, SessionLocal, Users, Video, VideoEmotion, engine
+
+logger = get_logger(__name__)
+
+
+def get_retention(db: Session, company_id: str) -> Optional[CompanyRetention]:
+    return db.query(CompanyRetention).filter(CompanyRetention.company_id == company_id).first()
+
+
+def get_compacted_through(db: Session, company_id: str) -> Optional[date]:
+    """Last day whose raw rows have been folded into the daily sketches (None = nothing compacted)."""
+    row = (
+        db.query(CompanyRetention.compacted_through)
+        .filter(CompanyRetention.company_id == company_id)
+        .first()
+    )
+    return row[0] if row else None
+
+
+def effective_retention_days(policy: Optional[CompanyRetention]) -> int:
+    if policy is not None and policy.raw_retention_days is not None:
+        return policy.raw_retention_days
+    return settings.RAW_RETENTION_DAYS
+
+
+def set_retention_days(db: Session, company_id: str, days: Optional[int]) -> CompanyRetention:
+    """Set a company's raw retention (None = fall back to RAW_RETENTION_DAYS, 0 = keep forever)."""
+    policy = get_retention(db, company_id)
+    if policy is None:
+        policy = CompanyRetention(company_id=company_id)
+        db.add(policy)
+    policy.raw_retention_days = days
+    policy.updated_at = datetime.utcnow()
+    db.commit()
+    return policy
+
+
+def _company_raw_rows(db: Session, company_id: str):
+    return (
+        db.query(VideoEmotion)
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+    )
+
+
+def compact_days(db: Session, company_id: str, first_day: date, last_day: date) -> int:
+    """
+    Rebuild the company's sketches for [first_day, last_day] from raw rows, so the
+    daily aggregates are exact before the rows go. Returns raw rows folded in.
+    """
+    start = datetime.combine(first_day, datetime.min.time())
+    end = datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+    q = _company_raw_rows(db, company_id).filter(VideoEmotion.created_at >= start, VideoEmotion.created_at < end)
+    folded = q.count()
+    sketches = build_sketches(
+        q.with_entities(VideoEmotion.created_at, *VideoEmotion.score_columns()).yield_per(1000)
+    )
+
+    db.query(EmotionSketch).filter(
+        EmotionSketch.company_id == company_id,
+        EmotionSketch.day >= first_day,
+        EmotionSketch.day <= last_day,
+    ).delete(synchronize_session=False)
+    for (std, day), sketch in sketches.items():
+        db.add(EmotionSketch(company_id=company_id, emotion=std, day=day,
+                             count=sketch.count, sketch=sketch.to_json()))
+    return folded
+
+
+def purge_raw_rows(db: Session, company_id: str, before: datetime, batch_size: int) -> Dict[str, int]:
+    """
+    Delete the company's raw rows created before `before` in batches, committing
+    each batch so no transaction holds row locks for long.
+    """
+    purged, reclaimed = 0, 0
+    measure = engine.dialect.name == "postgresql"
+    while True:
+        q = _company_raw_rows(db, company_id).filter(VideoEmotion.created_at < before)
+        cols = [VideoEmotion.video_id, VideoEmotion.created_at]
+        if measure:
+            cols.append(literal_column("pg_column_size(video_emotions.*)"))
+        batch = q.with_entities(*cols).limit(batch_size).all()
+        if not batch:
+            break
+
+        keys = [(row[0], row[1]) for row in batch]
+        db.query(VideoEmotion).filter(
+            tuple_(VideoEmotion.video_id, VideoEmotion.created_at).in_(keys)
+        ).delete(synchronize_session=False)
+        # Legacy rows kept after migration would otherwise outlive the window
+        db.query(Prediction).filter(
+            Prediction.video_id.in_({video_id for video_id, _ in keys})
+        ).delete(synchronize_session=False)
+        db.commit()
+        purged += len(batch)
+        if measure:
+            reclaimed += sum(row[2] for row in batch)
+    return {"rows_purged": purged, "bytes_reclaimed": reclaimed if measure else None}
+
+
+def compact_company(db: Session, company_id: str, today: Optional[date] = None,
+                    batch_size: Optional[int] = None) -> Optional[Dict]:
+    """
+    Apply a company's retention policy: fold raw rows older than the retention
+    window into daily aggregates, publish the new compacted_through day, then purge
+    the raw rows. Returns a report, or None when raw rows are kept forever.
+    """
+    policy = get_retention(db, company_id)
+    days = effective_retention_days(policy)
+    if days <= 0:
+        return None
+
+    today = today or datetime.utcnow().date()
+    cutoff = today - timedelta(days=days)  # raw rows from `cutoff` onwards are kept
+    last_day = cutoff - timedelta(days=1)
+
+    first_created = (
+        _company_raw_rows(db, company_id)
+        .filter(VideoEmotion.created_at < datetime.combine(cutoff, datetime.min.time()))
+        .with_entities(VideoEmotion.created_at)
+        .order_by(VideoEmotion.created_at)
+        .first()
+    )
+    compacted = 0
+    if first_created is not None:
+        # Days up to the previous compacted_through are already aggregated (and maybe partly purged)
+        first_day = first_created[0].date()
+        if policy is not None and policy.compacted_through is not None:
+            first_day = max(first_day, policy.compacted_through + timedelta(days=1))
+        if first_day <= last_day:
+            compacted = compact_days(db, company_id, first_day, last_day)
+
+    if policy is None:
+        policy = CompanyRetention(company_id=company_id)
+        db.add(policy)
+    if policy.compacted_through is None or policy.compacted_through < last_day:
+        policy.compacted_through = last_day
+    policy.updated_at = datetime.utcnow()
+    # Readers switch to the aggregates for compacted days before the raw rows disappear
+    bump_company_version(db, company_id)
+    db.commit()
+
+    report = purge_raw_rows(db, company_id, datetime.combine(cutoff, datetime.min.time()),
+                            batch_size or settings.RETENTION_PURGE_BATCH_SIZE)
+    if report["rows_purged"]:
+        columnar_store.discard(company_id)
+        # Other processes revalidate their columns and result caches on the next read
+        bump_company_version(db, company_id)
+        db.commit()
+    return {
+        "company_id": company_id,
+        "compacted_through": last_day.isoformat(),
+        "rows_compacted": compacted,
+        **report,
+    }
+
+
+def run_retention(company_id: Optional[str] = None) -> List[Dict]:
+    """Run compaction for one company or every company; returns the per-company reports."""
+    db = SessionLocal()
+    reports = []
+    try:
+        company_ids = [company_id] if company_id else [cid for (cid,) in db.query(Company.id).all()]
+        for cid in company_ids:
+            report = compact_company(db, cid)
+            if report is not None:
+                logger.info("Applied retention", extra=report)
+                reports.append(report)
+    except Exception:
+        logger.exception("Error in retention job")
+        db.rollback()
+    finally:
+        db.close()
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact and purge raw predictions past their retention window")
+    parser.add_argument("--company", help="Only this company id")
+    args = parser.parse_args()
+    run_retention(args.company)
@@ -1,28 +1,100 @@
+import signal
+import threading
+
 from apscheduler.schedulers.background import BackgroundScheduler
-from Database.database import SessionLocal, Video
-from core.AI_Service import process_video_with_ai
+from Database.database import SessionLocal
+from core.AI_Service import load_model, unload_model
+from core.company_stats import refresh_company_stats
+from core.processing_queue import enqueue_pending_videos, processing_queue
+from core.config import settings
+from core.log import correlation, get_logger
+from core.metrics import PENDING_VIDEOS
+from core.partitions import ensure_partitions
+from core.retention import run_retention
+from Database.migrations import schema_is_current
+from Database.replicas import check_replicas, replicas
+
+logger = get_logger(__name__)
 
 def auto_process_pending_videos():
-    """Check for unprocessed videos and process them."""
+    """Queue unprocessed videos; the fair-share workers pick them up per company."""
     db = SessionLocal()
-    try:
-        pending_videos = db.query(Video).filter(Video.is_processed == False).all()
-        if not pending_videos:
-            print("✅ No pending videos found.")
-            return
-
-        print(f"🎥 Found {len(pending_videos)} pending videos to process...")
-        for v in pending_videos:
-            # Directly call AI processing
-            process_video_with_ai(v.video_id, db)
-    except Exception as e:
-        print(f"❌ Error in auto_process_pending_videos: {e}")
-    finally:
-        db.close()
-
-def start_scheduler():
-    """Initialize and start the background scheduler."""
+    # One correlation id per sweep, carried into the processing of every video it queues
+    with correlation(None):
+        try:
+            result = enqueue_pending_videos(db)
+            PENDING_VIDEOS.set(len(result["accepted"]) + len(result["rejected"]))
+            if not result["accepted"] and not result["rejected"]:
+                logger.debug("No pending videos found")
+                return
+
+            logger.info("Queued pending videos", extra={
+                "queued": len(result["accepted"]),
+                "deferred": len(result["rejected"]),  # over per-company queue limits
+            })
+        except Exception:
+            logger.exception("Error in auto_process_pending_videos")
+        finally:
+            db.close()
+
+def ensure_migrated_partitions():
+    """Daily partition upkeep, once `python -m Database.migrations` has partitioned the tables."""
+    if schema_is_current():
+        ensure_partitions()
+
+_scheduler = None
+
+
+def start_scheduler(sweeps: bool = None):
+    """
+    Start the inference workers and the background scheduler.
+
+    Every process checks its replicas; the company-wide sweeps (pending videos,
+    stats refresh, partitions, retention) only run where `sweeps` is on
+    (default SCHEDULER_ENABLED). Production API workers turn it off and run
+    the sweeps once, in `python -m core.scheduler`. With INFERENCE_MODE=remote
+    (gunicorn.conf.py's default for API workers) no model is loaded and no
+    inference runs here; `python -m core.inference_worker` nodes take the videos.
+    """
+    global _scheduler
+    if sweeps is None:
+        sweeps = settings.SCHEDULER_ENABLED
+    if settings.INFERENCE_MODE != "remote":
+        load_model()  # warm, post-fork, before the first video
+        processing_queue.start()
     scheduler = BackgroundScheduler()
-    scheduler.add_job(auto_process_pending_videos, "interval", minutes=1)
+    if sweeps:
+        scheduler.add_job(auto_process_pending_videos, "interval", minutes=1)
+        scheduler.add_job(refresh_company_stats, "interval", minutes=settings.COMPANY_STATS_REFRESH_MINUTES)
+        scheduler.add_job(ensure_migrated_partitions, "interval", hours=24)
+        scheduler.add_job(run_retention, "cron", hour=3)
+    if replicas:
+        check_replicas()
+        scheduler.add_job(check_replicas, "interval", seconds=settings.REPLICA_HEALTH_INTERVAL_SECONDS)
     scheduler.start()
-    print("🚀 Scheduler started (runs every 1 minute)")
+    _scheduler = scheduler
+    if sweeps:
+        logger.info("Scheduler started (pending-video sweep every 1 minute)")
+    else:
+        logger.info("Scheduler started without sweeps (SCHEDULER_ENABLED is off)")
+
+
+def stop_scheduler() -> None:
+    """Stop scheduling, let running jobs finish and drain the inference workers."""
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.shutdown(wait=True)
+        _scheduler = None
+    if settings.INFERENCE_MODE != "remote":
+        processing_queue.shutdown(settings.SHUTDOWN_DRAIN_SECONDS)
+        unload_model()
+
+
+if __name__ == "__main__":
+    # Sweep process next to API workers started with SCHEDULER_ENABLED off
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    start_scheduler(sweeps=True)
+    stop.wait()
+    stop_scheduler()
@@ -2,15 +2,27 @@ from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from core.config import settings
+from core.metrics import PASSWORD_HASH_SECONDS
 import bcrypt
+import secrets
 # Password hashing
 
+# Stored for invited users until they pick a password; never matches any password
+UNUSABLE_PASSWORD_PREFIX = "!"
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    with PASSWORD_HASH_SECONDS.labels("hash").time():
+        return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+
+def unusable_password() -> str:
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(16)
 
 def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
+    if hashed.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False
+    with PASSWORD_HASH_SECONDS.labels("verify").time():
+        return bcrypt.checkpw(password.encode("utf-8"), hashed.encode("utf-8"))
 
 # JWT utilities
 def create_access_token(data: dict) -> str:
@@ -22,6 +34,22 @@ def create_access_token(data: dict) -> str:
 def decode_access_token(token: str):
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    # Invite tokens are signed with the same key but must not work as access tokens
+    if payload.get("purpose") is not None:
+        return None
+    return payload
+
+def create_invite_token(email: str) -> str:
+    expire = datetime.utcnow() + timedelta(hours=settings.INVITE_TOKEN_EXPIRE_HOURS)
+    return jwt.encode({"sub": email, "purpose": "invite", "exp": expire},
+                      settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def decode_invite_token(token: str):
+    """Email of a valid invite token, else None."""
+    try:
+        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub") if payload.get("purpose") == "invite" else None
@@ -0,0 +1,221 @@
+import json
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core.emotions import STANDARD_EMOTIONS, map_emotion
+from Database.database import Company, CompanyRetention, EmotionSketch, Users, Video, VideoEmotion
+
+# Scores live in [0, 1]; 1000 buckets bounds value error to 0.001
+SKETCH_RESOLUTION = 1000
+
+
+class ScoreSketch:
+    """
+    Mergeable quantile sketch for scores in [0, 1].
+    A sparse fixed-width bucket histogram: merging is exact (bucket-wise sums),
+    so daily sketches can be combined over any date range without error growth.
+    """
+
+    def __init__(self, buckets: Optional[Dict[int, int]] = None, count: int = 0, total: float = 0.0,
+                 min_score: Optional[float] = None, max_score: Optional[float] = None):
+        self.buckets: Dict[int, int] = buckets or {}
+        self.count = count
+        self.total = total
+        self.min_score = min_score
+        self.max_score = max_score
+
+    @staticmethod
+    def bucket_of(score: float) -> int:
+        return int(min(SKETCH_RESOLUTION - 1, max(0, score * SKETCH_RESOLUTION)))
+
+    def add(self, score: float, weight: int = 1) -> None:
+        idx = self.bucket_of(score)
+        self.buckets[idx] = self.buckets.get(idx, 0) + weight
+        self.count += weight
+        self.total += score * weight
+        self.min_score = score if self.min_score is None else min(self.min_score, score)
+        self.max_score = score if self.max_score is None else max(self.max_score, score)
+
+    def merge(self, other: "ScoreSketch") -> "ScoreSketch":
+        for idx, c in other.buckets.items():
+            self.buckets[idx] = self.buckets.get(idx, 0) + c
+        self.count += other.count
+        self.total += other.total
+        for attr, pick in (("min_score", min), ("max_score", max)):
+            theirs = getattr(other, attr)
+            if theirs is not None:
+                mine = getattr(self, attr)
+                setattr(self, attr, theirs if mine is None else pick(mine, theirs))
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0..1), accurate to one bucket width."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                value = (idx + 0.5) / SKETCH_RESOLUTION
+                return min(max(value, self.min_score), self.max_score)
+        return self.max_score
+
+    def histogram(self, bins: int) -> List[int]:
+        """Re-bin the sketch into `bins` equal-width bins over [0, 1]."""
+        counts = [0 for _ in range(bins)]
+        for idx, c in self.buckets.items():
+            center = (idx + 0.5) / SKETCH_RESOLUTION
+            counts[int(min(bins - 1, center * bins))] += c
+        return counts
+
+    def mean(self) -> Optional[float]:
+        return (self.total / self.count) if self.count else None
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "b": {str(k): v for k, v in self.buckets.items()},
+            "n": self.count,
+            "s": self.total,
+            "lo": self.min_score,
+            "hi": self.max_score,
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "ScoreSketch":
+        data = json.loads(raw)
+        return cls(
+            buckets={int(k): v for k, v in data["b"].items()},
+            count=data["n"],
+            total=data["s"],
+            min_score=data["lo"],
+            max_score=data["hi"],
+        )
+
+
+def record_prediction_sketches(db: Session, company_id: str, day: date, predictions: Dict[str, float]) -> None:
+    """
+    Fold one video's predictions into the company's daily sketches.
+    Runs inside the caller's transaction; the caller commits.
+    """
+    for label, score in predictions.items():
+        std = map_emotion(label)
+        if std not in STANDARD_EMOTIONS:
+            continue
+
+        key = (EmotionSketch.company_id == company_id, EmotionSketch.emotion == std, EmotionSketch.day == day)
+        row = db.query(EmotionSketch).filter(*key).with_for_update().first()
+        if row is None:
+            sketch = ScoreSketch()
+            sketch.add(float(score))
+            try:
+                with db.begin_nested():
+                    db.add(EmotionSketch(company_id=company_id, emotion=std, day=day,
+                                         count=sketch.count, sketch=sketch.to_json()))
+                continue
+            except IntegrityError:
+                # Another writer created the day's sketch first
+                row = db.query(EmotionSketch).filter(*key).with_for_update().one()
+
+        sketch = ScoreSketch.from_json(row.sketch)
+        sketch.add(float(score))
+        row.sketch = sketch.to_json()
+        row.count = sketch.count
+        row.updated_at = datetime.utcnow()
+
+
+def merge_sketches(
+    db: Session,
+    company_id: str,
+    emotion: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> ScoreSketch:
+    """Merge the daily sketches of one emotion over an inclusive date range."""
+    q = db.query(EmotionSketch.sketch).filter(
+        EmotionSketch.company_id == company_id,
+        EmotionSketch.emotion == emotion,
+    )
+    if start_date is not None:
+        q = q.filter(EmotionSketch.day >= start_date)
+    if end_date is not None:
+        q = q.filter(EmotionSketch.day <= end_date)
+
+    merged = ScoreSketch()
+    for (raw,) in q:
+        merged.merge(ScoreSketch.from_json(raw))
+    return merged
+
+
+def load_daily_sketches(
+    db: Session,
+    company_id: str,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Dict[tuple, ScoreSketch]:
+    """A company's daily sketches over an inclusive date range, keyed by (emotion, day)."""
+    q = db.query(EmotionSketch.emotion, EmotionSketch.day, EmotionSketch.sketch).filter(
+        EmotionSketch.company_id == company_id
+    )
+    if start_date is not None:
+        q = q.filter(EmotionSketch.day >= start_date)
+    if end_date is not None:
+        q = q.filter(EmotionSketch.day <= end_date)
+    return {(std, day): ScoreSketch.from_json(raw) for std, day, raw in q}
+
+
+def build_sketches(rows: Iterable) -> Dict[tuple, ScoreSketch]:
+    """Group (created_at, *scores) video rows into (emotion, day) sketches."""
+    sketches: Dict[tuple, ScoreSketch] = {}
+    for created_at, *vector in rows:
+        if created_at is None:
+            continue
+        for std, score in zip(STANDARD_EMOTIONS, vector):
+            if score is not None:
+                sketches.setdefault((std, created_at.date()), ScoreSketch()).add(float(score))
+    return sketches
+
+
+def rebuild_company_sketches(db: Session, company_id: str) -> int:
+    """
+    Recompute a company's sketches from stored predictions (backfill / repair). Returns sketch rows written.
+    Days up to the company's compacted_through keep their sketches: retention may have purged their raw rows.
+    """
+    compacted_through = (
+        db.query(CompanyRetention.compacted_through)
+        .filter(CompanyRetention.company_id == company_id)
+        .scalar()
+    )
+    rows = (
+        db.query(VideoEmotion.created_at, *VideoEmotion.score_columns())
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+    )
+    stale = db.query(EmotionSketch).filter(EmotionSketch.company_id == company_id)
+    if compacted_through is not None:
+        rows = rows.filter(VideoEmotion.created_at >= datetime.combine(compacted_through + timedelta(days=1), datetime.min.time()))
+        stale = stale.filter(EmotionSketch.day > compacted_through)
+    sketches = build_sketches(rows.yield_per(1000))
+
+    stale.delete(synchronize_session=False)
+    for (std, day), sketch in sketches.items():
+        db.add(EmotionSketch(company_id=company_id, emotion=std, day=day,
+                             count=sketch.count, sketch=sketch.to_json()))
+    db.commit()
+    return len(sketches)
+
+
+if __name__ == "__main__":
+    from Database.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        for (cid,) in session.query(Company.id).all():
+            written = rebuild_company_sketches(session, cid)
+            print(f"✅ Rebuilt {written} sketches for company {cid}")
+    finally:
+        session.close()
@@ -0,0 +1,181 @@
+"""
+OpenTelemetry tracing (optional: pip install "backend[tracing]").
+
+TRACING_EXPORTER picks where spans go: "none" (default, tracing off), "console",
+"file" (one JSON span per line in TRACING_FILE, for offline analysis) or "otlp"
+(needs opentelemetry-exporter-otlp-proto-http; honours the usual OTEL_* env vars).
+With tracing off every helper here is a cheap no-op.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from fastapi import FastAPI
+from sqlalchemy import event
+
+from core.config import settings
+from core.log import get_logger
+from core.query_budget import fingerprint
+from Database.database import engine
+from Database.replicas import replicas
+
+try:
+    from opentelemetry import context as otel_context, propagate, trace
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+    from opentelemetry.trace import SpanKind, Status, StatusCode
+except ImportError:  # tracing is optional
+    trace = None
+
+logger = get_logger(__name__)
+
+_tracer = None
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def _exporter():
+    if settings.TRACING_EXPORTER == "console":
+        return ConsoleSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        out = open(settings.TRACING_FILE, "a", buffering=1)
+        return ConsoleSpanExporter(out=out, formatter=lambda s: s.to_json(indent=None) + "\n")
+    if settings.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER {settings.TRACING_EXPORTER!r}")
+
+
+def setup_tracing() -> bool:
+    """Install the tracer provider when TRACING_EXPORTER is set. Returns whether tracing is on."""
+    global _tracer
+    if _tracer is not None or settings.TRACING_EXPORTER == "none":
+        return _tracer is not None
+    if trace is None:
+        logger.warning("TRACING_EXPORTER is set but opentelemetry-sdk is not installed; tracing stays off")
+        return False
+
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": settings.TRACING_SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACE_SAMPLE_RATIO)),
+    )
+    # Batching keeps export off the request path
+    provider.add_span_processor(BatchSpanProcessor(_exporter()))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer("neurofy")
+    return True
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[object]]:
+    """Child span of the current one (no-op when tracing is off)."""
+    if _tracer is None:
+        yield None
+        return
+    with _tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def current_traceparent() -> Optional[str]:
+    """W3C traceparent of the current span, to resume the trace in another process or job."""
+    if _tracer is None:
+        return None
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier.get("traceparent")
+
+
+@contextmanager
+def resume_trace(traceparent: Optional[str], name: str, **attributes) -> Iterator[Optional[object]]:
+    """Span continuing the trace identified by `traceparent` (a new trace when None)."""
+    if _tracer is None:
+        yield None
+        return
+    parent = propagate.extract({"traceparent": traceparent} if traceparent else {})
+    token = otel_context.attach(parent)
+    try:
+        with _tracer.start_as_current_span(name, attributes=attributes) as current:
+            yield current
+    finally:
+        otel_context.detach(token)
+
+
+def record_span(name: str, start_monotonic: float, **attributes) -> None:
+    """Record an already finished stage (e.g. queue wait) from `start_monotonic` until now."""
+    if _tracer is None:
+        return
+    end_ns = time.time_ns()
+    start_ns = end_ns - int((time.monotonic() - start_monotonic) * 1e9)
+    _tracer.start_span(name, attributes=attributes, start_time=start_ns).end(end_time=end_ns)
+
+
+def instrument_engine(engine) -> None:
+    """Span per SQL statement, only inside an existing trace (no root spans for background queries)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        if context is None or not trace.get_current_span().is_recording():
+            return
+        context._trace_span = _tracer.start_span("db.query", kind=SpanKind.CLIENT, attributes={
+            "db.system": engine.dialect.name,
+            "db.statement": fingerprint(statement)[:1000],
+        })
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end(conn, cursor, statement, parameters, context, executemany):
+        current = getattr(context, "_trace_span", None)
+        if current is not None:
+            current.end()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        current = getattr(exception_context.execution_context, "_trace_span", None)
+        if current is not None:
+            current.set_status(Status(StatusCode.ERROR, str(exception_context.original_exception)))
+            current.end()
+
+
+def install_tracing(app: FastAPI) -> None:
+    """Turn tracing on for the app (when configured): request spans and SQL statement spans."""
+    if setup_tracing():
+        for traced in [engine, *(r.engine for r in replicas)]:
+            instrument_engine(traced)
+        app.add_middleware(TracingMiddleware)
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request, continuing an incoming traceparent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _tracer is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        parent = propagate.extract(headers)
+        with _tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}", context=parent, kind=SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as current:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    current.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        current.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    # Name by template so spans of one endpoint group together
+                    current.update_name(f"{scope['method']} {route.path}")
+                    current.set_attribute("http.route", route.path)
@@ -0,0 +1,58 @@
+import json
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.emotions import map_emotion
+from Database.database import Prediction, VideoEmotion
+
+VideoScores = Tuple[Dict[str, float], Optional[str], Optional[float]]
+
+
+def load_video_scores(db: Session, video_ids: Iterable[str]) -> Dict[str, VideoScores]:
+    """
+    Batch-read {video_id: (scores, top_emotion, top_score)} from the compact
+    video_emotions rows, falling back to legacy per-emotion Prediction rows for
+    videos that have not been migrated. Videos without predictions are omitted.
+    """
+    video_ids = list(video_ids)
+    if not video_ids:
+        return {}
+
+    result: Dict[str, VideoScores] = {}
+    for row in db.query(VideoEmotion).filter(VideoEmotion.video_id.in_(video_ids)):
+        result[row.video_id] = (row.scores(), row.top_emotion, row.top_score)
+
+    missing = [vid for vid in video_ids if vid not in result]
+    if missing:
+        legacy: Dict[str, Dict[str, float]] = {}
+        q = db.query(Prediction.video_id, Prediction.emotion_label, Prediction.score).filter(
+            Prediction.video_id.in_(missing)
+        )
+        for video_id, label, score in q:
+            scores = legacy.setdefault(video_id, {})
+            std = map_emotion(label)
+            if std:
+                scores[std] = float(score)
+        for video_id, scores in legacy.items():
+            top = max(scores, key=scores.get) if scores else None
+            result[video_id] = (scores, top, scores[top] if top else None)
+
+    return result
+
+
+def load_model_predictions(db: Session, video_id: str) -> Optional[Dict[str, float]]:
+    """
+    The model's own {label: score} output for one video, including labels with
+    no standard emotion. Rows stored before the raw output was kept fall back to
+    their standard scores; unmigrated videos to their legacy Prediction rows.
+    """
+    row = db.query(VideoEmotion).filter(VideoEmotion.video_id == video_id).first()
+    if row is not None:
+        return json.loads(row.model_predictions) if row.model_predictions else row.scores()
+
+    legacy = {
+        label: float(score)
+        for label, score in db.query(Prediction.emotion_label, Prediction.score).filter(Prediction.video_id == video_id)
+    }
+    return legacy or None
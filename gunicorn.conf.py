@@ -0,0 +1,51 @@
+"""
+Production server: `gunicorn main:app` (this file is picked up from the working directory).
+
+The app is imported once in the master (tables, partitions and the stats view
+are ensured there) and forked into WEB_WORKERS uvicorn workers running uvloop
+and httptools. API workers start with SCHEDULER_ENABLED off and
+INFERENCE_MODE=remote, so they neither sweep nor load the model. Next to them run:
+
+    INFERENCE_MODE=remote python -m core.scheduler   # the sweeps, once
+    python -m core.inference_worker                  # inference, one per node
+
+Setting INFERENCE_MODE=inline explicitly puts the model and inference threads
+back into every API worker.
+
+On SIGTERM each worker stops accepting connections, finishes its in-flight
+requests (uploads included), then drains running inference jobs (inline mode)
+for up to SHUTDOWN_DRAIN_SECONDS; workers still busy after
+WEB_GRACEFUL_TIMEOUT_SECONDS are killed.
+"""
+import glob
+import os
+import tempfile
+
+# Before anything imports core.config or prometheus_client
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+# Each worker would otherwise hold its own model copy and inference threads
+os.environ.setdefault("INFERENCE_MODE", "remote")
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+
+from core.config import settings  # noqa: E402
+
+bind = f"0.0.0.0:{settings.PORT}"
+workers = settings.WEB_WORKERS
+worker_class = "uvicorn_worker.UvicornWorker"  # loop / http "auto" = uvloop / httptools when installed
+preload_app = True
+backlog = settings.WEB_BACKLOG
+keepalive = settings.WEB_KEEPALIVE_SECONDS
+graceful_timeout = settings.WEB_GRACEFUL_TIMEOUT_SECONDS
+timeout = 120  # heartbeat: a worker blocked this long is restarted
+
+
+def on_starting(server):
+    # Metric files of a previous run would be added to this one's counters
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,191 @@
+import argparse
+import csv
+import io
+import sys
+from typing import Dict, Iterator, List
+
+from sqlalchemy import select
+
+from core.config import settings
+from core.emotions import STANDARD_EMOTIONS
+from Database.database import SessionLocal, Users, Video, VideoEmotion
+from Database.replicas import read_session
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet/Arrow export is optional (pip install "backend[export]")
+    pa = None
+    pq = None
+
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+EXPORT_COLUMNS = [
+    "video_id",
+    "user_id",
+    "email",
+    "original_filename",
+    "upload_timestamp",
+    "is_processed",
+    "predicted_at",
+    "top_emotion",
+    "top_score",
+] + list(STANDARD_EMOTIONS)
+
+
+def columnar_formats_available() -> bool:
+    return pa is not None
+
+
+def iter_export_batches(company_id: str, batch_size: int = None) -> Iterator[Dict[str, List]]:
+    """
+    Stream a company's videos (left-joined with their emotion scores) as column
+    batches, one row per video. Rows come from a server-side cursor, so memory
+    is bounded by `batch_size` regardless of how many videos the company has.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    stmt = (
+        select(
+            Video.video_id,
+            Video.user_id,
+            Users.email,
+            Video.original_filename,
+            Video.upload_timestamp,
+            Video.is_processed,
+            VideoEmotion.created_at,
+            VideoEmotion.top_emotion,
+            VideoEmotion.top_score,
+            *VideoEmotion.score_columns(),
+        )
+        .join(Users, Users.user_id == Video.user_id)
+        .outerjoin(VideoEmotion, VideoEmotion.video_id == Video.video_id)
+        .where(Users.company_id == company_id)
+        .execution_options(yield_per=batch_size)
+    )
+
+    # Full-table scan: served by a replica when one is healthy
+    db = read_session(None) or SessionLocal()
+    try:
+        for partition in db.execute(stmt).partitions():
+            cols = list(zip(*partition))
+            yield {name: list(values) for name, values in zip(EXPORT_COLUMNS, cols)}
+    finally:
+        db.close()
+
+
+def stream_csv(batches: Iterator[Dict[str, List]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        writer.writerows(zip(*(batch[c] for c in EXPORT_COLUMNS)))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands bytes written by pyarrow back to the generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _export_schema():
+    return pa.schema([
+        ("video_id", pa.string()),
+        ("user_id", pa.string()),
+        ("email", pa.string()),
+        ("original_filename", pa.string()),
+        ("upload_timestamp", pa.timestamp("us")),
+        ("is_processed", pa.bool_()),
+        ("predicted_at", pa.timestamp("us")),
+        ("top_emotion", pa.string()),
+        ("top_score", pa.float64()),
+    ] + [(emotion, pa.float64()) for emotion in STANDARD_EMOTIONS])
+
+
+def stream_columnar(batches: Iterator[Dict[str, List]], fmt: str) -> Iterator[bytes]:
+    """Encode each batch as one Parquet row group / Arrow record batch and yield the bytes."""
+    schema = _export_schema()
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_table
+        to_chunk = pa.Table.from_pydict
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_chunk = pa.RecordBatch.from_pydict
+
+    try:
+        for batch in batches:
+            write(to_chunk(batch, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_company_export(company_id: str, fmt: str, batch_size: int = None) -> Iterator[bytes]:
+    batches = iter_export_batches(company_id, batch_size)
+    if fmt == "csv":
+        return stream_csv(batches)
+    return stream_columnar(batches, fmt)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export a company's videos and predictions")
+    parser.add_argument("company_id")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", "-o", help="Output file (defaults to stdout)")
+    parser.add_argument("--batch-size", type=int, default=settings.EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.format != "csv" and not columnar_formats_available():
+        parser.error(f"{args.format} export requires pyarrow")
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream_company_export(args.company_id, args.format, args.batch_size):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Dict, List, Optional
-from datetime import datetime, timedelta
-
-from auth.dependencies import get_current_user, get_db
-from Database.database import Users, Video, Prediction, Department
+from typing import Dict, Iterator, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from auth.dependencies import get_current_user, get_db, get_read_db
+from auth.Pydantic_model import EmotionTrend, EmployeeDepartments, EmployeeDetail, EmployeePage, RetentionPolicy
+from core.cache import cached_company_result, result_cache, get_company_version
+from core.company_stats import get_company_stats, get_company_stats_refreshed_at
+from core.processing_queue import NORMAL, submit_videos
+from core.processing_state import dead_letters, retry_dead_letter
+from core.emotions import STANDARD_EMOTIONS, map_emotion
+from core.retention import effective_retention_days, get_compacted_through, get_retention, set_retention_days
+from core.sketches import SKETCH_RESOLUTION, ScoreSketch, load_daily_sketches, merge_sketches
+from core.columnar import columnar_store
+from core.video_emotions import load_video_scores
+from hr_Dashboard.export import EXPORT_FORMATS, columnar_formats_available, stream_company_export
+from Database.database import Users, Video, VideoEmotion, Department, video_id_filter
 
 
 router = APIRouter()
 
-
-STANDARD_EMOTIONS = [
-    "stress",
-    "anxiety",
-    "fatigue",
-    "happiness",
-    "neutral",
-    "anger",
-    "surprise",
-]
-
-
-SYNONYM_TO_STANDARD = {
-    # model -> standard mapping
-    "stressed": "stress",
-    "stress": "stress",
-    "anxious": "anxiety",
-    "anxiety": "anxiety",
-    "tired": "fatigue",
-    "fatigue": "fatigue",
-    "happy": "happiness",
-    "happiness": "happiness",
-    "neutral": "neutral",
-    "angry": "anger",
-    "anger": "anger",
-    "surprised": "surprise",
-    "surprise": "surprise",
-}
+DEFAULT_PERCENTILES = (50.0, 90.0, 99.0)
 
 
 def assert_hr(user: Users) -> None:
@@ -44,140 +31,348 @@ def assert_hr(user: Users) -> None:
         raise HTTPException(status_code=403, detail="HR role required")
 
 
-def map_emotion(label: str) -> Optional[str]:
-    if not label:
-        return None
-    key = label.strip().lower()
-    return SYNONYM_TO_STANDARD.get(key)
+def iter_company_emotions(
+    db: Session,
+    company_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> Iterator[Tuple[str, float, datetime]]:
+    """Yield (standard_emotion, score, created_at) for every predicted emotion of a company's videos."""
+    q = (
+        db.query(VideoEmotion.created_at, *VideoEmotion.score_columns())
+        .join(Video, Video.video_id == VideoEmotion.video_id)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(Users.company_id == company_id)
+    )
+    if start is not None:
+        q = q.filter(VideoEmotion.created_at >= start)
+    if end is not None:
+        q = q.filter(VideoEmotion.created_at <= end)
 
+    for created_at, *vector in q.yield_per(1000):
+        for std, score in zip(STANDARD_EMOTIONS, vector):
+            if score is not None:
+                yield std, float(score), created_at
 
-def get_company_user_ids(db: Session, company_id: str) -> List[str]:
-    return [u.user_id for u in db.query(Users).filter(Users.company_id == company_id).all()]
 
+def trend_window(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(start_date, datetime.min.time()), datetime.combine(end_date, datetime.max.time())
 
-@router.get("/hr/dashboard/emotion-distribution")
-def emotion_distribution(db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
-    assert_hr(user)
-    user_ids = get_company_user_ids(db, user.company_id)
-    if not user_ids:
-        return {"distribution": {k: 0 for k in STANDARD_EMOTIONS}}
 
-    # Count occurrences weighted by score across company videos
-    counts: Dict[str, float] = {k: 0.0 for k in STANDARD_EMOTIONS}
+def build_trend_series(
+    date_keys: List[date],
+    sums: Dict[str, Dict[str, float]],
+    counts: Dict[str, Dict[str, int]],
+) -> List[Dict]:
+    series = []
+    for d in date_keys:
+        key = d.isoformat()
+        entry = {"date": key}
+        for e in STANDARD_EMOTIONS:
+            c = counts[key][e]
+            entry[e] = (sums[key][e] / c) if c else 0.0
+        series.append(entry)
+    return series
 
-    q = (
-        db.query(Prediction)
-        .join(Video, Video.video_id == Prediction.video_id)
-        .filter(Video.user_id.in_(user_ids))
-    )
-    for p in q:
-        std = map_emotion(p.emotion_label)
-        if std in counts:
-            counts[std] += float(p.score)
 
-    # Convert to ints where appropriate but keep numeric
-    return {"distribution": counts}
+def build_histogram_ranges(counts: List[int], bins: int) -> List[Dict]:
+    step = 1.0 / bins
+    return [
+        {"from": round(i * step, 3), "to": round((i + 1) * step, 3), "count": counts[i]}
+        for i in range(bins)
+    ]
+
+
+def build_pie(dist: Dict[str, float]) -> Dict[str, float]:
+    total = sum(dist.values()) or 1.0
+    return {k: (v / total) for k, v in dist.items()}
+
+
+def day_start(day: Optional[date]) -> Optional[datetime]:
+    return datetime.combine(day, datetime.min.time()) if day is not None else None
+
+
+def raw_start_date(compacted_through: Optional[date]) -> Optional[date]:
+    """First day still served from raw rows (days up to compacted_through come from the daily sketches)."""
+    return compacted_through + timedelta(days=1) if compacted_through is not None else None
+
+
+def compacted_sketches(
+    db: Session,
+    company_id: str,
+    compacted_through: Optional[date],
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+) -> Dict[tuple, ScoreSketch]:
+    """Daily sketches of the compacted days within [start_date, end_date]."""
+    if compacted_through is None:
+        return {}
+    end_date = min(end_date, compacted_through) if end_date is not None else compacted_through
+    if start_date is not None and start_date > end_date:
+        return {}
+    return load_daily_sketches(db, company_id, start_date, end_date)
+
+
+def empty_trend(date_keys: List[date]) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, int]]]:
+    sums = {d.isoformat(): {e: 0.0 for e in STANDARD_EMOTIONS} for d in date_keys}
+    counts = {d.isoformat(): {e: 0 for e in STANDARD_EMOTIONS} for d in date_keys}
+    return sums, counts
+
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=i) for i in range((end_date - start_date).days + 1)]
+
+
+def fold_compacted(
+    sketches: Dict[tuple, ScoreSketch],
+    distribution: Optional[Dict[str, float]] = None,
+    sums: Optional[Dict[str, Dict[str, float]]] = None,
+    counts: Optional[Dict[str, Dict[str, int]]] = None,
+) -> None:
+    """Add compacted daily aggregates into a distribution and/or trend accumulators."""
+    for (std, day), sketch in sketches.items():
+        if distribution is not None:
+            distribution[std] += sketch.total
+        key = day.isoformat()
+        if sums is not None and key in sums:
+            sums[key][std] += sketch.total
+            counts[key][std] += sketch.count
+
+
+def sketch_histogram(std: str, sketch: ScoreSketch, bins: int, percentiles: Tuple[float, ...] = ()) -> Dict:
+    result = {
+        "emotion": std,
+        "histogram": build_histogram_ranges(sketch.histogram(bins), bins),
+        "count": sketch.count,
+    }
+    if percentiles:
+        result["percentiles"] = {f"p{p:g}": sketch.quantile(p / 100.0) for p in percentiles}
+    return result
+
+
+def _distribution(db: Session, company_id: str, cols, compacted_through: Optional[date]) -> Dict[str, float]:
+    since = raw_start_date(compacted_through)
+    if cols is not None:
+        counts = cols.distribution(since)
+    else:
+        # Count occurrences weighted by score across company videos
+        counts = {k: 0.0 for k in STANDARD_EMOTIONS}
+        for std, score, _ in iter_company_emotions(db, company_id, start=day_start(since)):
+            counts[std] += score
+    fold_compacted(compacted_sketches(db, company_id, compacted_through), distribution=counts)
+    return counts
+
+
+def _trend(db: Session, company_id: str, cols, compacted_through: Optional[date],
+           start_date: date, end_date: date) -> List[Dict]:
+    raw_from = max(start_date, raw_start_date(compacted_through) or start_date)
+
+    series: List[Dict] = []
+    if raw_from > start_date:
+        date_keys = date_range(start_date, min(end_date, raw_from - timedelta(days=1)))
+        sums, counts = empty_trend(date_keys)
+        fold_compacted(compacted_sketches(db, company_id, compacted_through, start_date, end_date),
+                       sums=sums, counts=counts)
+        series = build_trend_series(date_keys, sums, counts)
+    if raw_from > end_date:
+        return series
+
+    if cols is not None:
+        return series + cols.trend(raw_from, end_date)
+
+    # Initialize structure: date -> emotion -> sum, count
+    date_keys = date_range(raw_from, end_date)
+    sums, counts = empty_trend(date_keys)
+    start, end = trend_window(raw_from, end_date)
+    for std, score, created_at in iter_company_emotions(db, company_id, start, end):
+        dkey = created_at.date().isoformat()
+        if dkey in sums:
+            sums[dkey][std] += score
+            counts[dkey][std] += 1
+    return series + build_trend_series(date_keys, sums, counts)
+
+
+def _histogram(db: Session, company_id: str, cols, compacted_through: Optional[date], std: str, bins: int,
+               start_date: Optional[date], end_date: Optional[date], percentiles: Tuple[float, ...]) -> Dict:
+    if cols is None:
+        # Tenant too large for the in-memory store: merge the per-day sketches
+        return sketch_histogram(std, merge_sketches(db, company_id, std, start_date, end_date), bins, percentiles)
+
+    since = raw_start_date(compacted_through)
+    if since is None or (start_date is not None and start_date >= since):
+        return cols.histogram(std, bins, start_date, end_date, percentiles)
+
+    # Range reaches into compacted days: stored sketches plus the raw scores after them
+    sketch = merge_sketches(db, company_id, std, start_date, min(end_date or compacted_through, compacted_through))
+    if end_date is None or end_date >= since:
+        sketch.merge(cols.sketch_for(std, since, end_date))
+    return sketch_histogram(std, sketch, bins, percentiles)
+
+
+def compute_emotion_distribution(db: Session, company_id: str) -> Dict:
+    cols = columnar_store.get(db, company_id)
+    return {"distribution": _distribution(db, company_id, cols, get_compacted_through(db, company_id))}
+
+
+def compute_emotion_trend(db: Session, company_id: str, start_date: date, end_date: date) -> Dict:
+    cols = columnar_store.get(db, company_id)
+    through = get_compacted_through(db, company_id)
+    return {"series": _trend(db, company_id, cols, through, start_date, end_date)}
+
+
+def compute_emotion_histogram(
+    db: Session,
+    company_id: str,
+    std: str,
+    bins: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    percentiles: Tuple[float, ...] = (),
+) -> Dict:
+    cols = columnar_store.get(db, company_id)
+    through = get_compacted_through(db, company_id)
+    return _histogram(db, company_id, cols, through, std, bins, start_date, end_date, percentiles)
+
+
+def compute_dashboard_overview(
+    db: Session,
+    company_id: str,
+    start_date: date,
+    end_date: date,
+    histogram_emotion: str,
+    bins: int,
+    summary: Dict,
+) -> Dict:
+    """
+    All prediction panels from the in-memory columns (or a single pass over the
+    company's raw predictions plus the compacted daily sketches); `summary` is
+    the company_stats row.
+    """
+    cols = columnar_store.get(db, company_id)
+    through = get_compacted_through(db, company_id)
+    histogram = _histogram(db, company_id, cols, through, histogram_emotion, bins,
+                           None, None, DEFAULT_PERCENTILES)
+
+    if cols is not None:
+        distribution = _distribution(db, company_id, cols, through)
+        return {
+            "distribution": distribution,
+            "pie": build_pie(distribution),
+            "series": _trend(db, company_id, cols, through, start_date, end_date),
+            "histogram": histogram,
+            "summary": summary,
+        }
+
+    date_keys = date_range(start_date, end_date)
+    sums, counts = empty_trend(date_keys)
+    window_start, window_end = trend_window(start_date, end_date)
+
+    distribution: Dict[str, float] = {k: 0.0 for k in STANDARD_EMOTIONS}
+
+    for std, score, created_at in iter_company_emotions(db, company_id, start=day_start(raw_start_date(through))):
+        distribution[std] += score
+        if window_start <= created_at <= window_end:
+            dkey = created_at.date().isoformat()
+            sums[dkey][std] += score
+            counts[dkey][std] += 1
+    fold_compacted(compacted_sketches(db, company_id, through), distribution, sums, counts)
+
+    return {
+        "distribution": distribution,
+        "pie": build_pie(distribution),
+        "series": build_trend_series(date_keys, sums, counts),
+        "histogram": histogram,
+        "summary": summary,
+    }
+
+
+@router.get("/hr/dashboard/emotion-distribution")
+def emotion_distribution(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    user: Users = Depends(get_current_user),
+):
+    assert_hr(user)
+    return cached_company_result(
+        request, response, db, user.company_id, "emotion-distribution", (),
+        lambda: compute_emotion_distribution(db, user.company_id),
+    )
 
 
 @router.get("/hr/dashboard/emotion-pie-distribution")
-def emotion_pie_distribution(db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+def emotion_pie_distribution(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    user: Users = Depends(get_current_user),
+):
     assert_hr(user)
-    result = emotion_distribution(db=db, user=user)
-    dist: Dict[str, float] = result["distribution"]
-    total = sum(dist.values()) or 1.0
-    pie = {k: (v / total) for k, v in dist.items()}
-    return {"pie": pie}
+
+    def compute() -> Dict:
+        # Reuse the cached distribution instead of rescanning predictions
+        version = get_company_version(db, user.company_id)
+        result = result_cache.get_or_compute(
+            (user.company_id, "emotion-distribution", ()), version,
+            lambda: compute_emotion_distribution(db, user.company_id),
+        )
+        return {"pie": build_pie(result["distribution"])}
+
+    return cached_company_result(
+        request, response, db, user.company_id, "emotion-pie-distribution", (), compute
+    )
 
 
-@router.get("/hr/dashboard/emotion-trend")
+@router.get("/hr/dashboard/emotion-trend", response_model=EmotionTrend)
 def emotion_trend(
+    request: Request,
+    response: Response,
     days: int = Query(30, ge=1, le=180),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: Users = Depends(get_current_user),
 ):
     assert_hr(user)
-    user_ids = get_company_user_ids(db, user.company_id)
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days - 1)
-
-    # Initialize structure: date -> emotion -> sum, count
-    date_keys = [start_date + timedelta(days=i) for i in range(days)]
-    sums: Dict[str, Dict[str, float]] = {d.isoformat(): {e: 0.0 for e in STANDARD_EMOTIONS} for d in date_keys}
-    counts: Dict[str, Dict[str, int]] = {d.isoformat(): {e: 0 for e in STANDARD_EMOTIONS} for d in date_keys}
-
-    q = (
-        db.query(Prediction, Video)
-        .join(Video, Video.video_id == Prediction.video_id)
-        .filter(Video.user_id.in_(user_ids))
-        .filter(Prediction.created_at >= datetime.combine(start_date, datetime.min.time()))
-        .filter(Prediction.created_at <= datetime.combine(end_date, datetime.max.time()))
+    return cached_company_result(
+        request, response, db, user.company_id, "emotion-trend",
+        (start_date.isoformat(), end_date.isoformat()),
+        lambda: compute_emotion_trend(db, user.company_id, start_date, end_date),
     )
 
-    for p, v in q:
-        std = map_emotion(p.emotion_label)
-        if std not in STANDARD_EMOTIONS:
-            continue
-        dkey = p.created_at.date().isoformat()
-        if dkey in sums:
-            sums[dkey][std] += float(p.score)
-            counts[dkey][std] += 1
-
-    series = []
-    for d in date_keys:
-        key = d.isoformat()
-        entry = {"date": key}
-        for e in STANDARD_EMOTIONS:
-            c = counts[key][e]
-            entry[e] = (sums[key][e] / c) if c else 0.0
-        series.append(entry)
-
-    return {"series": series}
-
 
 @router.get("/hr/dashboard/emotion-histogram-distribution")
 def emotion_histogram_distribution(
+    request: Request,
+    response: Response,
     emotion: str = Query("stress"),
-    bins: int = Query(10, ge=2, le=20),
-    db: Session = Depends(get_db),
+    bins: int = Query(10, ge=1, le=SKETCH_RESOLUTION),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    percentiles: List[float] = Query(list(DEFAULT_PERCENTILES)),
+    db: Session = Depends(get_read_db),
     user: Users = Depends(get_current_user),
 ):
     assert_hr(user)
     std = map_emotion(emotion) or emotion.strip().lower()
     if std not in STANDARD_EMOTIONS:
         raise HTTPException(status_code=400, detail="Unsupported emotion")
-
-    user_ids = get_company_user_ids(db, user.company_id)
-    scores: List[float] = []
-    q = (
-        db.query(Prediction)
-        .join(Video, Video.video_id == Prediction.video_id)
-        .filter(Video.user_id.in_(user_ids))
+    if any(p < 0 or p > 100 for p in percentiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100")
+
+    pcts = tuple(sorted(set(percentiles)))
+    return cached_company_result(
+        request, response, db, user.company_id, "emotion-histogram-distribution",
+        (std, bins, str(start_date), str(end_date), pcts),
+        lambda: compute_emotion_histogram(db, user.company_id, std, bins, start_date, end_date, pcts),
     )
-    for p in q:
-        mapped = map_emotion(p.emotion_label)
-        if mapped == std:
-            scores.append(float(p.score))
-
-    # Build histogram
-    step = 1.0 / bins
-    counts = [0 for _ in range(bins)]
-    for s in scores:
-        idx = int(min(bins - 1, max(0, s // step)))
-        counts[int(idx)] += 1
-
-    ranges = [
-        {"from": round(i * step, 3), "to": round((i + 1) * step, 3), "count": counts[i]}
-        for i in range(bins)
-    ]
 
-    return {"emotion": std, "histogram": ranges}
 
-
-@router.get("/hr/dashboard/employee-department")
-def employee_department(db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+@router.get("/hr/dashboard/employee-department", response_model=EmployeeDepartments)
+def employee_department(db: Session = Depends(get_read_db), user: Users = Depends(get_current_user)):
     assert_hr(user)
     # Department data not modeled; return totals only for now
-    total_employees = db.query(Users).filter(Users.company_id == user.company_id).count(),
+    total_employees = db.query(Users).filter(Users.company_id == user.company_id).count()
     departments = db.query(Department).order_by(Department.name.asc()).all()
     return {
         "total_employees": total_employees,
@@ -186,43 +381,120 @@ def employee_department(db: Session = Depends(get_db), user: Users = Depends(get
 
 
 @router.get("/hr/dashboard/summary")
-def dashboard_summary(db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+def dashboard_summary(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_read_db),
+    user: Users = Depends(get_current_user),
+):
     assert_hr(user)
-    user_ids = get_company_user_ids(db, user.company_id)
-    total_videos = db.query(Video).filter(Video.user_id.in_(user_ids)).count()
-    processed_videos = db.query(Video).filter(Video.user_id.in_(user_ids), Video.is_processed == True).count()
-
-    # Active employees: those with at least one video
-    active_employee_ids = (
-        db.query(Video.user_id)
-        .filter(Video.user_id.in_(user_ids))
-        .distinct()
-        .all()
+    # Single indexed row of the company_stats materialized view, read on a cache miss only
+    return cached_company_result(
+        request, response, db, user.company_id, "summary",
+        (get_company_stats_refreshed_at(db, user.company_id),),
+        lambda: get_company_stats(db, user.company_id),
     )
-    active_employees = len(active_employee_ids)
 
-    # Average stress score
-    stress_scores: List[float] = []
-    q = (
-        db.query(Prediction)
-        .join(Video, Video.video_id == Prediction.video_id)
-        .filter(Video.user_id.in_(user_ids))
+
+@router.get("/hr/dashboard/overview")
+def dashboard_overview(
+    request: Request,
+    response: Response,
+    days: int = Query(30, ge=1, le=180),
+    emotion: str = Query("stress"),
+    bins: int = Query(10, ge=1, le=SKETCH_RESOLUTION),
+    db: Session = Depends(get_read_db),
+    user: Users = Depends(get_current_user),
+):
+    """Distribution, pie, trend, histogram and summary panels in one response."""
+    assert_hr(user)
+    std = map_emotion(emotion) or emotion.strip().lower()
+    if std not in STANDARD_EMOTIONS:
+        raise HTTPException(status_code=400, detail="Unsupported emotion")
+
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days - 1)
+    refreshed_at = get_company_stats_refreshed_at(db, user.company_id)
+    return cached_company_result(
+        request, response, db, user.company_id, "overview",
+        (start_date.isoformat(), end_date.isoformat(), std, bins, refreshed_at),
+        lambda: compute_dashboard_overview(db, user.company_id, start_date, end_date, std, bins,
+                                           get_company_stats(db, user.company_id)),
     )
-    for p in q:
-        std = map_emotion(p.emotion_label)
-        if std == "stress":
-            stress_scores.append(float(p.score))
 
-    avg_stress = (sum(stress_scores) / len(stress_scores)) if stress_scores else 0.0
 
+def retention_response(db: Session, company_id: str) -> Dict:
+    policy = get_retention(db, company_id)
     return {
-        "total_videos": total_videos,
-        "processed_videos": processed_videos,
-        "active_employees": active_employees,
-        "avg_stress": avg_stress,
+        "raw_retention_days": policy.raw_retention_days if policy else None,
+        "effective_retention_days": effective_retention_days(policy),
+        "compacted_through": policy.compacted_through.isoformat() if policy and policy.compacted_through else None,
     }
 
 
+@router.get("/hr/retention")
+def get_retention_policy(db: Session = Depends(get_read_db), user: Users = Depends(get_current_user)):
+    assert_hr(user)
+    return retention_response(db, user.company_id)
+
+
+@router.put("/hr/retention")
+def update_retention_policy(
+    policy: RetentionPolicy,
+    db: Session = Depends(get_db),
+    user: Users = Depends(get_current_user),
+):
+    """Set how many days of raw predictions the company keeps (applied by the nightly retention job)."""
+    assert_hr(user)
+    set_retention_days(db, user.company_id, policy.raw_retention_days)
+    return retention_response(db, user.company_id)
+
+
+@router.get("/hr/export/predictions")
+def export_predictions(
+    format: str = Query("parquet"),
+    user: Users = Depends(get_current_user),
+):
+    """Stream every video and prediction of the HR user's company as Parquet, Arrow or CSV."""
+    assert_hr(user)
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format; use one of {sorted(EXPORT_FORMATS)}")
+    if format != "csv" and not columnar_formats_available():
+        raise HTTPException(status_code=501, detail=f"{format} export is not available on this server; use csv")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"predictions-{datetime.utcnow():%Y%m%d}.{extension}"
+    return StreamingResponse(
+        stream_company_export(user.company_id, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/hr/processing/dead-letter")
+def list_dead_letters(db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+    """Videos of the company whose processing failed INFERENCE_MAX_ATTEMPTS times."""
+    assert_hr(user)
+    return {"videos": dead_letters(db, user.company_id)}
+
+
+@router.post("/hr/processing/dead-letter/{video_id}/retry")
+def retry_dead_lettered_video(video_id: UUID, db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+    """Give a dead-lettered video a fresh set of attempts and queue it."""
+    assert_hr(user)
+    video = (
+        db.query(Video.video_id, Video.trace_context)
+        .join(Users, Users.user_id == Video.user_id)
+        .filter(*video_id_filter(db, str(video_id)), Users.company_id == user.company_id)
+        .first()
+    )
+    if video is None or not retry_dead_letter(db, video.video_id):
+        raise HTTPException(status_code=404, detail="No dead-lettered video with this id")
+    accepted, _ = submit_videos(db, [(user.company_id, video.video_id, video.trace_context)], NORMAL)
+    # Not accepted = company queue full; the pending-video sweep picks it up instead
+    return {"video_id": video.video_id, "status": "queued" if accepted else "retry_scheduled"}
+
+
 # @router.get("/hr/employees")
 # def list_employees(
 #     page: int = Query(1, ge=1),
@@ -276,34 +548,29 @@ def dashboard_summary(db: Session = Depends(get_db), user: Users = Depends(get_c
 #     return {"total": total, "page": page, "page_size": page_size, "items": items}
 
 
-@router.get("/hr/employees/{employee_id}")
-def employee_detail(employee_id: str, db: Session = Depends(get_db), user: Users = Depends(get_current_user)):
+@router.get("/hr/employees/{employee_id}", response_model=EmployeeDetail)
+def employee_detail(employee_id: UUID, db: Session = Depends(get_read_db), user: Users = Depends(get_current_user)):
     assert_hr(user)
-    emp = db.query(Users).filter(Users.user_id == employee_id, Users.company_id == user.company_id).first()
+    emp = db.query(Users).filter(Users.user_id == str(employee_id), Users.company_id == user.company_id).first()
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
 
     videos = (
-        db.query(Video)
+        db.query(Video.video_id, Video.upload_timestamp, Video.is_processed)
         .filter(Video.user_id == emp.user_id)
         .order_by(Video.upload_timestamp.desc())
         .all()
     )
 
+    scores = load_video_scores(db, [v.video_id for v in videos])
+
     history = []
     for v in videos:
-        preds = db.query(Prediction).filter(Prediction.video_id == v.video_id).all()
-        pred_map: Dict[str, float] = {}
-        for p in preds:
-            m = map_emotion(p.emotion_label)
-            if m:
-                pred_map[m] = float(p.score)
-        top_emotion = max(pred_map, key=pred_map.get) if pred_map else None
-        top_score = pred_map.get(top_emotion) if top_emotion else None
+        pred_map, top_emotion, top_score = scores.get(v.video_id, ({}, None, None))
         history.append(
             {
                 "video_id": v.video_id,
-                "uploaded_at": v.upload_timestamp.isoformat() if v.upload_timestamp else None,
+                "uploaded_at": v.upload_timestamp,
                 "is_processed": v.is_processed,
                 "predictions": pred_map,
                 "top_emotion": top_emotion,
@@ -319,11 +586,11 @@ def employee_detail(employee_id: str, db: Session = Depends(get_db), user: Users
 
 
 ##############################
-@router.get("/hr/employees")
+@router.get("/hr/employees", response_model=EmployeePage)
 def list_employees(
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     user: Users = Depends(get_current_user),
 ):
     # ✅ Ensure user is HR
@@ -346,39 +613,33 @@ def list_employees(
         .all()
     )
 
+    # ✅ Latest processed video per employee on this page, in one query
+    emp_ids = [emp.user_id for emp in employees]
+    latest = (
+        db.query(Video.user_id, func.max(Video.upload_timestamp).label("uploaded_at"))
+        .filter(Video.user_id.in_(emp_ids), Video.is_processed == True)
+        .group_by(Video.user_id)
+        .subquery()
+    )
+    last_videos = dict(
+        db.query(Video.user_id, Video.video_id)
+        .join(latest, (Video.user_id == latest.c.user_id) & (Video.upload_timestamp == latest.c.uploaded_at))
+        .filter(Video.is_processed == True)
+        .all()
+    )
+    scores = load_video_scores(db, last_videos.values())
+
     items = []
     for emp in employees:
-        last_video = (
-            db.query(Video)
-            .filter(Video.user_id == emp.user_id, Video.is_processed == True)
-            .order_by(Video.upload_timestamp.desc())
-            .first()
-        )
-
-        last_pred = None
-        top_emotion = None
-        top_score = None
-
-        if last_video:
-            preds = db.query(Prediction).filter(Prediction.video_id == last_video.video_id).all()
-            if preds:
-                pred_map = {p.emotion_label: float(p.score) for p in preds}
-                std_map = {}
-                for k, v in pred_map.items():
-                    m = map_emotion(k)
-                    if m:
-                        std_map[m] = v
-                if std_map:
-                    top_emotion = max(std_map, key=std_map.get)
-                    top_score = std_map[top_emotion]
-                last_pred = std_map
+        last_video_id = last_videos.get(emp.user_id)
+        last_pred, top_emotion, top_score = scores.get(last_video_id, (None, None, None))
 
         items.append(
             {
                 "user_id": emp.user_id,
                 "email": emp.email,
                 "role": emp.role,
-                "last_video_id": last_video.video_id if last_video else None,
+                "last_video_id": last_video_id,
                 "last_prediction": last_pred,
                 "top_emotion": top_emotion,
                 "top_score": top_score,
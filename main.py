@@ -1,4 +1,7 @@
-from typing import Annotated
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Annotated, List
+from uuid import UUID
 from fastapi import FastAPI, Depends,HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from auth.router import router as auth_router
@@ -7,13 +10,32 @@ from routers.ai_router import router as ai_router
 from hr_Dashboard.router import router as hr_dashboard_router
 from auth.dependencies import get_current_user
 import uvicorn
-from auth.dependencies import get_db,uploader
+from auth.dependencies import get_db, get_read_db, uploader
 from sqlalchemy.orm import Session
-from auth.Pydantic_model import CreateVideo
-from Database.database import Video
-from core.scheduler import start_scheduler
-
-app = FastAPI(title="Employee Auth API")
+from auth.Pydantic_model import CreateVideo, VideoItem
+from Database.database import Video, VideoKey, uuid7, video_id_filter
+from Database.migrations import schema_is_current
+from core.scheduler import start_scheduler, stop_scheduler
+from core.cache import bump_company_version
+from core.company_stats import ensure_company_stats_view
+from core.partitions import ensure_partitions
+from core.metrics import SIGNING_SECONDS, install_metrics
+from core.log import RequestIdMiddleware, get_logger
+from core.tracing import current_traceparent, install_tracing, span
+from core.responses import FastJSONResponse, install_compression
+
+logger = get_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Threads start here, not at import, so each preforked worker gets its own
+    start_scheduler()
+    yield
+    # Server is draining: in-flight requests have finished, now the inference jobs
+    stop_scheduler()
+
+
+app = FastAPI(title="Employee Auth API", default_response_class=FastJSONResponse, lifespan=lifespan)
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +44,14 @@ app.add_middleware(
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
 )
+# gzip/brotli for large JSON bodies (innermost, so metrics time the compression too)
+install_compression(app)
+# Prometheus metrics: per-route latency / DB usage and GET /metrics
+install_metrics(app)
+# Request / SQL spans when TRACING_EXPORTER is set
+install_tracing(app)
+# Outermost: every log line of a request (and of the jobs it queues) carries its X-Request-ID
+app.add_middleware(RequestIdMiddleware)
 
 # Register Routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
@@ -30,8 +60,13 @@ app.include_router(ai_router, prefix="/ai", tags=["AI Processing"])
 app.include_router(hr_dashboard_router, tags=["HR Dashboard"])
 db_dependency = Annotated[Session,Depends(get_db)]
 
-# Start background scheduler
-start_scheduler()
+# Monthly partitions for videos / video_emotions and materialized summary statistics (PostgreSQL).
+# Both are built on the migrated schema; until then `python -m Database.migrations` creates them.
+if schema_is_current():
+    ensure_partitions()
+    ensure_company_stats_view()
+else:
+    logger.warning("Database has pending migrations; run `python -m Database.migrations`")
 
 @app.get("/")
 def root():
@@ -52,18 +87,23 @@ async def request_signed_url(filename: str, db: db_dependency, content_type: str
 async def upload_complete(upload_video: CreateVideo, db: db_dependency, user=Depends(get_current_user)):
     # Generate a signed URL for the uploaded file
     blob = uploader.bucket.blob(upload_video.original_filename)
-    signed_url = blob.generate_signed_url(
-        version="v4",
-        expiration=3600,  # 1 hour
-        method="GET"
-    )
+    with span("storage.sign", method="GET"), SIGNING_SECONDS.labels("GET").time():
+        signed_url = blob.generate_signed_url(
+            version="v4",
+            expiration=3600,  # 1 hour
+            method="GET"
+        )
     
     new_video = Video(
+        video_id=uuid7(),
         user_id=user.user_id,
         gcs_url=signed_url,
-        original_filename=upload_video.original_filename
+        original_filename=upload_video.original_filename,
+        upload_timestamp=datetime.utcnow(),
+        trace_context=current_traceparent(),
     )
-    db.add(new_video)
+    db.add_all([new_video, VideoKey(video_id=new_video.video_id, upload_timestamp=new_video.upload_timestamp)])
+    bump_company_version(db, user.company_id)
     db.commit()
     db.refresh(new_video)
 
@@ -73,25 +113,22 @@ async def upload_complete(upload_video: CreateVideo, db: db_dependency, user=Dep
     }
 
 # List current user's videos (basic upload history)
-@app.get("/my/videos")
-def list_my_videos(db: db_dependency, user=Depends(get_current_user)):
-    videos = db.query(Video).filter(Video.user_id == user.user_id).order_by(Video.upload_timestamp.desc()).all()
+@app.get("/my/videos", response_model=List[VideoItem])
+def list_my_videos(db: Annotated[Session, Depends(get_read_db)], user=Depends(get_current_user)):
     return [
-        {
-            "video_id": v.video_id,
-            "gcs_url": v.gcs_url,
-            "original_filename": v.original_filename,
-            "upload_timestamp": v.upload_timestamp.isoformat() if v.upload_timestamp else None,
-            "is_processed": v.is_processed,
-        }
-        for v in videos
+        row._asdict()
+        for row in db.query(
+            Video.video_id, Video.gcs_url, Video.original_filename, Video.upload_timestamp, Video.is_processed
+        )
+        .filter(Video.user_id == user.user_id)
+        .order_by(Video.upload_timestamp.desc())
     ]
 
 
 # 3️⃣ (Optional) Get Signed View URL for AI service
 @app.get("/generate_view_url/{video_id}")
-def generate_view_url(video_id: str, db: Session = Depends(get_db)):
-    video = db.query(Video).filter(Video.video_id == video_id).first()
+def generate_view_url(video_id: UUID, db: Session = Depends(get_db)):
+    video = db.query(Video).filter(*video_id_filter(db, str(video_id))).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -104,14 +141,16 @@ def generate_view_url(video_id: str, db: Session = Depends(get_db)):
 async def upload_direct(file: UploadFile = File(...), user=Depends(get_current_user)):
     try:
         blob = uploader.bucket.blob(file.filename)
-        blob.upload_from_file(file.file, content_type=file.content_type)
+        with span("storage.upload", file_name=file.filename):
+            blob.upload_from_file(file.file, content_type=file.content_type)
         
         # Generate a signed URL for the uploaded file
-        signed_url = blob.generate_signed_url(
-            version="v4",
-            expiration=3600,  # 1 hour
-            method="GET"
-        )
+        with span("storage.sign", method="GET"), SIGNING_SECONDS.labels("GET").time():
+            signed_url = blob.generate_signed_url(
+                version="v4",
+                expiration=3600,  # 1 hour
+                method="GET"
+            )
         
         return {"gcs_url": signed_url, "original_filename": file.filename}
     except Exception as e:
@@ -120,4 +159,5 @@ async def upload_direct(file: UploadFile = File(...), user=Depends(get_current_u
 
 
 if __name__ == "__main__":
+    # Development server; production runs `gunicorn main:app` (see gunicorn.conf.py)
     uvicorn.run("main:app", host="0.0.0.0", port=8080, reload=True)
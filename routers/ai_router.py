@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from Database.database import get_db, Video, Prediction
+from Database.database import get_db, Video, video_id_filter
 from auth.dependencies import get_current_user
-from core.AI_Service import process_video_with_ai, compute_derived_fields  # ✅ imported from new service
+from core.config import settings
+from core.inference_jobs import job_stats
+from core.processing_queue import INTERACTIVE, NORMAL, enqueue_pending_videos, processing_queue, submit_videos
+from core.processing_state import DEAD, FAILED, get_state
+from core.video_emotions import load_model_predictions
 
 router = APIRouter()
 
 @router.post("/process-video/{video_id}")
 async def trigger_video_processing(
-    video_id: str,
-    background_tasks: BackgroundTasks,
+    video_id: UUID,
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
@@ -17,7 +23,7 @@ async def trigger_video_processing(
     Trigger AI processing for a specific video in the background.
     """
     video = db.query(Video).filter(
-        Video.video_id == video_id,
+        *video_id_filter(db, str(video_id)),
         Video.user_id == user.user_id
     ).first()
 
@@ -27,19 +33,33 @@ async def trigger_video_processing(
     if video.is_processed:
         raise HTTPException(status_code=400, detail="Video already processed")
 
-    # ✅ Add background task to process video
-    background_tasks.add_task(process_video_with_ai, video_id, db)
+    state = get_state(db, video.video_id)
+    if state is not None and state.status == DEAD:
+        raise HTTPException(status_code=409, detail=f"Video failed processing {state.attempts} times; ask HR to retry it")
+    if state is not None and state.status == FAILED and state.next_attempt_at > datetime.utcnow():
+        # Backing off after a failure; the pending-video sweep retries it
+        return {
+            "message": "Video processing failed; retry scheduled",
+            "video_id": video.video_id,
+            "status": "retry_scheduled",
+            "retry_at": state.next_attempt_at,
+        }
+
+    # ✅ Someone is waiting on this one: queue it in the interactive lane
+    accepted, _ = submit_videos(db, [(user.company_id, video.video_id, None)], INTERACTIVE)
+    if not accepted:
+        raise HTTPException(status_code=429, detail="Too many videos queued for your company; try again later")
 
     return {
         "message": "Video processing started",
-        "video_id": video_id,
+        "video_id": video.video_id,
         "status": "processing"
     }
 
 
 @router.get("/video/{video_id}/predictions")
 async def get_video_predictions(
-    video_id: str,
+    video_id: UUID,
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
@@ -47,65 +67,67 @@ async def get_video_predictions(
     Get AI emotion predictions for a specific video.
     """
     video = db.query(Video).filter(
-        Video.video_id == video_id,
+        *video_id_filter(db, str(video_id)),
         Video.user_id == user.user_id
     ).first()
 
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    predictions = db.query(Prediction).filter(
-        Prediction.video_id == video_id
-    ).all()
+    prediction_dict = load_model_predictions(db, video.video_id)
 
-    if not predictions:
+    if not prediction_dict:
         return {
-            "video_id": video_id,
+            "video_id": video.video_id,
             "is_processed": video.is_processed,
             "predictions": [],
             "top_emotion": None,
             "top_score": None
         }
 
-    # ✅ Compute top emotion and score from predictions
-    prediction_dict = {p.emotion_label: p.score for p in predictions}
-    top_emotion, top_score = compute_derived_fields(prediction_dict)
+    # ✅ Keyed by the model's own labels; the HR views use the standard emotions
+    top_emotion = max(prediction_dict, key=prediction_dict.get)
 
     return {
-        "video_id": video_id,
+        "video_id": video.video_id,
         "is_processed": video.is_processed,
         "predictions": prediction_dict,
         "top_emotion": top_emotion,
-        "top_score": top_score
+        "top_score": prediction_dict[top_emotion]
     }
 
 
 @router.post("/process-all-pending")
 async def process_all_pending_videos(
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user=Depends(get_current_user)
 ):
     """
     Process all pending videos for the current user.
     """
-    pending_videos = db.query(Video).filter(
-        Video.user_id == user.user_id,
-        Video.is_processed == False
-    ).all()
-
-    if not pending_videos:
+    result = enqueue_pending_videos(db, user_id=user.user_id, lane=NORMAL)
+    if not result["accepted"] and not result["rejected"]:
         return {
             "message": "No pending videos to process",
             "count": 0
         }
 
-    # ✅ Add background tasks for each pending video
-    for video in pending_videos:
-        background_tasks.add_task(process_video_with_ai, video.video_id, db)
-
     return {
-        "message": f"Started processing {len(pending_videos)} videos",
-        "count": len(pending_videos),
-        "video_ids": [v.video_id for v in pending_videos]
+        "message": f"Started processing {len(result['accepted'])} videos",
+        "count": len(result["accepted"]),
+        "video_ids": result["accepted"],
+        # Over the company's queue-depth limit; picked up by a later sweep
+        "deferred_video_ids": result["rejected"],
     }
+
+
+@router.get("/queue")
+async def get_processing_queue(db: Session = Depends(get_db), user=Depends(get_current_user)):
+    """
+    Inference queue per priority lane: the company's queued / running videos and
+    recent queue-wait times across all companies (wait times are kept by the
+    worker nodes when INFERENCE_MODE is remote).
+    """
+    if settings.INFERENCE_MODE == "remote":
+        return {"lanes": job_stats(db, user.company_id)}
+    return {"lanes": processing_queue.stats(user.company_id)}